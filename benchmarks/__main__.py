@@ -0,0 +1,196 @@
+"""
+The offline benchmark suite. Run `python -m benchmarks` to generate a synthetic archive (see fixture.py) and time each
+stage of the project on it: building the index, looking up titles, extracting streams, parsing pages, classifying
+them, the classification cache, and the search end to end, after checking the import time of the startup modules (see
+startup.py). Redis and Neo4J are replaced by the in-process stand-ins in stand_ins.py, so nothing but this repository
+is needed.
+
+The search stages also check that every schedule finds the same graph.
+"""
+import html
+import logging
+import random
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Dict, Iterator, List, Tuple, Union
+
+from benchmarks.fixture import Fixture, generate_fixture
+from benchmarks.stand_ins import AsyncMemoryGraphWriter, MemoryGraphWriter, async_memory_cache, memory_cache
+from benchmarks.startup import check_startup
+from config import make_logger
+from data_stores.sqlite import build_archive_index
+from search.bfs import search_by_link, search_by_stream
+from search.crawler import AsyncCrawler
+from search.frontier import Frontier
+from search.pipeline import PipelinedSearch
+from wikipedia.analysis import scan_wikitext
+from wikipedia.models import WikipediaArticle
+from wikipedia.pages import iter_pages
+from wikipedia.reader import WikipediaArchiveSearcher, classify_page
+from wikipedia.title_index import TitleIndex, build_title_index
+
+logger = make_logger(__name__)
+
+
+class BenchmarkResults:
+    """
+    The timings of a run of the suite, reported as they are measured.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, Tuple[float, float, str]] = {}
+
+    @contextmanager
+    def time(self, stage: str, amount: float, unit: str) -> Iterator[None]:
+        """
+        Times the enclosed block, with the logging of the code under test silenced so it is not what gets measured.
+        :param stage: the name of the stage
+        :param amount: how much work the block does, in units
+        :param unit: what the block works through, for the throughput (e.g. "pages")
+        """
+        logging.disable(logging.INFO)
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            seconds = perf_counter() - started
+            logging.disable(logging.NOTSET)
+        self.record(stage, seconds, amount, unit)
+
+    def record(self, stage: str, seconds: float, amount: float, unit: str) -> None:
+        self.timings[stage] = (seconds, amount, unit)
+        logger.info(f'{stage:<28} {seconds:8.3f}s {amount / seconds:12.1f} {unit}/s')
+
+
+def page_texts(searcher: WikipediaArchiveSearcher) -> List[Tuple[int, str]]:
+    """
+    :return: the id and XML of every page in the archive
+    """
+    return [(page_id, page_xml) for start_index, end_index, xml_block in searcher.iter_streams()
+            for page_id, page_xml in iter_pages(xml_block)]
+
+
+def wikitext(page_xml: str) -> str:
+    text_start = page_xml.find(">", page_xml.find("<text")) + 1
+    return html.unescape(page_xml[text_start:page_xml.find("</text>", text_start)])
+
+
+def run_search(schedule: str, fixture: Fixture, directory: Path, seeds: List[str], results: BenchmarkResults,
+               latency: float = 0.0) -> Union[MemoryGraphWriter, AsyncMemoryGraphWriter]:
+    """
+    Runs a whole search of the fixture from the seeds with a fresh cache and graph.
+    :param latency: seconds each command to the stand-in for Redis waits
+    :return: the graph writer holding the graph found
+    """
+    cache = memory_cache(latency=latency)
+    searcher = WikipediaArchiveSearcher(fixture.archive, fixture.index, sqlite_path=directory / "index.db",
+                                        cache=cache)
+    graph_writer = AsyncMemoryGraphWriter() if schedule == "async" else MemoryGraphWriter()
+    search_queue = Frontier()
+    logging.disable(logging.INFO)
+    started = perf_counter()
+    for title in seeds:
+        seed = WikipediaArticle(article_title=title)
+        searcher.retrieve_article_xml(seed)
+        search_queue.push(seed)
+    if schedule == "link":
+        search_by_link(searcher, cache, search_queue, graph_writer)
+    elif schedule == "stream":
+        search_by_stream(searcher, cache, search_queue, graph_writer)
+    elif schedule == "async":
+        AsyncCrawler(searcher, async_memory_cache(cache), graph_writer).run(search_queue)
+    else:
+        PipelinedSearch(searcher, cache, graph_writer, window=50).run(search_queue)
+    graph_writer.close()
+    seconds = perf_counter() - started
+    searcher.close()
+    logging.disable(logging.NOTSET)
+    results.record(f'search ({schedule})', seconds, len(graph_writer.edges), "edges")
+    logger.info(f'{"":<28} {len(graph_writer.nodes)} nodes, {len(graph_writer.edges)} edges')
+    return graph_writer
+
+
+def run_suite(fixture: Fixture, directory: Path, lookups: int = 20000, seed: int = 0,
+              latency: float = 0.0) -> BenchmarkResults:
+    """
+    Times every stage on a generated archive.
+    :param fixture: the archive to run on
+    :param directory: where the indexes built from the archive are written
+    :param lookups: the number of titles looked up in each index (every title in the archive, then missing ones)
+    :param seed: the seed of the order titles are looked up in
+    :param latency: seconds each command to the stand-in for Redis waits during the searches
+    :return: the timings of every stage
+    """
+    rng = random.Random(seed)
+    results = BenchmarkResults()
+    archive_bytes = fixture.archive.stat().st_size
+
+    for cost in check_startup():
+        results.record(f'import ({cost.module})', cost.seconds, 1, "imports")
+
+    with results.time("index build (SQLite)", len(fixture.titles), "rows"):
+        build_archive_index(fixture.index, fixture.archive, directory / "index.db")
+    with results.time("index build (title index)", len(fixture.titles), "rows"):
+        build_title_index(directory / "index.db", directory / "title_index")
+
+    searcher = WikipediaArchiveSearcher(fixture.archive, fixture.index, sqlite_path=directory / "index.db",
+                                        cache=memory_cache(), stream_cache_bytes=0)
+    titles = rng.sample(fixture.titles, min(lookups, len(fixture.titles)))
+    titles += [f'Missing article {number}' for number in range(lookups - len(titles))]
+    with results.time("lookup (SQLite)", lookups, "titles"):
+        searcher.lookup_indices(titles)
+    title_index = TitleIndex(directory / "title_index")
+    with results.time("lookup (title index)", lookups, "titles"):
+        title_index.lookup_many(titles)
+
+    stream_ranges = searcher.stream_ranges()
+    with results.time("stream extraction", archive_bytes / 1e6, "compressed MB"):
+        for start_index, end_index in stream_ranges:
+            searcher.extract_indexed_range(start_index, end_index)
+
+    pages = page_texts(searcher)
+    with results.time("parsing", len(pages), "pages"):
+        for page_id, page_xml in pages:
+            classify_page(page_xml, page_id)
+    searcher.close()
+
+    texts = [wikitext(page_xml) for page_id, page_xml in pages]
+    with results.time("classification", sum(len(text.encode()) for text in texts) / 1e6, "MB"):
+        for text in texts:
+            scan_wikitext(text)
+
+    articles = [WikipediaArticle(article_title=title) for title in fixture.titles]
+    for tiered in (False, True):
+        cache = memory_cache(tiered=tiered, **({"expected_titles": len(articles)} if tiered else {}))
+        with results.time(f'cache ({"tiered" if tiered else "plain"})', 2 * len(articles), "operations"):
+            cache.store_many((article, index % 4 == 0) for index, article in enumerate(articles))
+            cache.retrieve_many(articles)
+
+    seeds = fixture.artist_titles[:3]
+    graphs = [run_search(schedule, fixture, directory, seeds, results, latency=latency)
+              for schedule in ["link", "stream", "pipeline", "async"]]
+    assert all(graph.edges == graphs[0].edges for graph in graphs), "The search schedules found different graphs"
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--pages", type=int, default=5000,
+                            help="the number of pages in the generated archive")
+    arg_parser.add_argument("--lookups", type=int, default=20000,
+                            help="the number of titles looked up in each index")
+    arg_parser.add_argument("--seed", type=int, default=0,
+                            help="the seed of the archive and of the lookups")
+    arg_parser.add_argument("--directory", type=Path, default=None,
+                            help="keep the archive and indexes in this directory instead of a temporary one")
+    arg_parser.add_argument("--latency", type=float, default=0.0,
+                            help="milliseconds each Redis command waits during the searches, as over a network")
+    args = arg_parser.parse_args()
+
+    with TemporaryDirectory() as temporary_directory:
+        directory = args.directory if args.directory is not None else Path(temporary_directory)
+        generated = generate_fixture(directory, pages=args.pages, seed=args.seed)
+        run_suite(generated, directory, lookups=args.lookups, seed=args.seed, latency=args.latency / 1000)
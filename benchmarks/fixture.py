@@ -0,0 +1,169 @@
+"""
+Small, realistic stand-ins for the Wikipedia multistream archive and its index, for benchmarks and tests that cannot
+use the 17 GB dump.
+
+The archive is laid out like the real one: a stream holding the <siteinfo> header, streams of 100 <page> nodes each,
+and a closing stream. Musical artists carry an infobox, a discography, and links to other artists; every page links to
+topics, to redirects, to titles missing from the archive, and to other namespaces, written as loosely as real
+wikitext is (lowercase first letters, underscores, anchors, labels, and links nested in image captions).
+
+Run `python -m benchmarks.fixture DIRECTORY` to write one, or call generate_fixture.
+"""
+import bz2
+import random
+from argparse import ArgumentParser
+from os import PathLike
+from pathlib import Path
+from typing import List, NamedTuple
+from xml.sax.saxutils import escape, quoteattr
+
+from config import make_logger
+
+logger = make_logger(__name__)
+
+PAGES_PER_STREAM = 100
+SITEINFO_HEADER = ('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" xml:lang="en">\n'
+                   '  <siteinfo>\n    <sitename>Wikipedia</sitename>\n  </siteinfo>\n')
+FOOTER = '</mediawiki>\n'
+
+ADJECTIVES = ["Velvet", "Silver", "Midnight", "Electric", "Crimson", "Golden", "Hollow", "Neon", "Paper", "Wild",
+              "Quiet", "Broken", "Northern", "Lonely", "Atomic", "Blue"]
+NOUNS = ["Owls", "Rivers", "Machines", "Hearts", "Tigers", "Lanterns", "Echoes", "Saints", "Wolves", "Engines",
+         "Daughters", "Ghosts", "Harbors", "Satellites", "Roses", "Kings"]
+TOPICS = ["Rock music", "Pop music", "Jazz", "Hip hop music", "Record label", "Music festival", "Guitar", "Piano",
+          "Synthesizer", "Recording studio", "Billboard Hot 100", "Grammy Award", "London", "New York City",
+          "Los Angeles", "Tokyo", "Berlin", "Concert tour", "Music video", "Album"]
+GENRES = ["Rock music", "Pop music", "Jazz", "Hip hop music", "Electronic music", "Folk music", "Soul music"]
+NAMESPACE_LINKS = ["Category:Musical groups", "File:Stage.jpg", "Template:Cite web", "wikt:band",
+                   "fr:Musique"]
+
+
+class Fixture(NamedTuple):
+    """
+    The files of a generated archive, and what it holds.
+    """
+    archive: Path
+    index: Path
+    titles: List[str]
+    artist_titles: List[str]
+    redirect_titles: List[str]
+
+
+def generate_fixture(directory: PathLike, pages: int = 2000, artist_share: float = 0.25,
+                     redirect_share: float = 0.05, links_per_page: int = 40, seed: int = 0) -> Fixture:
+    """
+    Writes a multistream archive and its index (fixture.xml.bz2 and fixture-index.txt) to the given directory.
+    :param directory: the directory to write to, created if needed
+    :param pages: the number of pages in the archive, including redirects
+    :param artist_share: the share of pages about musical artists
+    :param redirect_share: the share of pages that redirect to another page
+    :param links_per_page: the average number of links in an article
+    :param seed: the seed of the generator; the same arguments always write the same files
+    :return: the paths of the files and the titles in the archive
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    artist_count = int(pages * artist_share)
+    redirect_count = int(pages * redirect_share)
+    artist_titles = [f'{rng.choice(["", "The "])}{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {number}'
+                     for number in range(artist_count)]
+    topic_titles = [f'{rng.choice(TOPICS)} ({number})' for number in range(pages - artist_count - redirect_count)]
+    article_titles = artist_titles + topic_titles
+    redirect_titles = [f'{title} (band)' if index < redirect_count // 2 else f'{title} (disambiguation)'
+                       for index, title in enumerate(rng.sample(article_titles, redirect_count))]
+    redirect_targets = {redirect: redirect.rsplit(" (", 1)[0] for redirect in redirect_titles}
+    titles = article_titles + redirect_titles
+    rng.shuffle(titles)
+    artists = set(artist_titles)
+
+    def link(title: str) -> str:
+        roll = rng.random()
+        if roll < 0.1:
+            title = title[0].lower() + title[1:]
+        elif roll < 0.15:
+            title = title.replace(" ", "_")
+        elif roll < 0.2:
+            title = f'{title}#History'
+        return f'[[{title}|{title.lower()}]]' if rng.random() < 0.3 else f'[[{title}]]'
+
+    def random_link() -> str:
+        roll = rng.random()
+        if roll < 0.3:
+            return link(rng.choice(artist_titles))
+        if roll < 0.8:
+            return link(rng.choice(topic_titles))
+        if roll < 0.9:
+            return link(rng.choice(redirect_titles))
+        if roll < 0.95:
+            return link(f'Missing article {rng.randrange(10 ** 6)}')
+        return f'[[{rng.choice(NAMESPACE_LINKS)}]]'
+
+    def article_text(title: str) -> str:
+        parts = []
+        if title in artists:
+            parts.append("{{Infobox musical artist\n"
+                         f"| name = {title}\n"
+                         f"| birth_name = {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}\n"
+                         f"| origin = [[{rng.choice(TOPICS[12:17])}]], {rng.choice(['England', 'United States'])}\n"
+                         f"| genre = {{{{hlist|[[{rng.choice(GENRES)}]]|[[{rng.choice(GENRES)}]]}}}}\n"
+                         f"| years_active = {rng.randrange(1960, 2000)}–present\n"
+                         f"| label = [[{rng.choice(ADJECTIVES)} Records]]\n"
+                         f"| website = {{{{URL|{title.lower().replace(' ', '')}.com}}}}\n"
+                         "}}\n")
+        else:
+            parts.append("{{Infobox settlement\n| name = Somewhere\n| population = 1000\n}}\n")
+        paragraphs = max(1, rng.randrange(links_per_page // 2, links_per_page * 3 // 2 + 1) // 3)
+        for paragraph in range(paragraphs):
+            if paragraph % 5 == 0:
+                parts.append(f'[[File:Photo {paragraph}.jpg|thumb|A caption with {random_link()}]]\n')
+            parts.append(f"'''{title}''' is linked to {random_link()}, {random_link()} and {random_link()}."
+                         f'<ref>{{{{cite web|url=https://example.com/{rng.randrange(10 ** 6)}|title=A source}}}}'
+                         f'</ref>\n\n')
+        if title in artists:
+            parts.append("==Discography==\n* ''First Album''\n* ''Second Album''\n")
+        parts.append("[[Category:Things]]\n")
+        return "".join(parts)
+
+    def page_xml(title: str, page_id: int) -> str:
+        redirect = ""
+        if title in redirect_targets:
+            redirect = f'    <redirect title={quoteattr(redirect_targets[title])} />\n'
+            text = f'#REDIRECT [[{redirect_targets[title]}]]'
+        else:
+            text = article_text(title)
+        return (f'  <page>\n    <title>{escape(title)}</title>\n    <ns>0</ns>\n    <id>{page_id}</id>\n{redirect}'
+                f'    <revision>\n      <id>{page_id * 10 + 7}</id>\n'
+                f'      <text bytes="{len(text.encode())}" xml:space="preserve">{escape(text)}</text>\n'
+                f'    </revision>\n  </page>\n')
+
+    archive_path = directory / "fixture.xml.bz2"
+    index_path = directory / "fixture-index.txt"
+    with open(archive_path, "wb") as archive, open(index_path, "w", encoding="utf-8") as index:
+        archive.write(bz2.compress(SITEINFO_HEADER.encode()))
+        for stream_start in range(0, len(titles), PAGES_PER_STREAM):
+            offset = archive.tell()
+            stream_titles = titles[stream_start:stream_start + PAGES_PER_STREAM]
+            stream = "".join(page_xml(title, stream_start + position + 10)
+                             for position, title in enumerate(stream_titles))
+            archive.write(bz2.compress(stream.encode()))
+            index.writelines(f'{offset}:{stream_start + position + 10}:{title}\n'
+                             for position, title in enumerate(stream_titles))
+        archive.write(bz2.compress(FOOTER.encode()))
+
+    logger.info(f'Wrote {len(titles)} pages ({artist_count} artists, {redirect_count} redirects) to {archive_path}')
+    return Fixture(archive=archive_path, index=index_path, titles=titles, artist_titles=artist_titles,
+                   redirect_titles=redirect_titles)
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("directory", type=Path,
+                            help="the directory to write the archive and its index to")
+    arg_parser.add_argument("--pages", type=int, default=2000,
+                            help="the number of pages in the archive")
+    arg_parser.add_argument("--seed", type=int, default=0,
+                            help="the seed of the generator")
+    args = arg_parser.parse_args()
+    generate_fixture(args.directory, pages=args.pages, seed=args.seed)
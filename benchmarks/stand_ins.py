@@ -0,0 +1,213 @@
+"""
+In-process stand-ins for Redis and Neo4J, so that benchmarks and tests of the search run without either service.
+
+MemoryRedis implements the handful of Redis commands ArticleCache sends, and is swapped in for the cache's connection,
+so the caches' own batching and bookkeeping are still exercised. MemoryGraphWriter is a BulkGraphWriter whose flushes
+merge into in-memory dictionaries instead of sending UNWIND ... MERGE queries. AsyncMemoryRedis and
+AsyncMemoryGraphWriter do the same for the asyncio crawler's AsyncArticleCache and AsyncBulkGraphWriter.
+"""
+from __future__ import annotations
+import asyncio
+from collections import deque
+from time import sleep
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from data_stores.neo_4j.async_writer import AsyncBulkGraphWriter
+from data_stores.neo_4j.graph_writer import BulkGraphWriter
+from data_stores.redis_.article_cache import ArticleCache
+from data_stores.redis_.async_cache import AsyncArticleCache
+from data_stores.redis_.tiered_cache import TieredArticleCache
+
+
+class MemoryRedis:
+    """
+    A dictionary behind the subset of the redis.Redis interface used by ArticleCache. Values are stored as bytes, as
+    Redis returns them.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        :param latency: seconds every GET, SET, MGET, and pipeline execution waits, as for a round trip to Redis
+        """
+        self.data: Dict[str, bytes] = {}
+        self.latency = latency
+
+    def round_trip(self) -> None:
+        if self.latency:
+            sleep(self.latency)
+
+    def set(self, name: str, value) -> None:
+        self.round_trip()
+        self.data[name] = str(value).encode()
+
+    def get(self, name: str) -> Optional[bytes]:
+        self.round_trip()
+        return self.data.get(name)
+
+    def mget(self, keys: List) -> List[Optional[bytes]]:
+        self.round_trip()
+        return [self.data.get(key.decode() if isinstance(key, bytes) else key) for key in keys]
+
+    def delete(self, *names: str) -> None:
+        for name in names:
+            self.data.pop(name, None)
+
+    def flushall(self) -> None:
+        self.data.clear()
+
+    def scan_iter(self, count: int = None) -> Iterator[bytes]:
+        return (key.encode() for key in list(self.data))
+
+    def pipeline(self, transaction: bool = True) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    """
+    Queues SET commands until execute, like a redis.client.Pipeline.
+    """
+
+    def __init__(self, connection: MemoryRedis):
+        self._connection = connection
+        self._queued: List[Tuple[str, object]] = []
+
+    def set(self, name: str, value) -> None:
+        self._queued.append((name, value))
+
+    def execute(self) -> None:
+        self._connection.round_trip()
+        for name, value in self._queued:
+            self._connection.data[name] = str(value).encode()
+        self._queued = []
+
+
+class AsyncMemoryRedis:
+    """
+    The asyncio counterpart of MemoryRedis, over the data of a MemoryRedis so that both see the same keys. Its latency
+    is awaited rather than slept through.
+    """
+
+    def __init__(self, connection: MemoryRedis):
+        self._connection = connection
+        self.data = connection.data
+
+    async def round_trip(self) -> None:
+        if self._connection.latency:
+            await asyncio.sleep(self._connection.latency)
+
+    async def set(self, name: str, value) -> None:
+        await self.round_trip()
+        self.data[name] = str(value).encode()
+
+    async def get(self, name: str) -> Optional[bytes]:
+        await self.round_trip()
+        return self.data.get(name)
+
+    async def mget(self, keys: List) -> List[Optional[bytes]]:
+        await self.round_trip()
+        return [self.data.get(key.decode() if isinstance(key, bytes) else key) for key in keys]
+
+    async def flushall(self) -> None:
+        self._connection.flushall()
+
+    def pipeline(self, transaction: bool = True) -> AsyncMemoryPipeline:
+        return AsyncMemoryPipeline(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class AsyncMemoryPipeline(MemoryPipeline):
+    async def execute(self) -> None:
+        await self._connection.round_trip()
+        for name, value in self._queued:
+            self._connection.data[name] = str(value).encode()
+        self._queued = []
+
+
+def memory_cache(tiered: bool = False, latency: float = 0.0, **kwargs) -> ArticleCache:
+    """
+    :param tiered: put the in-process Bloom filter and map of TieredArticleCache in front of the stand-in
+    :param latency: seconds each command to the stand-in waits, as for a round trip to Redis
+    :param kwargs: passed to the cache's constructor
+    :return: an article cache whose "Redis" lives in this process
+    """
+    cache = TieredArticleCache(**kwargs) if tiered else ArticleCache(**kwargs)
+    cache._conn = MemoryRedis(latency=latency)
+    return cache
+
+
+def async_memory_cache(cache: ArticleCache) -> AsyncArticleCache:
+    """
+    :param cache: an article cache made by memory_cache
+    :return: an asyncio article cache over the same stand-in
+    """
+    async_cache = AsyncArticleCache(batch_size=cache.batch_size)
+    async_cache._conn = AsyncMemoryRedis(cache._conn)
+    return async_cache
+
+
+class MemoryGraphWriter(BulkGraphWriter):
+    """
+    A BulkGraphWriter that merges its batches into nodes (by article_id) and edges instead of writing them to Neo4J.
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self.nodes_written = 0
+        self.edges_written = 0
+        self._nodes: Dict[str, Dict[str, str]] = {}
+        self._edges: List[Dict[str, str]] = []
+        self.nodes: Dict[str, Dict[str, str]] = {}
+        self.edges: Set[Tuple[str, str]] = set()
+
+    def flush(self) -> None:
+        self.merge(self._nodes.values(), self._edges)
+        self.nodes_written += len(self._nodes)
+        self.edges_written += len(self._edges)
+        self._nodes = {}
+        self._edges = []
+
+    def merge(self, nodes: Iterable[Dict[str, str]], edges: Iterable[Dict[str, str]]) -> None:
+        """
+        Merge a batch into the graph as the UNWIND ... MERGE queries would: edges only join nodes that exist.
+        """
+        for node in nodes:
+            self.nodes.setdefault(node['article_id'], node)
+        for edge in edges:
+            if edge['source_id'] in self.nodes and edge['dest_id'] in self.nodes:
+                self.edges.add((edge['source_id'], edge['dest_id']))
+
+
+class AsyncMemoryGraphWriter(AsyncBulkGraphWriter):
+    """
+    An AsyncBulkGraphWriter whose background writes merge into a MemoryGraphWriter's nodes and edges.
+    """
+
+    def __init__(self, batch_size: int = 5000, max_pending_writes: int = 2):
+        self.batch_size = batch_size
+        self.max_pending_writes = max_pending_writes
+        self.nodes_written = 0
+        self.edges_written = 0
+        self._nodes: Dict[str, Dict[str, str]] = {}
+        self._edges: List[Dict[str, str]] = []
+        self._writes: Deque[asyncio.Task] = deque()
+        self.graph = MemoryGraphWriter()
+
+    @property
+    def nodes(self) -> Dict[str, Dict[str, str]]:
+        return self.graph.nodes
+
+    @property
+    def edges(self) -> Set[Tuple[str, str]]:
+        return self.graph.edges
+
+    async def start(self) -> None:
+        pass
+
+    async def write_batch(self, nodes: List[Dict[str, str]], edges: List[Dict[str, str]]) -> None:
+        await asyncio.sleep(0)  # let the crawl go on, as a round trip to Neo4J would
+        self.graph.merge(nodes, edges)
+
+    async def aclose(self) -> None:
+        await self.drain()
@@ -0,0 +1,91 @@
+"""
+The import time of the modules a command line entry point or an extraction worker starts from.
+
+Each module is imported in a fresh interpreter, which reports how long the import took, which of the heavy
+dependencies it pulled in, and whether it read the connection settings of config.py. None of these modules may import
+a heavy dependency or read the settings, and each must import within the budget. Run `python -m benchmarks.startup`;
+the suite in __main__.py runs the same check.
+"""
+import json
+import subprocess
+import sys
+from argparse import ArgumentParser
+from typing import Dict, List, NamedTuple
+
+from config import BASE_DIR, CONNECTION_PARAMETER_FILES, make_logger
+
+logger = make_logger(__name__)
+
+# The modules imported before a command does anything: by `python -m wikipedia.reader`, by each worker process of
+# wikipedia.parallel, and by `python -m data_stores.sqlite`
+STARTUP_MODULES = ["config", "wikipedia.reader", "wikipedia.parallel", "data_stores.sqlite"]
+# Dependencies that cost tens of milliseconds or more to import, imported only on the code paths that use them
+HEAVY_DEPENDENCIES = ["mwparserfromhell", "redis", "neomodel", "neo4j", "numpy", "pandas"]
+IMPORT_BUDGET_SECONDS = 0.2
+
+# Run by the fresh interpreter: imports the module and reports on what it cost
+IMPORT_PROBE = """
+import json, sys
+from time import perf_counter
+started = perf_counter()
+import {module}
+seconds = perf_counter() - started
+config = sys.modules["config"]
+print(json.dumps({{
+    "seconds": seconds,
+    "heavy_dependencies": [name for name in {heavy_dependencies!r} if name in sys.modules],
+    "settings_read": [name for name in {settings!r} if name in vars(config)],
+}}))
+"""
+
+
+class ImportCost(NamedTuple):
+    module: str
+    seconds: float
+    heavy_dependencies: List[str]
+    settings_read: List[str]
+
+
+def import_cost(module: str, repeat: int = 3) -> ImportCost:
+    """
+    :param module: the dotted name of the module to import
+    :param repeat: the number of fresh interpreters to import it in; the best time is reported
+    :return: the time the import took and what it pulled in
+    """
+    probe = IMPORT_PROBE.format(module=module, heavy_dependencies=HEAVY_DEPENDENCIES,
+                                settings=list(CONNECTION_PARAMETER_FILES))
+    reports: List[Dict] = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=BASE_DIR, capture_output=True, text=True,
+                                check=True).stdout
+        reports.append(json.loads(output.splitlines()[-1]))
+    return ImportCost(module, min(report["seconds"] for report in reports), reports[0]["heavy_dependencies"],
+                      reports[0]["settings_read"])
+
+
+def check_startup(budget: float = IMPORT_BUDGET_SECONDS, repeat: int = 3) -> List[ImportCost]:
+    """
+    Imports every startup module and checks it against the budget.
+    :param budget: the most seconds any one of the modules may take to import
+    :param repeat: the number of times each module is imported; the best time is checked
+    :return: the cost of every module, once all of them pass
+    """
+    costs = [import_cost(module, repeat=repeat) for module in STARTUP_MODULES]
+    problems = [f'{cost.module} imports {", ".join(cost.heavy_dependencies)}'
+                for cost in costs if cost.heavy_dependencies]
+    problems += [f'{cost.module} reads {", ".join(cost.settings_read)}' for cost in costs if cost.settings_read]
+    problems += [f'{cost.module} takes {cost.seconds * 1000:.1f} ms to import (budget {budget * 1000:.0f} ms)'
+                 for cost in costs if cost.seconds > budget]
+    assert not problems, "Startup is over budget: " + "; ".join(problems)
+    return costs
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS * 1000,
+                            help="the most milliseconds any startup module may take to import")
+    arg_parser.add_argument("--repeat", type=int, default=3,
+                            help="the number of fresh interpreters each module is imported in; the best is checked")
+    args = arg_parser.parse_args()
+    for startup_cost in check_startup(budget=args.budget / 1000, repeat=args.repeat):
+        logger.info(f'import {startup_cost.module:<24} {startup_cost.seconds * 1000:8.1f} ms')
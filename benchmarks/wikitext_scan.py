@@ -0,0 +1,117 @@
+"""
+Throughput of the wikitext scanner (wikipedia.analysis.scan_wikitext) against the split chain and per-link
+canonicalization that MWParser.process_text used before it.
+
+Run `python -m benchmarks.wikitext_scan` to time both on generated pages, or add `--archive` to time them on the first
+pages of the archive in `data/input/` instead. Both must agree on every page before any timing is reported.
+"""
+import html
+import random
+from argparse import ArgumentParser
+from itertools import islice
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+from config import WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE, make_logger
+from wikipedia.analysis import classify_article_as_artist, scan_wikitext
+from wikipedia.pages import iter_pages
+from wikipedia.reader import WikipediaArchiveSearcher
+from wikipedia.titles import canonical_title
+
+logger = make_logger(__name__)
+
+Scanner = Callable[[str], Tuple[bool, List[str]]]
+
+
+def split_scan(article_text: str) -> Tuple[bool, List[str]]:
+    """
+    The classification and link extraction as MWParser.process_text did them before scan_wikitext.
+    """
+    if not classify_article_as_artist(article_text):
+        return False, []
+    titles = article_text.split("[[")
+    titles = [title.split("]]")[0] for title in titles]
+    titles = [title.split("|")[0] for title in titles[1:]]
+    return True, list(dict.fromkeys(title for title in map(canonical_title, titles) if title is not None))
+
+
+def generate_page(rng: random.Random, is_artist: bool, paragraphs: int = 60) -> str:
+    """
+    :return: wikitext shaped like a real article: an infobox (for artists), prose full of links and citations,
+             captioned images with links nested in their captions, and navigation templates
+    """
+    def link() -> str:
+        title = f'Topic {rng.randrange(5000)}'
+        return f'[[{title}|{title.lower()}]]' if rng.random() < 0.3 else f'[[{title}]]'
+
+    parts = []
+    if is_artist:
+        parts.append("{{Infobox musical artist\n| name = Someone\n| genre = {{hlist|[[Rock music|Rock]]|[[Pop]]}}\n"
+                     "| years_active = 1990–present\n}}\n")
+    for paragraph in range(paragraphs):
+        if paragraph % 10 == 0:
+            parts.append(f'[[File:Photo {paragraph}.jpg|thumb|A caption about {link()} and {link()}]]\n')
+        sentences = [f'Some prose about {link()} and {link()}, with more words after it.'
+                     f'<ref>{{{{cite web|url=https://example.com/{rng.randrange(10 ** 6)}|title=A source}}}}</ref>'
+                     for _ in range(rng.randrange(2, 6))]
+        parts.append(" ".join(sentences) + "\n\n")
+    if is_artist:
+        parts.append("==Discography==\n* ''First Album''\n")
+    parts.append("{{Navbox|list=" + " • ".join(link() for _ in range(30)) + "}}\n[[Category:Things]]\n")
+    return "".join(parts)
+
+
+def archive_pages(count: int) -> List[str]:
+    """
+    :return: the text of the first count pages of the archive
+    """
+    with WikipediaArchiveSearcher(WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE) as searcher:
+        page_xmls = (page_xml for start_index, end_index, xml_block in searcher.iter_streams()
+                     for page_id, page_xml in iter_pages(xml_block))
+        texts = []
+        for page_xml in islice(page_xmls, count):
+            text_start = page_xml.find(">", page_xml.find("<text")) + 1
+            texts.append(html.unescape(page_xml[text_start:page_xml.find("</text>", text_start)]))
+    return texts
+
+
+def time_scanner(scanner: Scanner, texts: List[str], repeat: int) -> float:
+    """
+    :return: the best time, in seconds, of repeat runs of the scanner over every text
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = perf_counter()
+        for text in texts:
+            scanner(text)
+        best = min(best, perf_counter() - started)
+    return best
+
+
+def run_benchmark(texts: List[str], label: str, repeat: int) -> None:
+    mismatches = [text for text in texts if split_scan(text) != tuple(scan_wikitext(text))]
+    assert not mismatches, f'The scanners disagree on {len(mismatches)} of the {label} pages'
+    megabytes = sum(len(text.encode()) for text in texts) / 1e6
+    split_seconds = time_scanner(split_scan, texts, repeat)
+    scanner_seconds = time_scanner(scan_wikitext, texts, repeat)
+    logger.info(f'{label}: {len(texts)} pages, {megabytes:.1f} MB')
+    logger.info(f'\tsplit chain: {megabytes / split_seconds:.1f} MB/s')
+    logger.info(f'\tscanner: {megabytes / scanner_seconds:.1f} MB/s ({split_seconds / scanner_seconds:.2f}x)')
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--pages", type=int, default=500,
+                            help="the number of pages of each kind to scan")
+    arg_parser.add_argument("--repeat", type=int, default=5,
+                            help="the number of timed runs; the best is reported")
+    arg_parser.add_argument("--archive", action="store_true",
+                            help="scan the first pages of the archive instead of generated ones")
+    args = arg_parser.parse_args()
+
+    if args.archive:
+        run_benchmark(archive_pages(args.pages), "archive", args.repeat)
+    else:
+        rng = random.Random(0)
+        run_benchmark([generate_page(rng, is_artist=True) for _ in range(args.pages)], "artist", args.repeat)
+        run_benchmark([generate_page(rng, is_artist=False) for _ in range(args.pages)], "non-artist", args.repeat)
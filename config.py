@@ -1,8 +1,12 @@
 """
 Project-wide constants and settings.
+
+The connection settings of Neo4J and Redis are read from neo4j.json and redis.json the first time they are used (see
+__getattr__), so that importing this module, which nearly every module does, never touches the file system.
 """
 from logging import getLogger, FileHandler, StreamHandler, Formatter, DEBUG, INFO
 import json
+from os import cpu_count
 from pathlib import Path
 from textwrap import dedent
 from typing import Any, Dict, List
@@ -13,12 +17,23 @@ DATA_DIR: Path = BASE_DIR / "data"
 INPUT_DATA_DIR: Path = DATA_DIR / "input"
 OUTPUT_DATA_DIR: Path = DATA_DIR / "output"
 SQLITE_ARCHIVE_INDEX_FILE: Path = OUTPUT_DATA_DIR / "wiki_archive_index.db"
+SQLITE_ARTIST_TABLE_FILE: Path = OUTPUT_DATA_DIR / "wiki_artist_table.db"
+GRAPH_EXPORT_DIR: Path = OUTPUT_DATA_DIR / "graph_export"
+TITLE_INDEX_DIR: Path = OUTPUT_DATA_DIR / "title_index"
+SEARCH_CHECKPOINT_FILE: Path = OUTPUT_DATA_DIR / "search_checkpoint.json"
+SEARCH_STATS_FILE: Path = OUTPUT_DATA_DIR / "search_stats.json"
+BATCH_OUTPUT_FILE: Path = OUTPUT_DATA_DIR / "articles.jsonl"
+BATCH_OUTPUT_DIR: Path = OUTPUT_DATA_DIR / "articles"
+BATCH_NOT_FOUND_FILE: Path = OUTPUT_DATA_DIR / "articles_not_found.txt"
 
 WIKIPEDIA_ARCHIVE_FILE: Path = INPUT_DATA_DIR / "enwiki-20200201-pages-articles-multistream.xml.bz2"
 WIKIPEDIA_INDEX_FILE: Path = INPUT_DATA_DIR / "enwiki-20200201-pages-articles-multistream-index.txt"
 
-NEO4J_CONNECTION_PARAMETERS: Dict[str, Any] = json.load(open(BASE_DIR / 'neo4j.json', 'r'))
-REDIS_CONNECTION_PARAMETERS: Dict[str, Any] = json.load(open(BASE_DIR / 'redis.json', 'r'))
+# NEO4J_CONNECTION_PARAMETERS and REDIS_CONNECTION_PARAMETERS, each loaded from its file on first access
+CONNECTION_PARAMETER_FILES: Dict[str, Path] = {
+    "NEO4J_CONNECTION_PARAMETERS": BASE_DIR / 'neo4j.json',
+    "REDIS_CONNECTION_PARAMETERS": BASE_DIR / 'redis.json',
+}
 NEO4J_ENCRYPTED = False  # https://github.com/neo4j-contrib/neomodel/issues/485
 
 COOL_ASCII_ART_HEADER = dedent("""\n
@@ -32,6 +47,26 @@ COOL_ASCII_ART_HEADER = dedent("""\n
 """)
 
 LOG_UPDATE_SEARCH_EVERY = 10000
+LOG_UPDATE_BATCH_EVERY = 1000  # articles written by a batch extraction between progress reports
+STREAM_CACHE_MAX_BYTES = 512 * 1024 * 1024  # decompressed bytes of multistream blocks kept in memory
+EXTRACTION_WORKERS = cpu_count() or 1  # worker processes for parallel decompression and parsing
+LOCAL_CACHE_EXPECTED_TITLES = 20000000  # titles the in-process Bloom filter is sized for (~24 MB at 1%)
+LOCAL_CACHE_ERROR_RATE = 0.01
+LOCAL_CACHE_MAX_ENTRIES = 5000000  # classifications kept in the in-process map in front of Redis
+CHECKPOINT_EVERY_SECONDS = 300  # how often the search saves its frontier for --resume
+STATS_EVERY_SECONDS = 60  # how often the search logs a summary of its stages and rewrites its stats file
+
+
+def __getattr__(name: str) -> Dict[str, Any]:
+    """
+    Loads the connection settings named by CONNECTION_PARAMETER_FILES on first access, and keeps them as attributes
+    of this module so that the file is read only once.
+    """
+    if name not in CONNECTION_PARAMETER_FILES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    with open(CONNECTION_PARAMETER_FILES[name], 'r') as settings_file:
+        settings = globals()[name] = json.load(settings_file)
+    return settings
 
 
 def make_logger(module_name):
@@ -7,7 +7,9 @@ Written by Anirudh Kamath
 """
 
 from __future__ import annotations
-from config import NEO4J_CONNECTION_PARAMETERS as N4J_CONF, NEO4J_ENCRYPTED, make_logger
+import config
+from config import NEO4J_ENCRYPTED, make_logger
+from instrumentation import metrics
 from wikipedia.models import WikipediaArticle
 from neomodel import db, StructuredNode, JSONProperty, RelationshipTo, RelationshipFrom, StringProperty
 from neomodel import config as neomodel_config
@@ -16,15 +18,24 @@ neomodel_config.ENCRYPTED_CONNECTION = NEO4J_ENCRYPTED
 
 logger = make_logger(__name__)
 
+NODE_BY_ID_QUERY = "MATCH (s:ArticleNode {article_id: $article_id}) RETURN s"
+CONSTRAINT_QUERIES = [
+    # Neo4J 4.4 and later
+    "CREATE CONSTRAINT article_id_unique IF NOT EXISTS FOR (n:ArticleNode) REQUIRE n.article_id IS UNIQUE",
+    # Neo4J 3.5 through 4.3
+    "CREATE CONSTRAINT ON (n:ArticleNode) ASSERT n.article_id IS UNIQUE",
+]
+
 
 class ArticleNode(StructuredNode):
 
     properties = JSONProperty()
-    article_id = StringProperty()
+    article_id = StringProperty(unique_index=True)
     article_title = StringProperty()
     links_to = RelationshipTo('ArticleNode', 'LINKS TO')
     linked_from = RelationshipFrom('ArticleNode', 'LINKED FROM')
     article = None
+    connected = False
 
     def update_article(self, article: WikipediaArticle) -> None:
         """
@@ -34,15 +45,35 @@ class ArticleNode(StructuredNode):
         """
         self.article = article
 
-    @staticmethod
-    def connect() -> None:
+    @classmethod
+    def connect(cls) -> None:
         """"
-        Connects to the Neo4J instance
+        Connects to the Neo4J instance, once per process
         """
-        user, pw, host, bolt_port = [N4J_CONF[a] for a in ['user', 'pass', 'host', 'bolt_port']]
+        if cls.connected:
+            return
+        # Read on first connection rather than on import (see config.__getattr__)
+        n4j_conf = config.NEO4J_CONNECTION_PARAMETERS
+        user, pw, host, bolt_port = [n4j_conf[a] for a in ['user', 'pass', 'host', 'bolt_port']]
         connection_url = f'bolt://{user}:{pw}@{host}:{bolt_port}'
         logger.debug(f'Connecting to Neo4J: {connection_url}')
         db.set_connection(connection_url)
+        cls.connected = True
+
+    @classmethod
+    def create_constraint(cls) -> None:
+        """
+        Creates the uniqueness constraint (and with it the index) on article_id that every lookup and MERGE relies on.
+        """
+        cls.connect()
+        last_error = None
+        for query_txt in CONSTRAINT_QUERIES:
+            try:
+                db.cypher_query(query_txt)
+                return
+            except Exception as e:  # the driver's exception types differ across neomodel and Neo4J versions
+                last_error = e
+        logger.warning(f'Could not create the article_id constraint: {last_error}')
 
     @classmethod
     def clear(cls):
@@ -66,22 +97,26 @@ class ArticleNode(StructuredNode):
         title = article.article_title
 
         # node = cls.nodes.get_or_none(article_id=article_id)
-        results, meta = db.cypher_query("""MATCH (s) WHERE s.article_id = '""" + article_id + """' RETURN s""")
-        nodes = [cls.inflate(row[0]) for row in results]
+        with metrics.time("neo4j_read"):
+            results, meta = db.cypher_query(NODE_BY_ID_QUERY, {'article_id': article_id})
+            nodes = [cls.inflate(row[0]) for row in results]
 
         if nodes:
             nodes[0].article = article
             return nodes[0]
 
         node = cls(article_id=article_id, article_title=title, properties=properties)  # vars() converts a class to JSON data
-        node.save()  # Pushes node to the db
+        with metrics.time("neo4j_write"):
+            node.save()  # Pushes node to the db
         node.article = article
         return node
 
     @classmethod
     def retrieve_node(cls, article: WikipediaArticle) -> ArticleNode:
-        results, meta = db.cypher_query("""MATCH (s) WHERE s.article_id = '""" + article.article_url + """' RETURN s""")
-        nodes = [cls.inflate(row[0]) for row in results]
+        cls.connect()
+        with metrics.time("neo4j_read"):
+            results, meta = db.cypher_query(NODE_BY_ID_QUERY, {'article_id': article.article_url})
+            nodes = [cls.inflate(row[0]) for row in results]
         if nodes:
             return nodes[0]
 
@@ -100,7 +135,8 @@ class ArticleNode(StructuredNode):
         :param dest_article: the destination article to be pointed to
         """
         cls.connect()
-        source_article.links_to.connect(dest_article)
+        with metrics.time("neo4j_write"):
+            source_article.links_to.connect(dest_article)
         
     def category(cls):
         """Performs same functionality as inherited class"""
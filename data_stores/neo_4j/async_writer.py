@@ -0,0 +1,118 @@
+"""
+BulkGraphWriter over the Neo4J driver's asyncio API, for the asyncio crawler (search/crawler.py).
+
+Nodes and edges are buffered exactly as BulkGraphWriter buffers them, but a full buffer is written in the background
+while the crawl goes on. Background writes run one after another in the order they were started, so every edge is
+written after the nodes it joins.
+"""
+
+from __future__ import annotations
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List
+
+import config
+from config import make_logger
+from data_stores.neo_4j.article_node import CONSTRAINT_QUERIES
+from data_stores.neo_4j.graph_writer import BulkGraphWriter, MERGE_EDGES_QUERY, MERGE_NODES_QUERY
+from instrumentation import metrics
+from neo4j import AsyncGraphDatabase
+
+logger = make_logger(__name__)
+
+
+class AsyncBulkGraphWriter(BulkGraphWriter):
+    """
+    Buffers nodes and edges like BulkGraphWriter and writes each full buffer in the background.
+    """
+
+    def __init__(self, batch_size: int = 5000, max_pending_writes: int = 2):
+        """
+        Creates the driver; it connects on the event loop of the first write.
+        :param batch_size: the number of buffered nodes plus edges that triggers a write
+        :param max_pending_writes: the most background writes allowed before throttle makes the crawl wait for them
+        """
+        self.batch_size = batch_size
+        self.max_pending_writes = max_pending_writes
+        self.nodes_written = 0
+        self.edges_written = 0
+        self._nodes: Dict[str, Dict[str, str]] = {}
+        self._edges: List[Dict[str, str]] = []
+        self._writes: Deque[asyncio.Task] = deque()
+        n4j_conf = config.NEO4J_CONNECTION_PARAMETERS
+        user, pw, host, bolt_port = [n4j_conf[a] for a in ['user', 'pass', 'host', 'bolt_port']]
+        self._driver = AsyncGraphDatabase.driver(f'bolt://{host}:{bolt_port}', auth=(user, pw))
+
+    async def start(self) -> None:
+        """
+        Makes sure the article_id constraint exists, like BulkGraphWriter's constructor does.
+        """
+        last_error = None
+        async with self._driver.session() as session:
+            for query_txt in CONSTRAINT_QUERIES:
+                try:
+                    await (await session.run(query_txt)).consume()
+                    return
+                except Exception as e:  # the driver's exception types differ across Neo4J versions
+                    last_error = e
+        logger.warning(f'Could not create the article_id constraint: {last_error}')
+
+    def flush(self) -> None:
+        """
+        Start writing every buffered node, then every buffered edge, in the background. Outside of an event loop (as
+        when the seeds are added) the buffer is left for the first write made during the crawl.
+        """
+        if not (self._nodes or self._edges):
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        previous_write = self._writes[-1] if self._writes else None
+        self._writes.append(asyncio.ensure_future(self._write(list(self._nodes.values()), self._edges,
+                                                              previous_write)))
+        self._nodes = {}
+        self._edges = []
+
+    async def _write(self, nodes: List[Dict[str, str]], edges: List[Dict[str, str]],
+                     previous_write: asyncio.Task = None) -> None:
+        if previous_write is not None:
+            await asyncio.shield(previous_write)
+        await self.write_batch(nodes, edges)
+        self.nodes_written += len(nodes)
+        self.edges_written += len(edges)
+        logger.debug(f'Flushed graph writes: {self.nodes_written} nodes, {self.edges_written} edges so far')
+
+    async def write_batch(self, nodes: List[Dict[str, str]], edges: List[Dict[str, str]]) -> None:
+        """
+        Write one batch of nodes, then its edges.
+        """
+        async with self._driver.session() as session:
+            if nodes:
+                with metrics.time("neo4j_write", items=len(nodes)):
+                    await (await session.run(MERGE_NODES_QUERY, {'nodes': nodes})).consume()
+            if edges:
+                with metrics.time("neo4j_write", items=len(edges)):
+                    await (await session.run(MERGE_EDGES_QUERY, {'edges': edges})).consume()
+
+    async def throttle(self) -> None:
+        """
+        Wait for the oldest background writes while more than max_pending_writes are unfinished, raising any error
+        they met.
+        """
+        while self._writes and (self._writes[0].done() or len(self._writes) > self.max_pending_writes):
+            await self._writes.popleft()
+
+    async def drain(self) -> None:
+        """
+        Write everything buffered and wait for every background write.
+        """
+        self.flush()
+        while self._writes:
+            await self._writes.popleft()
+
+    async def aclose(self) -> None:
+        try:
+            await self.drain()
+        finally:
+            await self._driver.close()
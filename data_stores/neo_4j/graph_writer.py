@@ -0,0 +1,110 @@
+"""
+Writers that record the artist graph found by the search.
+
+Both writers take WikipediaArticles and expose the same add_node / add_edge / flush / close methods, so the search
+can use either: ArticleNodeWriter saves every node and edge through neomodel as it is found, while BulkGraphWriter
+buffers them and writes them in batches of parameterized UNWIND ... MERGE queries.
+"""
+
+from __future__ import annotations
+import json
+from typing import Dict, List
+from config import make_logger
+from data_stores.neo_4j.article_node import ArticleNode
+from instrumentation import metrics
+from neomodel import db
+from wikipedia.models import WikipediaArticle
+
+logger = make_logger(__name__)
+
+MERGE_NODES_QUERY = """
+UNWIND $nodes AS node
+MERGE (n:ArticleNode {article_id: node.article_id})
+ON CREATE SET n.article_title = node.article_title, n.properties = node.properties
+"""
+MERGE_EDGES_QUERY = """
+UNWIND $edges AS edge
+MATCH (s:ArticleNode {article_id: edge.source_id})
+MATCH (d:ArticleNode {article_id: edge.dest_id})
+MERGE (s)-[:`LINKS TO`]->(d)
+"""
+
+
+class ArticleNodeWriter:
+    """
+    Writes each node and edge to Neo4J as soon as it is added, one round trip (or more) at a time.
+    """
+
+    def add_node(self, article: WikipediaArticle) -> None:
+        ArticleNode.add_node(article)
+
+    def add_edge(self, source_article: WikipediaArticle, dest_article: WikipediaArticle) -> None:
+        ArticleNode.add_edge(ArticleNode.retrieve_node(source_article), ArticleNode.retrieve_node(dest_article))
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class BulkGraphWriter:
+    """
+    Buffers nodes and edges and writes them to Neo4J in batches. Nodes are merged on the (unique, indexed) article_id,
+    so adding an article twice keeps the first node, like ArticleNode.add_node.
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        """
+        Connects to Neo4J once and makes sure the article_id constraint exists.
+        :param batch_size: the number of buffered nodes plus edges that triggers a flush
+        """
+        self.batch_size = batch_size
+        self.nodes_written = 0
+        self.edges_written = 0
+        self._nodes: Dict[str, Dict[str, str]] = {}
+        self._edges: List[Dict[str, str]] = []
+        ArticleNode.connect()
+        ArticleNode.create_constraint()
+
+    def add_node(self, article: WikipediaArticle) -> None:
+        """
+        Buffer a node for the given article.
+        :param article: the article to add
+        """
+        self._nodes.setdefault(article.article_url, {'article_id': article.article_url,
+                                                     'article_title': article.article_title,
+                                                     'properties': json.dumps(article.infobox)})
+        self._flush_if_full()
+
+    def add_edge(self, source_article: WikipediaArticle, dest_article: WikipediaArticle) -> None:
+        """
+        Buffer an edge between two articles whose nodes have been added.
+        :param source_article: the article pointing to the destination
+        :param dest_article: the destination article to be pointed to
+        """
+        self._edges.append({'source_id': source_article.article_url, 'dest_id': dest_article.article_url})
+        self._flush_if_full()
+
+    def _flush_if_full(self) -> None:
+        if len(self._nodes) + len(self._edges) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write every buffered node, then every buffered edge.
+        """
+        if self._nodes:
+            with metrics.time("neo4j_write", items=len(self._nodes)):
+                db.cypher_query(MERGE_NODES_QUERY, {'nodes': list(self._nodes.values())})
+            self.nodes_written += len(self._nodes)
+            self._nodes = {}
+        if self._edges:
+            with metrics.time("neo4j_write", items=len(self._edges)):
+                db.cypher_query(MERGE_EDGES_QUERY, {'edges': self._edges})
+            self.edges_written += len(self._edges)
+            self._edges = []
+        logger.debug(f'Flushed graph writes: {self.nodes_written} nodes, {self.edges_written} edges so far')
+
+    def close(self) -> None:
+        self.flush()
@@ -0,0 +1,136 @@
+"""
+Offline export of the artist graph, for loading Neo4J with `neo4j-admin import` or analyzing the graph without any
+database at all.
+
+The exporter has the same add_node / add_edge / flush / close methods as the writers in graph_writer.py, so the search
+can use it in their place.
+"""
+
+from __future__ import annotations
+import csv
+import json
+from array import array
+from os import PathLike, makedirs
+from pathlib import Path
+from typing import Dict, Set
+
+import numpy
+
+from config import GRAPH_EXPORT_DIR, make_logger
+from wikipedia.models import WikipediaArticle
+
+logger = make_logger(__name__)
+
+NODES_HEADER = ["article_id:ID(ArticleNode)", "article_title", "properties", "page_id:long", ":LABEL"]
+EDGES_HEADER = [":START_ID(ArticleNode)", ":END_ID(ArticleNode)", ":TYPE"]
+
+
+class OfflineGraphExporter:
+    """
+    Streams nodes and edges to neo4j-admin compatible CSV files as they are found, and writes a compressed sparse row
+    (CSR) adjacency file keyed by page id when closed.
+
+    Import the CSV files with:
+        neo4j-admin import --nodes=nodes.csv --relationships=edges.csv --multiline-fields=true
+    (`--multiline-fields` is needed because infobox values may contain line breaks).
+
+    The CSR file (graph_csr.npz) holds three arrays: `page_ids`, the sorted page ids of every node; and `indptr` and
+    `indices`, such that the out-neighbours of page_ids[i] are page_ids[indices[indptr[i]:indptr[i + 1]]].
+    """
+
+    def __init__(self, output_dir: PathLike = GRAPH_EXPORT_DIR):
+        """
+        :param output_dir: the directory to write nodes.csv, edges.csv, and graph_csr.npz to
+        """
+        self.output_dir = Path(output_dir)
+        makedirs(self.output_dir, exist_ok=True)
+        self._nodes_file = open(self.output_dir / "nodes.csv", "w", newline="", encoding="utf-8")
+        self._edges_file = open(self.output_dir / "edges.csv", "w", newline="", encoding="utf-8")
+        self._nodes_csv = csv.writer(self._nodes_file)
+        self._edges_csv = csv.writer(self._edges_file)
+        self._nodes_csv.writerow(NODES_HEADER)
+        self._edges_csv.writerow(EDGES_HEADER)
+
+        # A number for each article_id seen in a node or an edge, and by number, the page id of its node (-1 if
+        # unknown) and whether the node has been written
+        self._article_numbers: Dict[str, int] = {}
+        self._node_page_ids = array('q')
+        self._node_written = bytearray()
+        self._node_count = 0
+        # Each edge written, as its source's number in the high 32 bits and its destination's in the low 32
+        self._seen_edges: Set[int] = set()
+        self._edge_sources = array('q')
+        self._edge_dests = array('q')
+
+    def _article_number(self, article_url: str) -> int:
+        article_number = self._article_numbers.get(article_url)
+        if article_number is None:
+            article_number = self._article_numbers[article_url] = len(self._node_page_ids)
+            self._node_page_ids.append(-1)
+            self._node_written.append(False)
+        return article_number
+
+    def add_node(self, article: WikipediaArticle) -> None:
+        """
+        Write a node for the given article, unless one has been written already.
+        :param article: the article to add
+        """
+        article_url = article.article_url
+        article_number = self._article_number(article_url)
+        if self._node_written[article_number]:
+            return
+        page_id = article.page_id if article.page_id is not None else -1
+        self._node_page_ids[article_number] = page_id
+        self._node_written[article_number] = True
+        self._node_count += 1
+        self._nodes_csv.writerow([article_url, article.article_title, json.dumps(article.infobox), page_id,
+                                  "ArticleNode"])
+
+    def add_edge(self, source_article: WikipediaArticle, dest_article: WikipediaArticle) -> None:
+        """
+        Write an edge between two articles whose nodes have been added, unless it has been written already.
+        :param source_article: the article pointing to the destination
+        :param dest_article: the destination article to be pointed to
+        """
+        source_url, dest_url = source_article.article_url, dest_article.article_url
+        source_number, dest_number = self._article_number(source_url), self._article_number(dest_url)
+        edge = source_number << 32 | dest_number
+        if edge in self._seen_edges:
+            return
+        self._seen_edges.add(edge)
+        self._edges_csv.writerow([source_url, dest_url, "LINKS TO"])
+        # Only the first instance of a linked article carries its page id, so the page ids are looked up by node when
+        # the CSR file is written
+        self._edge_sources.append(source_number)
+        self._edge_dests.append(dest_number)
+
+    def flush(self) -> None:
+        self._nodes_file.flush()
+        self._edges_file.flush()
+
+    def close(self) -> None:
+        """
+        Finish the CSV files and write the CSR adjacency file.
+        """
+        self._nodes_file.close()
+        self._edges_file.close()
+        self.write_csr(self.output_dir / "graph_csr.npz")
+        logger.info(f'Exported {self._node_count} nodes and {len(self._seen_edges)} edges to {self.output_dir}')
+
+    def write_csr(self, path: PathLike) -> None:
+        """
+        Write the adjacency of every edge between nodes with known page ids in compressed sparse row form.
+        :param path: the .npz file to write
+        """
+        node_page_ids = numpy.frombuffer(self._node_page_ids, dtype=numpy.int64)
+        page_ids = numpy.unique(node_page_ids[node_page_ids >= 0])
+        source_page_ids = node_page_ids[numpy.frombuffer(self._edge_sources, dtype=numpy.int64)]
+        dest_page_ids = node_page_ids[numpy.frombuffer(self._edge_dests, dtype=numpy.int64)]
+        known = (source_page_ids >= 0) & (dest_page_ids >= 0)
+        sources = numpy.searchsorted(page_ids, source_page_ids[known])
+        dests = numpy.searchsorted(page_ids, dest_page_ids[known])
+
+        order = numpy.lexsort((dests, sources))
+        indptr = numpy.zeros(len(page_ids) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(sources, minlength=len(page_ids)), out=indptr[1:])
+        numpy.savez_compressed(path, page_ids=page_ids, indptr=indptr, indices=dests[order].astype(numpy.int32))
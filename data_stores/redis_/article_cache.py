@@ -5,15 +5,36 @@ Written by Max Cunha.
 """
 
 from __future__ import annotations
-from config import REDIS_CONNECTION_PARAMETERS
-from redis import Redis
+from typing import Iterable, Iterator, List, Optional, Tuple
+import config
+from instrumentation import metrics
+from redis import ConnectionPool, Redis
 from wikipedia.models import WikipediaArticle
 
+_connection_pool: Optional[ConnectionPool] = None
+
+
+def get_connection_pool() -> ConnectionPool:
+    """
+    Every ArticleCache in the process shares one pool of Redis connections, created on first use.
+    :returns: the process-wide connection pool
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        # Read on first connection rather than on import (see config.__getattr__)
+        redis_conf = config.REDIS_CONNECTION_PARAMETERS
+        _connection_pool = ConnectionPool(host=redis_conf['host'], port=redis_conf['port'])
+    return _connection_pool
+
 
 class ArticleCache:
 
-    def __init__(self):
-        self._conn = Redis(REDIS_CONNECTION_PARAMETERS['host'], REDIS_CONNECTION_PARAMETERS['port'])
+    def __init__(self, batch_size: int = 10000):
+        """
+        :param batch_size: the most keys sent to Redis in a single MGET or pipeline by the *_many methods
+        """
+        self._conn = Redis(connection_pool=get_connection_pool())
+        self.batch_size = batch_size
 
     def clear(self) -> None:
         """
@@ -30,8 +51,8 @@ class ArticleCache:
         :param is_musical_artist: boolean classification indicating whether article is about a musical artist
         """
         is_musical_artist_int = 1 if is_musical_artist else 0  # convert to integer representation for Redis
-        self._conn.set(name=article.article_title, value=is_musical_artist_int)
-        pass
+        with metrics.time("redis_write"):
+            self._conn.set(name=article.article_title, value=is_musical_artist_int)
 
     def retrieve_classification(self, article: WikipediaArticle) -> bool:
         """
@@ -41,7 +62,70 @@ class ArticleCache:
         :param article: the title of the article to retrieve classification for
         :returns: the classification or None
         """
-        classification = self._conn.get(article.article_title)
+        with metrics.time("redis_read"):
+            classification = self._conn.get(article.article_title)
         if classification is not None:
             classification = bool(int(classification))  # convert from Redis string to boolean
         return classification
+
+    def store_many(self, classifications: Iterable[Tuple[WikipediaArticle, bool]]) -> None:
+        """
+        Store the classifications of many articles, sending them to Redis in pipelined batches rather than one
+        round trip each.
+        :param classifications: pairs of an article and whether it is about a musical artist
+        """
+        pipeline = self._conn.pipeline(transaction=False)
+        queued = 0
+        for article, is_musical_artist in classifications:
+            pipeline.set(name=article.article_title, value=1 if is_musical_artist else 0)
+            queued += 1
+            if queued == self.batch_size:
+                with metrics.time("redis_write", items=queued):
+                    pipeline.execute()
+                queued = 0
+        if queued:
+            with metrics.time("redis_write", items=queued):
+                pipeline.execute()
+
+    def retrieve_many(self, articles: List[WikipediaArticle]) -> List[Optional[bool]]:
+        """
+        Retrieve the classifications of many articles with one MGET per batch rather than one GET each.
+        :param articles: the articles to retrieve classifications for
+        :returns: the classification of each article, in order, with None for articles not in the cache
+        """
+        classifications = []
+        for batch_start in range(0, len(articles), self.batch_size):
+            keys = [article.article_title for article in articles[batch_start:batch_start + self.batch_size]]
+            with metrics.time("redis_read", items=len(keys)):
+                values = self._conn.mget(keys)
+            classifications.extend(None if classification is None else bool(int(classification))
+                                   for classification in values)
+        return classifications
+
+    def iter_artist_titles(self) -> Iterator[str]:
+        """
+        Walk the titles of every article classified as a musical artist, with SCAN and MGET rather than KEYS.
+        :returns: an iterator of titles, in no particular order
+        """
+        keys = []
+        for key in self._conn.scan_iter(count=self.batch_size):
+            keys.append(key)
+            if len(keys) == self.batch_size:
+                yield from self._artist_titles(keys)
+                keys = []
+        yield from self._artist_titles(keys)
+
+    def _artist_titles(self, keys: List[bytes]) -> Iterator[str]:
+        if keys:
+            for key, classification in zip(keys, self._conn.mget(keys)):
+                if classification is not None and int(classification):
+                    yield key.decode()
+
+    def delete_many(self, titles: Iterable[str]) -> None:
+        """
+        Forget the classifications of many articles, in batches of DEL commands.
+        :param titles: the titles of the articles to forget
+        """
+        titles = list(titles)
+        for batch_start in range(0, len(titles), self.batch_size):
+            self._conn.delete(*titles[batch_start:batch_start + self.batch_size])
@@ -0,0 +1,73 @@
+"""
+The classification cache of ArticleCache over redis-py's asyncio client, for the asyncio crawler (search/crawler.py).
+
+Keys and values are the same as ArticleCache's, so both can be used on the same Redis database at once: the crawler's
+seeds are classified through the searcher's ArticleCache before the crawl starts.
+"""
+from __future__ import annotations
+from typing import Iterable, List, Optional, Tuple
+
+import config
+from instrumentation import metrics
+from redis.asyncio import Redis
+from wikipedia.models import WikipediaArticle
+
+
+class AsyncArticleCache:
+
+    def __init__(self, batch_size: int = 10000):
+        """
+        Connections are opened on first use, on the event loop that uses them.
+        :param batch_size: the most keys sent to Redis in a single MGET or pipeline by the *_many methods
+        """
+        redis_conf = config.REDIS_CONNECTION_PARAMETERS
+        self._conn = Redis(host=redis_conf['host'], port=redis_conf['port'])
+        self.batch_size = batch_size
+
+    async def clear(self) -> None:
+        await self._conn.flushall()
+
+    async def store_classification(self, article: WikipediaArticle, is_musical_artist: bool) -> None:
+        with metrics.time("redis_write"):
+            await self._conn.set(name=article.article_title, value=1 if is_musical_artist else 0)
+
+    async def retrieve_classification(self, article: WikipediaArticle) -> Optional[bool]:
+        with metrics.time("redis_read"):
+            classification = await self._conn.get(article.article_title)
+        return None if classification is None else bool(int(classification))
+
+    async def store_many(self, classifications: Iterable[Tuple[WikipediaArticle, bool]]) -> None:
+        """
+        Store the classifications of many articles in pipelined batches, as ArticleCache.store_many does.
+        :param classifications: pairs of an article and whether it is about a musical artist
+        """
+        pipeline = self._conn.pipeline(transaction=False)
+        queued = 0
+        for article, is_musical_artist in classifications:
+            pipeline.set(name=article.article_title, value=1 if is_musical_artist else 0)
+            queued += 1
+            if queued == self.batch_size:
+                with metrics.time("redis_write", items=queued):
+                    await pipeline.execute()
+                queued = 0
+        if queued:
+            with metrics.time("redis_write", items=queued):
+                await pipeline.execute()
+
+    async def retrieve_many(self, articles: List[WikipediaArticle]) -> List[Optional[bool]]:
+        """
+        Retrieve the classifications of many articles with one MGET per batch, as ArticleCache.retrieve_many does.
+        :param articles: the articles to retrieve classifications for
+        :returns: the classification of each article, in order, with None for articles not in the cache
+        """
+        classifications = []
+        for batch_start in range(0, len(articles), self.batch_size):
+            keys = [article.article_title for article in articles[batch_start:batch_start + self.batch_size]]
+            with metrics.time("redis_read", items=len(keys)):
+                values = await self._conn.mget(keys)
+            classifications.extend(None if classification is None else bool(int(classification))
+                                   for classification in values)
+        return classifications
+
+    async def aclose(self) -> None:
+        await self._conn.aclose()
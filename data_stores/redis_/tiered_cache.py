@@ -0,0 +1,168 @@
+"""
+In-process tiers in front of the Redis cache of article classifications.
+
+A Bloom filter answers "never classified" for most unseen titles without a network round trip, and a bounded map of
+recently used classifications answers most repeat lookups. Redis stays the shared source of truth: every
+classification is still written through to it.
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from hashlib import blake2b
+from math import ceil, log
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import LOCAL_CACHE_EXPECTED_TITLES, LOCAL_CACHE_ERROR_RATE, LOCAL_CACHE_MAX_ENTRIES
+from data_stores.redis_.article_cache import ArticleCache
+from wikipedia.models import WikipediaArticle
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter over strings. It never reports a string that was added as missing, and reports a
+    string that was never added as present with probability close to error_rate while under capacity.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        :param capacity: the number of strings the filter is sized for
+        :param error_rate: the acceptable false positive rate at capacity
+        """
+        self.bit_count = max(8, ceil(-capacity * log(error_rate) / (log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * log(2)))
+        self._bits = bytearray(ceil(self.bit_count / 8))
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+        return ((first_hash + i * second_hash) % self.bit_count for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+
+
+class TieredArticleCache(ArticleCache):
+    """
+    An ArticleCache that checks a Bloom filter of every title it has classified and a bounded LRU map of
+    classifications before going to Redis.
+
+    The Bloom filter only knows about classifications stored through this object (or loaded with warm), so every
+    writer of the search must share the same instance. The local tiers are guarded by a lock, as the fetch and writer
+    threads of the pipelined search use the cache at once; Redis is only waited on outside of it.
+    """
+
+    def __init__(self, expected_titles: int = LOCAL_CACHE_EXPECTED_TITLES,
+                 error_rate: float = LOCAL_CACHE_ERROR_RATE, max_local_entries: int = LOCAL_CACHE_MAX_ENTRIES,
+                 **kwargs):
+        """
+        :param expected_titles: the number of classified titles the Bloom filter is sized for
+        :param error_rate: the Bloom filter's false positive rate at expected_titles
+        :param max_local_entries: the most classifications kept in the in-process map
+        """
+        super().__init__(**kwargs)
+        self.seen_titles = BloomFilter(expected_titles, error_rate)
+        self.max_local_entries = max_local_entries
+        self._local: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = Lock()
+        self.bloom_negatives = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self.seen_titles.clear()
+            self._local.clear()
+        super().clear()
+
+    def warm(self, batch_size: int = 10000) -> None:
+        """
+        Add every title already classified in Redis to the Bloom filter, for searches that keep an existing cache.
+        :param batch_size: the number of keys fetched per SCAN
+        """
+        for key in self._conn.scan_iter(count=batch_size):
+            with self._lock:
+                self.seen_titles.add(key.decode())
+
+    def store_classification(self, article: WikipediaArticle, is_musical_artist: bool) -> None:
+        with self._lock:
+            self._remember(article.article_title, is_musical_artist)
+        super().store_classification(article, is_musical_artist)
+
+    def store_many(self, classifications: Iterable[Tuple[WikipediaArticle, bool]]) -> None:
+        classifications = list(classifications)
+        with self._lock:
+            for article, is_musical_artist in classifications:
+                self._remember(article.article_title, is_musical_artist)
+        super().store_many(classifications)
+
+    def delete_many(self, titles: Iterable[str]) -> None:
+        # The Bloom filter cannot forget, but its false positives fall through to Redis anyway
+        titles = list(titles)
+        with self._lock:
+            for title in titles:
+                self._local.pop(title, None)
+        super().delete_many(titles)
+
+    def retrieve_classification(self, article: WikipediaArticle) -> bool:
+        return self.retrieve_many([article])[0]
+
+    def retrieve_many(self, articles: List[WikipediaArticle]) -> List[Optional[bool]]:
+        classifications: List[Optional[bool]] = [None] * len(articles)
+        remote_positions = []
+        with self._lock:
+            for position, article in enumerate(articles):
+                title = article.article_title
+                if title not in self.seen_titles:
+                    self.bloom_negatives += 1
+                elif title in self._local:
+                    self._local.move_to_end(title)
+                    classifications[position] = self._local[title]
+                    self.local_hits += 1
+                else:
+                    remote_positions.append(position)
+
+        if remote_positions:
+            remote_classifications = super().retrieve_many([articles[position] for position in remote_positions])
+            with self._lock:
+                for position, classification in zip(remote_positions, remote_classifications):
+                    classifications[position] = classification
+                    if classification is None:
+                        self.redis_misses += 1
+                    else:
+                        self.redis_hits += 1
+                        self._remember(articles[position].article_title, classification, add_to_filter=False)
+        return classifications
+
+    def _remember(self, title: str, is_musical_artist: bool, add_to_filter: bool = True) -> None:
+        # Called with the lock held
+        if add_to_filter:
+            self.seen_titles.add(title)
+        self._local[title] = bool(is_musical_artist)
+        self._local.move_to_end(title)
+        while len(self._local) > self.max_local_entries:
+            self._local.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: the number of lookups answered by each tier
+        """
+        with self._lock:
+            return {"bloom_negatives": self.bloom_negatives, "local_hits": self.local_hits,
+                    "redis_hits": self.redis_hits, "redis_misses": self.redis_misses,
+                    "local_entries": len(self._local)}
+
+    def __str__(self):
+        lookups = self.bloom_negatives + self.local_hits + self.redis_hits + self.redis_misses
+        tiers = [("bloom filter", self.bloom_negatives), ("local map", self.local_hits),
+                 ("redis", self.redis_hits), ("redis misses", self.redis_misses)]
+        return ", ".join(f'{name}: {count} ({count / lookups if lookups else 0.0:.2%})' for name, count in tiers) \
+            + f', local entries: {len(self._local)}/{self.max_local_entries}'
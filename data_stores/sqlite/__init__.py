@@ -1,11 +1,23 @@
 """
 Initialization of SQLite interfaces and project-specific methods.
+
+Run `python -m data_stores.sqlite` to build the index of the multistream archive. The index file is read one
+line at a time and written in batches, so memory use does not grow with the size of the archive.
 """
+import bz2
 import sqlite3
+from os import PathLike
+from os.path import getsize
+from time import monotonic
+from typing import IO, Iterator, Tuple
+
+from config import WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE, SQLITE_ARCHIVE_INDEX_FILE, make_logger
 
-import pandas
+logger = make_logger(__name__)
 
-from config import WIKIPEDIA_INDEX_FILE, SQLITE_ARCHIVE_INDEX_FILE
+# Trades durability for speed while building; a build that dies part way is simply rerun
+BUILD_PRAGMAS = ["PRAGMA journal_mode = OFF", "PRAGMA synchronous = OFF", "PRAGMA temp_store = MEMORY",
+                 "PRAGMA cache_size = -262144", "PRAGMA locking_mode = EXCLUSIVE"]
 
 
 def parse_colons(s):
@@ -18,42 +30,85 @@ def parse_colons(s):
     return [portions[0], portions[1], s[len(portions[0]) + len(portions[1]) + 2:len(s)]]
 
 
-if __name__ == "__main__":
-
-    indices = pandas.read_csv(WIKIPEDIA_INDEX_FILE, delimiter="|", names=["byte:id:title"])
-    print("Done reading from csv")
-    indices_values = indices.iloc[:, 0]
-    row_values = []
-    for i in range(len(indices_values)):
-        if i % 100000 == 0:
-            print(i)
-        line = indices_values[i]
-        row_values.append(parse_colons(line))
+def open_index(index_path: PathLike) -> IO[str]:
+    """
+    :param index_path: the archive's index file, either as distributed (.txt.bz2) or decompressed
+    :return: the index file opened as text
+    """
+    if str(index_path).endswith(".bz2"):
+        return bz2.open(index_path, "rt", encoding="utf-8")
+    return open(index_path, "r", encoding="utf-8")
 
-    print("done formatting data")
 
-    # finding the next byte to read to (-1 if it should read to end of file)
-    byte_values = list(set([val[0] for val in row_values]))
-    byte_values.sort()
-    byte_dict = {}
-    for i, byte in enumerate(byte_values):
-        byte_dict[byte] = byte_values[min(len(byte_values) - 1, i + 1)]
-        if byte_dict[byte] == byte:
-            byte_dict[byte] = -1
+def iter_index_rows(index_file: IO[str], archive_size: int) -> Iterator[Tuple[int, int, str, int]]:
+    """
+    Parses the index one line at a time. The index lists streams in offset order, so the end of a stream is known as
+    soon as the first line of the next one is read; only the ~100 rows of the current stream are ever held.
+    :param index_file: the open index file, with lines of the form offset:page_id:title
+    :param archive_size: the size of the archive in bytes, which is where the last stream ends
+    :return: an iterator of the first byte, page id, title, and last byte of every indexed page
+    """
+    stream_start, stream_rows = None, []
+    for line in index_file:
+        first_byte, page_id, title = parse_colons(line.rstrip("\n"))
+        first_byte = int(first_byte)
+        if first_byte != stream_start:
+            if stream_start is not None and first_byte < stream_start:
+                raise ValueError(f'Index is not in offset order: {first_byte} follows {stream_start}')
+            for row in stream_rows:
+                yield row[0], row[1], row[2], first_byte
+            stream_start, stream_rows = first_byte, []
+        stream_rows.append((first_byte, int(page_id), title))
+    for row in stream_rows:
+        yield row[0], row[1], row[2], archive_size
 
-    for row in row_values:
-        row.append(byte_dict[row[0]])
 
-    articles = pandas.DataFrame(row_values, columns=["first_byte", "page_id", "title", "last_byte"])
+def build_archive_index(index_path: PathLike = WIKIPEDIA_INDEX_FILE, archive_path: PathLike = WIKIPEDIA_ARCHIVE_FILE,
+                        db_path: PathLike = SQLITE_ARCHIVE_INDEX_FILE, batch_size: int = 100000,
+                        report_every: int = 1000000) -> int:
+    """
+    (Re)builds the articles table: one row of integer offsets and page id per title. The title and page id indexes
+    are created after all rows are loaded, which is much faster than maintaining them during the inserts.
+    :param index_path: the archive's index file
+    :param archive_path: the archive itself, whose size ends the last stream
+    :param db_path: the SQLite database to write the articles table to
+    :param batch_size: the number of rows inserted at a time
+    :param report_every: the number of rows between progress reports
+    :return: the number of rows written
+    """
+    archive_size = getsize(archive_path)
+    conn = sqlite3.connect(db_path)
+    for pragma in BUILD_PRAGMAS:
+        conn.execute(pragma)
+    conn.execute("DROP TABLE IF EXISTS articles")
+    conn.execute("CREATE TABLE articles (first_byte INTEGER, page_id INTEGER, title TEXT, last_byte INTEGER)")
 
-    conn = sqlite3.connect(SQLITE_ARCHIVE_INDEX_FILE)
-    cursor = conn.cursor()
-    cursor.execute("DROP TABLE IF EXISTS articles;")
+    started = monotonic()
+    row_count, batch = 0, []
+    with open_index(index_path) as index_file:
+        for row in iter_index_rows(index_file, archive_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                conn.executemany("INSERT INTO articles VALUES (?, ?, ?, ?)", batch)
+                row_count, batch = row_count + len(batch), []
+                if row_count % report_every < batch_size:
+                    _report_progress(row_count, row[0], archive_size, started)
+        conn.executemany("INSERT INTO articles VALUES (?, ?, ?, ?)", batch)
+        row_count += len(batch)
     conn.commit()
-    # cursor.execute('CREATE TABLE articles (first_byte, page_id, title, last_byte)')
-    articles.to_sql("articles", conn)
-    conn.commit()
-    cursor.execute("CREATE INDEX articles_id_idx ON articles (page_id);")
-    cursor.execute("CREATE INDEX articles_title_idx ON articles (title);")
+    _report_progress(row_count, archive_size, archive_size, started)
+
+    logger.info("Creating indexes...")
+    conn.execute("CREATE INDEX articles_id_idx ON articles (page_id)")
+    conn.execute("CREATE INDEX articles_title_idx ON articles (title)")
     conn.commit()
     conn.close()
+    logger.info(f'Built the index of {row_count} articles in {monotonic() - started:.1f}s')
+    return row_count
+
+
+def _report_progress(row_count: int, archive_position: int, archive_size: int, started: float) -> None:
+    elapsed = max(monotonic() - started, 1e-9)
+    logger.info(f'{row_count} rows ({archive_position / archive_size:.1%} of the archive) in {elapsed:.1f}s, '
+                f'{row_count / elapsed:.0f} rows/s')
+
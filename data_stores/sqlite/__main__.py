@@ -0,0 +1,21 @@
+"""
+Builds the SQLite index of the multistream archive. Run `python -m data_stores.sqlite`.
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+
+from config import SQLITE_ARCHIVE_INDEX_FILE, WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE
+from data_stores.sqlite import build_archive_index
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--index", type=Path, default=WIKIPEDIA_INDEX_FILE,
+                            help="the archive's index file (.txt or .txt.bz2)")
+    arg_parser.add_argument("--archive", type=Path, default=WIKIPEDIA_ARCHIVE_FILE,
+                            help="the multistream archive the index belongs to")
+    arg_parser.add_argument("--output", type=Path, default=SQLITE_ARCHIVE_INDEX_FILE,
+                            help="the SQLite database to write")
+    arg_parser.add_argument("--batch-size", type=int, default=100000,
+                            help="rows inserted per batch")
+    args = arg_parser.parse_args()
+    build_archive_index(args.index, args.archive, args.output, batch_size=args.batch_size)
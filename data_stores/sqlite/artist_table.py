@@ -0,0 +1,166 @@
+"""
+Persistent table of article classifications, built by a single sequential pass over the whole archive.
+
+Once built, the search can classify any link with one lookup and without decompressing anything, and the table is
+reused by every later run (unlike the Redis cache, which is cleared at the start of each search).
+
+Run `python -m data_stores.sqlite.artist_table` to build it.
+"""
+import json
+import sqlite3
+from argparse import ArgumentParser
+from os import PathLike
+from typing import Dict, Iterable, Iterator, List
+
+from config import SQLITE_ARTIST_TABLE_FILE, WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE, LOG_UPDATE_SEARCH_EVERY, \
+    EXTRACTION_WORKERS, make_logger
+from wikipedia.models import ClassifiedPage
+from wikipedia.pages import iter_pages
+from wikipedia.parallel import ParallelExtractor
+from wikipedia.reader import WikipediaArchiveSearcher, classify_page
+
+logger = make_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (page_id INTEGER PRIMARY KEY, title TEXT NOT NULL,
+                                            is_artist INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS artist_pages (page_id INTEGER PRIMARY KEY, links TEXT NOT NULL, infobox TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS build_state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class ArtistTable:
+    """
+    SQLite store of page_id -> is_artist for every page in the archive, plus the outgoing links and infobox of
+    every artist page.
+    """
+
+    def __init__(self, path: PathLike = SQLITE_ARTIST_TABLE_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def clear(self) -> None:
+        """
+        Drop every stored page (called only before rebuilding the table).
+        """
+        self._conn.executescript("""
+            DROP INDEX IF EXISTS classifications_title_idx;
+            DROP TABLE IF EXISTS classifications;
+            DROP TABLE IF EXISTS artist_pages;
+            DROP TABLE IF EXISTS build_state;
+        """ + SCHEMA)
+        self._conn.commit()
+
+    def is_complete(self) -> bool:
+        """
+        :return: whether a full pass over the archive has finished writing to this table
+        """
+        row = self._conn.execute("SELECT value FROM build_state WHERE key = 'archive'").fetchone()
+        return row is not None
+
+    def store_pages(self, pages: Iterable[ClassifiedPage]) -> None:
+        """
+        Store the classification of many pages, and the links and infobox of those that are musical artists.
+        :param pages: the analyzed pages to store
+        """
+        pages = list(pages)
+        self._conn.executemany("INSERT OR REPLACE INTO classifications VALUES (?, ?, ?)",
+                               [(page.page_id, page.title, int(page.is_musical_artist)) for page in pages])
+        self._conn.executemany("INSERT OR REPLACE INTO artist_pages VALUES (?, ?, ?)",
+                               [(page.page_id, json.dumps(page.link_titles), json.dumps(page.infobox))
+                                for page in pages if page.is_musical_artist])
+
+    def finish_build(self, archive_path: PathLike) -> None:
+        """
+        Index the stored pages by title and mark the table as complete.
+        :param archive_path: the archive the table was built from
+        """
+        self._conn.execute("CREATE INDEX IF NOT EXISTS classifications_title_idx ON classifications (title);")
+        self._conn.execute("INSERT OR REPLACE INTO build_state VALUES ('archive', ?)", (str(archive_path),))
+        self._conn.commit()
+
+    def retrieve_pages(self, titles: Iterable[str], batch_size: int = 900) -> Dict[str, ClassifiedPage]:
+        """
+        Look up many titles at once.
+        :param titles: the titles of the articles in question
+        :param batch_size: the number of titles bound into each query (SQLite caps the number of parameters)
+        :return: a mapping from each title found in the table to its analyzed page
+        """
+        titles = list(dict.fromkeys(titles))
+        pages = {}
+        for batch_start in range(0, len(titles), batch_size):
+            batch = titles[batch_start:batch_start + batch_size]
+            placeholders = ", ".join("?" * len(batch))
+            rows = self._conn.execute(f"""
+                SELECT c.page_id, c.title, c.is_artist, a.links, a.infobox
+                FROM classifications c LEFT JOIN artist_pages a ON a.page_id = c.page_id
+                WHERE c.title IN ({placeholders})""", batch).fetchall()
+            for page_id, title, is_artist, links, infobox in rows:
+                pages[title] = ClassifiedPage(page_id=page_id, title=title, is_musical_artist=bool(is_artist),
+                                              link_titles=json.loads(links) if links else [],
+                                              infobox=json.loads(infobox) if infobox else {})
+        return pages
+
+
+def build_artist_table(searcher: WikipediaArchiveSearcher, table: ArtistTable, commit_every: int = 100,
+                       extractor: ParallelExtractor = None) -> None:
+    """
+    Classify every page of the archive in one pass and store the results.
+    :param searcher: the searcher whose archive should be read
+    :param table: the table to (re)build
+    :param commit_every: the number of streams to store between commits
+    :param extractor: an optional pool of workers to spread the pass across; without one the archive is read and
+                      analyzed sequentially in this process
+    """
+    table.clear()
+    page_count = artist_count = 0
+    for stream_count, pages in enumerate(_iter_classified_streams(searcher, extractor), start=1):
+        table.store_pages(pages)
+
+        previous_page_count = page_count
+        page_count += len(pages)
+        artist_count += sum(page.is_musical_artist for page in pages)
+        if stream_count % commit_every == 0:
+            table.commit()
+        if page_count // LOG_UPDATE_SEARCH_EVERY != previous_page_count // LOG_UPDATE_SEARCH_EVERY:
+            logger.info(f'Classified {page_count} pages ({artist_count} artists) in {stream_count} streams...')
+
+    table.finish_build(searcher.multistream_path)
+    logger.info(f'Finished classifying {page_count} pages ({artist_count} artists)')
+
+
+def _iter_classified_streams(searcher: WikipediaArchiveSearcher,
+                             extractor: ParallelExtractor = None) -> Iterator[List[ClassifiedPage]]:
+    if extractor is not None:
+        yield from extractor.iter_archive(searcher.stream_ranges())
+        return
+    for start_index, end_index, xml_block in searcher.iter_streams():
+        yield [classify_page(page_xml, page_id) for page_id, page_xml in iter_pages(xml_block)]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the table even if a complete one exists")
+    parser.add_argument("--workers", type=int, default=EXTRACTION_WORKERS,
+                        help="worker processes to spread the pass across (1 reads the archive sequentially)")
+    args = parser.parse_args()
+
+    artist_table = ArtistTable()
+    if artist_table.is_complete() and not args.rebuild:
+        logger.info(f'{SQLITE_ARTIST_TABLE_FILE} is already complete; pass --rebuild to build it again')
+    else:
+        with WikipediaArchiveSearcher(multistream_path=WIKIPEDIA_ARCHIVE_FILE,
+                                      index_path=WIKIPEDIA_INDEX_FILE) as searcher:
+            if args.workers > 1:
+                with ParallelExtractor(WIKIPEDIA_ARCHIVE_FILE, workers=args.workers) as extractor:
+                    build_artist_table(searcher, artist_table, extractor=extractor)
+            else:
+                build_artist_table(searcher, artist_table)
+    artist_table.close()
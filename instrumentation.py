@@ -0,0 +1,190 @@
+"""
+Lightweight instrumentation of the search's hot paths, kept in the process-wide `metrics` object.
+
+Stages are timed where the search spends its time, each with a count of the items it went through:
+  - `index_lookup` (titles), `artist_table` (titles): finding articles in the SQLite or title index, or artist table
+  - `decompress` (decompressed bytes): reading streams out of the memory-mapped archive and decompressing them
+  - `parse` (pages), `parallel_extract` (pages): analyzing pages, in process or on the extractor's workers
+  - `redis_read`, `redis_write` (titles): the classification cache
+  - `neo4j_read`, `neo4j_write` (nodes and edges): the graph
+  - `fetch`, `write` (windows): the two stages of the pipelined search
+Counters (`articles_expanded`, `links_seen`, `edges_found`) and gauges (`nodes`, `frontier`) follow the search itself.
+
+A measurement is two perf_counter calls and an addition under a lock, made once per article, batch, or stream rather
+than once per link, so the instrumentation is cheap enough to leave on. report_if_due logs a summary and writes the
+stats file at most once every `every` seconds: as JSON, or in the Prometheus text format if its name ends in `.prom`
+(for node_exporter's textfile collector).
+"""
+from __future__ import annotations
+import json
+from os import PathLike, replace
+from pathlib import Path
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Any, Dict, Optional
+
+from config import SEARCH_STATS_FILE, STATS_EVERY_SECONDS, make_logger
+
+logger = make_logger(__name__)
+
+PROMETHEUS_PREFIX = "wikipedia_search"
+# Throughputs reported as rates over the whole run: (name, counter or stage, whether it is a stage's items)
+RATES = [("articles_per_second", "articles_expanded", False), ("links_per_second", "links_seen", False),
+         ("bytes_decompressed_per_second", "decompress", True)]
+
+
+class StageStats:
+    """
+    The running totals of one stage.
+    """
+    __slots__ = ("calls", "seconds", "items")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.items = 0
+
+
+class StageTimer:
+    """
+    Times a block as one call of a stage: `with metrics.time("parse"): ...`
+    """
+    __slots__ = ("metrics", "stage", "items", "started")
+
+    def __init__(self, metrics: Metrics, stage: str, items: int):
+        self.metrics = metrics
+        self.stage = stage
+        self.items = items
+
+    def __enter__(self) -> StageTimer:
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.metrics.record(self.stage, perf_counter() - self.started, self.items)
+
+
+class Metrics:
+    """
+    Timers and item counts per stage, plus counters and gauges, shared by every thread of the process.
+    """
+
+    def __init__(self, path: PathLike = SEARCH_STATS_FILE, every: float = STATS_EVERY_SECONDS):
+        """
+        :param path: the stats file written by report (JSON, or Prometheus text format for a .prom file)
+        :param every: the least number of seconds between reports made by report_if_due; 0 never reports
+        """
+        self.path = Path(path)
+        self.every = every
+        self._lock = Lock()
+        self._report_lock = Lock()  # reports may be due on the fetch and writer threads of the pipeline at once
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget every measurement and restart the clock.
+        """
+        with self._lock:
+            self.stages: Dict[str, StageStats] = {}
+            self.counters: Dict[str, int] = {}
+            self.gauges: Dict[str, float] = {}
+            self.started = monotonic()
+            self._last_report = self.started
+
+    def time(self, stage: str, items: int = 1) -> StageTimer:
+        """
+        :param stage: the stage the timed block belongs to
+        :param items: the number of items the block goes through
+        :return: a context manager that records the block as one call of the stage
+        """
+        return StageTimer(self, stage, items)
+
+    def record(self, stage: str, seconds: float, items: int = 1) -> None:
+        """
+        Record one call of a stage, for blocks whose item count is only known at the end.
+        """
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.items += items
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: every measurement so far, with the share of the run each stage took and the throughput rates
+        """
+        with self._lock:
+            uptime = max(monotonic() - self.started, 1e-9)
+            stages = {stage: {"calls": stats.calls, "seconds": round(stats.seconds, 6), "items": stats.items,
+                              "items_per_second": round(stats.items / stats.seconds, 3) if stats.seconds else 0.0,
+                              "share_of_run": round(stats.seconds / uptime, 4)}
+                      for stage, stats in self.stages.items()}
+            rates = {name: round((self.stages[source].items if source in self.stages else 0) / uptime
+                                 if is_stage else self.counters.get(source, 0) / uptime, 3)
+                     for name, source, is_stage in RATES}
+            return {"uptime_seconds": round(uptime, 3), "stages": stages, "counters": dict(self.counters),
+                    "gauges": dict(self.gauges), "rates": rates}
+
+    def summary(self, snapshot: Optional[Dict[str, Any]] = None) -> str:
+        """
+        :return: a one-line report of the rates and of the stages that took the most time
+        """
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        rates = ", ".join(f'{name.replace("_per_second", "")}/s {rate:.1f}' for name, rate in snapshot["rates"].items())
+        stages = sorted(snapshot["stages"].items(), key=lambda item: -item[1]["seconds"])
+        busiest = ", ".join(f'{stage} {stats["seconds"]:.1f}s ({stats["share_of_run"]:.0%})' for stage, stats in stages)
+        return f'{snapshot["uptime_seconds"]:.0f}s in: {rates}; time by stage: {busiest or "none yet"}'
+
+    def report_if_due(self) -> None:
+        """
+        Report if the last report is at least `every` seconds old. Cheap enough to call on every article.
+        """
+        if self.every > 0 and monotonic() - self._last_report >= self.every:
+            self.report()
+
+    def report(self) -> None:
+        """
+        Log a summary and write the stats file now.
+        """
+        with self._report_lock:
+            self._last_report = monotonic()
+            snapshot = self.snapshot()
+            logger.info(f'Search stats: {self.summary(snapshot)}')
+            temporary_path = self.path.with_name(self.path.name + ".tmp")
+            with open(temporary_path, "w", encoding="utf-8") as stats_file:
+                if self.path.suffix == ".prom":
+                    stats_file.write(prometheus_text(snapshot))
+                else:
+                    json.dump(snapshot, stats_file, indent=2)
+            replace(temporary_path, self.path)  # so that scrapers never see a half-written file
+
+
+def prometheus_text(snapshot: Dict[str, Any]) -> str:
+    """
+    :param snapshot: a snapshot from Metrics.snapshot
+    :return: the snapshot in the Prometheus text exposition format
+    """
+    lines = [f'# TYPE {PROMETHEUS_PREFIX}_uptime_seconds gauge',
+             f'{PROMETHEUS_PREFIX}_uptime_seconds {snapshot["uptime_seconds"]}']
+    for field in ["calls", "seconds", "items"]:
+        metric = f'{PROMETHEUS_PREFIX}_stage_{field}_total'
+        lines.append(f'# TYPE {metric} counter')
+        lines.extend(f'{metric}{{stage="{stage}"}} {stats[field]}' for stage, stats in snapshot["stages"].items())
+    for counter, value in snapshot["counters"].items():
+        lines += [f'# TYPE {PROMETHEUS_PREFIX}_{counter}_total counter', f'{PROMETHEUS_PREFIX}_{counter}_total {value}']
+    for name, value in list(snapshot["gauges"].items()) + list(snapshot["rates"].items()):
+        lines += [f'# TYPE {PROMETHEUS_PREFIX}_{name} gauge', f'{PROMETHEUS_PREFIX}_{name} {value}']
+    return "\n".join(lines) + "\n"
+
+
+# Shared by every module and thread of the process
+metrics = Metrics()
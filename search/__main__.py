@@ -2,93 +2,179 @@
 Controller module for generation of Neo4J data store entries modeling graphical relationships between
 members of the music industry on Wikipedia.
 """
-from config import WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE, make_logger, COOL_ASCII_ART_HEADER, \
-    LOG_UPDATE_SEARCH_EVERY
+from argparse import ArgumentParser
+from config import CHECKPOINT_EVERY_SECONDS, SEARCH_STATS_FILE, STATS_EVERY_SECONDS, WIKIPEDIA_ARCHIVE_FILE, \
+    WIKIPEDIA_INDEX_FILE, make_logger, COOL_ASCII_ART_HEADER
 from datetime import datetime
+from pathlib import Path
 from data_stores.neo_4j.article_node import ArticleNode
+from data_stores.neo_4j.async_writer import AsyncBulkGraphWriter
+from data_stores.neo_4j.graph_writer import ArticleNodeWriter, BulkGraphWriter
+from data_stores.neo_4j.offline_export import OfflineGraphExporter
 from data_stores.redis_.article_cache import ArticleCache
+from data_stores.redis_.async_cache import AsyncArticleCache
+from data_stores.redis_.tiered_cache import TieredArticleCache
+from data_stores.sqlite.artist_table import ArtistTable
+from instrumentation import metrics
+from search.bfs import search_by_link, search_by_stream
+from search.checkpoint import SearchCheckpoint
+from search.crawler import DEFAULT_CONCURRENCY, AsyncCrawler
+from search.frontier import Frontier, SearchBudget
+from search.pipeline import DEFAULT_WINDOW, PipelinedSearch
 from search.seed_artists import SEED_LIST
+from wikipedia.parallel import ParallelExtractor
 from wikipedia.reader import WikipediaArchiveSearcher
+from wikipedia.title_index import RedirectTable, TitleIndex
 
 logger = make_logger(__name__)
 
+
 if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--schedule", choices=["link", "stream", "pipeline", "async"], default="link",
+                            help="read unclassified links one at a time, grouped by archive stream, grouped by "
+                                 "stream with fetching overlapped with a single writer stage, or with several "
+                                 "articles expanded at once on an asyncio event loop")
+    arg_parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                            help="articles expanded ahead of the one being written by --schedule async")
+    arg_parser.add_argument("--window", type=int, default=0,
+                            help="frontier articles expanded together by --schedule stream/pipeline (0 for a whole "
+                                 f"level with stream, {DEFAULT_WINDOW} with pipeline)")
+    arg_parser.add_argument("--prefetch", type=int, default=2,
+                            help="fetched windows allowed to wait for the writer stage of --schedule pipeline")
+    arg_parser.add_argument("--artist-table", action="store_true",
+                            help="classify articles from the table built by data_stores.sqlite.artist_table instead "
+                                 "of decompressing them")
+    arg_parser.add_argument("--local-cache", action="store_true",
+                            help="answer classification lookups from an in-process Bloom filter and map before "
+                                 "going to Redis")
+    arg_parser.add_argument("--graph-writer", choices=["bulk", "node", "offline"], default="bulk",
+                            help="write the graph to Neo4J in buffered UNWIND/MERGE batches or node by node, or "
+                                 "export it to neo4j-admin import CSVs and a CSR adjacency file without Neo4J")
+    arg_parser.add_argument("--workers", type=int, default=1,
+                            help="worker processes decompressing and parsing each window of --schedule "
+                                 "stream/pipeline")
+    arg_parser.add_argument("--title-index", action="store_true",
+                            help="look up article locations in the memory-mapped index built by "
+                                 "`python -m wikipedia.title_index` instead of the SQLite index")
+    arg_parser.add_argument("--redirects", action="store_true",
+                            help="follow links to redirect pages to their targets using the redirect table built by "
+                                 "`python -m wikipedia.title_index --redirects`")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="continue from the last checkpoint without clearing Neo4J or Redis")
+    arg_parser.add_argument("--checkpoint-every", type=float, default=CHECKPOINT_EVERY_SECONDS,
+                            help="seconds between checkpoints of the search's frontier (0 to only save at the end)")
+    arg_parser.add_argument("--max-depth", type=int, default=None,
+                            help="only expand articles at most this many links away from the seeds")
+    arg_parser.add_argument("--max-nodes", type=int, default=None,
+                            help="stop once the search has found this many nodes")
+    arg_parser.add_argument("--max-seconds", type=float, default=None,
+                            help="stop once the search has run for this many seconds")
+    arg_parser.add_argument("--priority", action="store_true",
+                            help="expand the articles with the most in-links found so far first, instead of in "
+                                 "breadth-first order (within each level with --schedule pipeline)")
+    arg_parser.add_argument("--defer-infobox", action="store_true",
+                            help="parse each artist's infobox only when its node is written, rather than when the "
+                                 "article is read (pages parsed by --workers are unaffected)")
+    arg_parser.add_argument("--stats-file", type=Path, default=SEARCH_STATS_FILE,
+                            help="where the timings, counters, and throughputs of the search are written (JSON, or "
+                                 "the Prometheus text format if the name ends in .prom)")
+    arg_parser.add_argument("--stats-every", type=float, default=STATS_EVERY_SECONDS,
+                            help="seconds between summaries of the search's stats (0 to only report at the end)")
+    args = arg_parser.parse_args()
+
     logger.info(COOL_ASCII_ART_HEADER)
     logger.info(f'Run @ {datetime.now()}')
+    metrics.path, metrics.every = args.stats_file, args.stats_every
+    metrics.reset()
+    if args.resume and args.graph_writer == "offline":
+        logger.info(f'--resume needs a graph writer that keeps the graph found so far; the offline export does not.')
+        exit(1)
+    if args.schedule == "async" and (args.resume or args.local_cache or args.graph_writer == "node"):
+        logger.info(f'--schedule async keeps no checkpoints and works with neither --local-cache nor '
+                    f'--graph-writer node.')
+        exit(1)
+    checkpoint = SearchCheckpoint(every=args.checkpoint_every)
+    if args.resume and not checkpoint.path.exists():
+        logger.info(f'There is no checkpoint to resume from at {checkpoint.path}.')
+        exit(1)
+
+    artist_table = None
+    if args.artist_table:
+        artist_table = ArtistTable()
+        if not artist_table.is_complete():
+            logger.info(f'The artist table is incomplete; run `python -m data_stores.sqlite.artist_table` first.')
+            exit(1)
+
+    extractor = None
+    if args.workers > 1:
+        extractor = ParallelExtractor(WIKIPEDIA_ARCHIVE_FILE, workers=args.workers)
+
+    title_index = TitleIndex() if args.title_index else None
+    redirects = RedirectTable() if args.redirects else None
+    cache = TieredArticleCache() if args.local_cache else ArticleCache()
+
     logger.info("Initializing Wikipeda Archive searcher...")
     wikipedia_searcher = WikipediaArchiveSearcher(multistream_path=WIKIPEDIA_ARCHIVE_FILE,
-                                                  index_path=WIKIPEDIA_INDEX_FILE)
-    
-    ArticleNode.clear()
-    
-    logger.info("Constructing the seed list...")
-    search_queue = []
-
-    for artist in SEED_LIST:
-        wikipedia_searcher.retrieve_article_xml(artist)
-        ArticleNode.add_node(artist)
-        search_queue.append(artist)
+                                                  index_path=WIKIPEDIA_INDEX_FILE, artist_table=artist_table,
+                                                  extractor=extractor, cache=cache, title_index=title_index,
+                                                  redirects=redirects, defer_infobox=args.defer_infobox)
 
-    logger.info("Initializing search cache...")
-    cache = ArticleCache()
-    cache.clear()
+    if args.graph_writer == "offline":
+        graph_writer = OfflineGraphExporter()
+    else:
+        if not args.resume:
+            ArticleNode.clear()
+        if args.schedule == "async":
+            graph_writer = AsyncBulkGraphWriter()
+        else:
+            graph_writer = BulkGraphWriter() if args.graph_writer == "bulk" else ArticleNodeWriter()
 
-    # Handle termination of search
-    counter = len(search_queue)
-    continue_search = True
-    
-    logger.info("Starting the breadth-first search of Wikipedia")
-    while continue_search:
-        try:
-            if counter % LOG_UPDATE_SEARCH_EVERY == 0:
-                logger.info(f'Search has reached {counter} nodes...')
-            
-            current_article = search_queue.pop(0)
-            links = current_article.outgoing_links
-            logger.info(f'\tCurrent article: {current_article.article_title}\n\tOutgoing links: {len(links)}')
-    
-            if links is None:
-                '''
-                Occurs when cache.retrieve_classification(current_article) gave true on a previous iteration,
-                but current_article has no links object because process_page has not been run on current_article.
-                This only occurs when current_article has the same title but is a different instance of WikipediaArticle
-                as a previously searched Wikipedia article.
-                TL;DR: This will only occur if we have seen this article before, so we don't need to process it.
-                '''
-                continue_search = len(search_queue) != 0
-                continue
-    
-            for linked_article in links:
-                # try to retrieve classification
-                stored_classification = cache.retrieve_classification(linked_article)
-                if stored_classification is not None:
-                    # avoid re-classifying articles w/ stored classifications
-                    link_is_musical_artist = stored_classification
-                else:
-                    try:
-                        wikipedia_searcher.retrieve_article_xml(linked_article)
-                        link_is_musical_artist = cache.retrieve_classification(linked_article)
-                    except WikipediaArchiveSearcher.ArticleNotFoundError:
-                        link_is_musical_artist = False
-                        
-                # Add to data store if classification comes back true
-                if link_is_musical_artist:
-                    logger.info(f'Creating edge: {current_article.article_title} -> {linked_article}')
-                    node_is_new = stored_classification is None
-                    linked_article_node = ArticleNode.add_node(linked_article)  # gets existing or adds new if none exists
-                    # check if node has been seen before adding to search queue
-                    if node_is_new:
-                        counter += 1
-                        search_queue.append(linked_article)
-                    # add an edge between current article and its outgoing link
-                    # get node for current artist and add edge between it and linked article
-                    current_article_node = ArticleNode.retrieve_node(current_article)
-                    ArticleNode.add_edge(current_article_node, linked_article_node)
-                    
-            continue_search = len(search_queue) != 0
-        except KeyboardInterrupt as e:
-            logger.info(f'Received keyboard interrupt — hard stop for search.')
-            exit()
+    search_queue = Frontier(max_depth=args.max_depth, priority=args.priority)
+    if args.resume:
+        logger.info("Restoring the search from its last checkpoint...")
+        checkpoint.load()
+        checkpoint.repair_cache(cache)
+        if isinstance(cache, TieredArticleCache):
+            cache.warm()
+        search_queue.extend(checkpoint.restore_frontier(wikipedia_searcher))
+    else:
+        logger.info("Constructing the seed list...")
 
+        for artist in SEED_LIST:
+            wikipedia_searcher.retrieve_article_xml(artist)
+            graph_writer.add_node(artist)
+            search_queue.push(artist)
 
+        logger.info("Initializing search cache...")
+        cache.clear()
+        if args.schedule != "async":
+            checkpoint.start(search_queue, graph_writer)
 
+    budget = SearchBudget(max_nodes=args.max_nodes, max_seconds=args.max_seconds)
+    logger.info(f'Starting the breadth-first search of Wikipedia ({args.schedule} schedule)')
+    try:
+        if args.schedule == "pipeline":
+            PipelinedSearch(wikipedia_searcher, cache, graph_writer,
+                            window=args.window if args.window > 0 else DEFAULT_WINDOW,
+                            prefetch=args.prefetch, checkpoint=checkpoint, budget=budget).run(search_queue)
+        elif args.schedule == "async":
+            AsyncCrawler(wikipedia_searcher, AsyncArticleCache(), graph_writer, concurrency=args.concurrency,
+                         budget=budget).run(search_queue)
+        elif args.schedule == "stream":
+            search_by_stream(wikipedia_searcher, cache, search_queue, graph_writer, window=args.window,
+                             checkpoint=checkpoint, budget=budget)
+        else:
+            search_by_link(wikipedia_searcher, cache, search_queue, graph_writer, checkpoint=checkpoint,
+                           budget=budget)
+    except KeyboardInterrupt as e:
+        logger.info(f'Received keyboard interrupt — saving a checkpoint and stopping the search.')
+        # Saved before the graph writer is closed, from the last point where no article was half expanded
+        checkpoint.save_interrupted(graph_writer)
+        exit()
+    finally:
+        graph_writer.close()
+        if extractor is not None:
+            extractor.close()
+        wikipedia_searcher.close()
+        metrics.report()
@@ -0,0 +1,246 @@
+"""
+Breadth-first search of Wikipedia for musical artists, recording the links between them in Neo4J.
+"""
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+from config import LOG_UPDATE_SEARCH_EVERY, make_logger
+from data_stores.neo_4j.graph_writer import ArticleNodeWriter, BulkGraphWriter
+from data_stores.neo_4j.offline_export import OfflineGraphExporter
+from data_stores.redis_.article_cache import ArticleCache
+from data_stores.redis_.tiered_cache import TieredArticleCache
+from instrumentation import metrics
+from search.checkpoint import SearchCheckpoint
+from search.frontier import Frontier, SearchBudget
+from wikipedia.models import WikipediaArticle
+from wikipedia.reader import WikipediaArchiveSearcher
+
+logger = make_logger(__name__)
+
+GraphWriter = Union[ArticleNodeWriter, BulkGraphWriter, OfflineGraphExporter]
+
+
+def link_article(current_article: WikipediaArticle, linked_article: WikipediaArticle,
+                 link_is_musical_artist: bool, node_is_new: bool, search_queue: Frontier,
+                 graph_writer: GraphWriter, visited: Optional[Set[str]] = None) -> int:
+    """
+    Records a classified outgoing link in the graph, queueing the linked article if it has not been seen before.
+    :param current_article: the article being expanded
+    :param linked_article: the article it links to
+    :param link_is_musical_artist: the classification of the linked article
+    :param node_is_new: whether the linked article was classified for the first time by this link
+    :param search_queue: the frontier of articles left to expand
+    :param graph_writer: the writer recording the graph
+    :param visited: the titles of every article queued so far, kept up to date for checkpoints if given
+    :return: the number of new nodes added to the search
+    """
+    # Add to data store if classification comes back true
+    if not link_is_musical_artist:
+        return 0
+    metrics.count("edges_found")
+    logger.info(f'Creating edge: {current_article.article_title} -> {linked_article}')
+    graph_writer.add_node(linked_article)  # gets existing or adds new if none exists
+    # add an edge between current article and its outgoing link
+    graph_writer.add_edge(current_article, linked_article)
+    search_queue.record_link(linked_article.article_title)
+    # check if node has been seen before adding to search queue
+    if node_is_new:
+        if search_queue.push(linked_article, parent=current_article) and visited is not None:
+            visited.add(linked_article.article_title)
+        return 1
+    return 0
+
+
+def log_cache_stats(wikipedia_searcher: WikipediaArchiveSearcher) -> None:
+    """
+    Reports how well the caches in front of the archive and of Redis are doing.
+    :param wikipedia_searcher: the searcher whose caches should be reported
+    """
+    logger.info(f'Stream cache: {wikipedia_searcher.stream_cache}')
+    logger.info(f'Titles known to be missing from the archive: {len(wikipedia_searcher.missing_titles)}')
+    if isinstance(wikipedia_searcher.cache, TieredArticleCache):
+        logger.info(f'Classification cache: {wikipedia_searcher.cache}')
+
+
+def count_expansion(links: int, counter: int, search_queue: Frontier) -> None:
+    """
+    Records the expansion of an article in the search's metrics, and reports them if a report is due.
+    :param links: the number of outgoing links of the article
+    :param counter: the number of nodes found so far
+    :param search_queue: the frontier of articles left to expand
+    """
+    metrics.count("articles_expanded")
+    metrics.count("links_seen", links)
+    metrics.gauge("nodes", counter)
+    metrics.gauge("frontier", len(search_queue))
+    metrics.report_if_due()
+
+
+def search_counter(search_queue: Frontier, checkpoint: Optional[SearchCheckpoint]) -> int:
+    """
+    :return: the number of nodes the search has found, carried over from the checkpoint when resuming
+    """
+    if checkpoint is not None and "nodes" in checkpoint.counters:
+        return checkpoint.counters["nodes"]
+    return len(search_queue)
+
+
+def unfinished_frontier(expanding: Iterable[WikipediaArticle],
+                        search_queue: Frontier) -> List[Tuple[WikipediaArticle, int]]:
+    """
+    :param expanding: the articles popped from the frontier whose expansion has not finished
+    :param search_queue: the frontier of articles left to expand
+    :return: the articles left to expand and their depths, the unfinished articles first (see SearchCheckpoint.track)
+    """
+    return [(article, search_queue.depth_of(article)) for article in expanding] + list(search_queue.items())
+
+
+def stop_reason(budget: Optional[SearchBudget], counter: int) -> Optional[str]:
+    """
+    :return: why the search should stop (after logging it), or None if it may go on
+    """
+    reason = budget.exhausted(counter) if budget is not None else None
+    if reason is not None:
+        logger.info(f'Stopping the search with {counter} nodes: it {reason}')
+    return reason
+
+
+def search_by_link(wikipedia_searcher: WikipediaArchiveSearcher, cache: ArticleCache,
+                   search_queue: Frontier, graph_writer: GraphWriter, checkpoint: Optional[SearchCheckpoint] = None,
+                   budget: Optional[SearchBudget] = None) -> None:
+    """
+    Runs the breadth-first search one article and one outgoing link at a time, reading each unclassified link from
+    the archive in the order it appears.
+    :param wikipedia_searcher: the searcher used to read articles from the archive
+    :param cache: the cache of article classifications
+    :param search_queue: the frontier of articles left to expand, updated in place
+    :param graph_writer: the writer recording the graph
+    :param checkpoint: if given, the search's state is saved to it between articles
+    :param budget: if given, the search stops between articles once it is exhausted
+    """
+    # Handle termination of search
+    counter = search_counter(search_queue, checkpoint)
+    visited = checkpoint.visited if checkpoint is not None else None
+    continue_search = len(search_queue) != 0
+    current_article: Optional[WikipediaArticle] = None
+    if checkpoint is not None:
+        # Read when the search is interrupted: the article being expanded then is expanded again on resume
+        checkpoint.track(lambda: unfinished_frontier([current_article] if current_article is not None else [],
+                                                     search_queue),
+                         lambda: {"nodes": counter})
+
+    while continue_search:
+        if counter % LOG_UPDATE_SEARCH_EVERY == 0:
+            logger.info(f'Search has reached {counter} nodes...')
+            log_cache_stats(wikipedia_searcher)
+        if checkpoint is not None:
+            checkpoint.maybe_save(search_queue.items(), graph_writer, nodes=counter)
+        if stop_reason(budget, counter):
+            break
+
+        current_article = search_queue.pop()
+        links = current_article.outgoing_links
+
+        if links is None:
+            '''
+            Occurs when cache.retrieve_classification(current_article) gave true on a previous iteration,
+            but current_article has no links object because process_page has not been run on current_article.
+            This only occurs when current_article has the same title but is a different instance of WikipediaArticle
+            as a previously searched Wikipedia article.
+            TL;DR: This will only occur if we have seen this article before, so we don't need to process it.
+            '''
+            continue_search = len(search_queue) != 0
+            continue
+        logger.info(f'\tCurrent article: {current_article.article_title}\n\tOutgoing links: {len(links)}')
+        count_expansion(len(links), counter, search_queue)
+
+        # try to retrieve classifications (outgoing links are unique by title, so they can all be fetched up front)
+        for linked_article, stored_classification in zip(links, cache.retrieve_many(links)):
+            if stored_classification is not None:
+                # avoid re-classifying articles w/ stored classifications
+                link_is_musical_artist = stored_classification
+            else:
+                try:
+                    wikipedia_searcher.retrieve_article_xml(linked_article)
+                    link_is_musical_artist = cache.retrieve_classification(linked_article)
+                except WikipediaArchiveSearcher.ArticleNotFoundError:
+                    link_is_musical_artist = False
+
+            counter += link_article(current_article, linked_article, link_is_musical_artist,
+                                    node_is_new=stored_classification is None, search_queue=search_queue,
+                                    graph_writer=graph_writer, visited=visited)
+
+        current_article = None
+        continue_search = len(search_queue) != 0
+
+    if checkpoint is not None:
+        checkpoint.save(search_queue.items(), graph_writer, nodes=counter)
+
+
+def search_by_stream(wikipedia_searcher: WikipediaArchiveSearcher, cache: ArticleCache,
+                     search_queue: Frontier, graph_writer: GraphWriter, window: int = 0,
+                     checkpoint: Optional[SearchCheckpoint] = None, budget: Optional[SearchBudget] = None) -> None:
+    """
+    Runs the breadth-first search a window of frontier articles at a time. The unclassified outgoing links of the whole
+    window are looked up together, grouped by the archive stream holding them, and read in offset order so that each
+    stream is decompressed once per window. The graph is then updated in the same order as search_by_link would.
+    :param wikipedia_searcher: the searcher used to read articles from the archive
+    :param cache: the cache of article classifications
+    :param search_queue: the frontier of articles left to expand, updated in place
+    :param graph_writer: the writer recording the graph
+    :param window: the number of frontier articles to expand together; 0 expands a whole BFS level at a time
+    :param checkpoint: if given, the search's state is saved to it between windows
+    :param budget: if given, the search stops between windows once it is exhausted
+    """
+    counter = search_counter(search_queue, checkpoint)
+    visited = checkpoint.visited if checkpoint is not None else None
+    frontier: List[Tuple[WikipediaArticle, List[WikipediaArticle]]] = []
+    if checkpoint is not None:
+        # Read when the search is interrupted: the window being expanded then is expanded again on resume
+        checkpoint.track(lambda: unfinished_frontier((article for article, links in frontier), search_queue),
+                         lambda: {"nodes": counter})
+
+    while search_queue:
+        logger.info(f'Search has reached {counter} nodes...')
+        log_cache_stats(wikipedia_searcher)
+        if checkpoint is not None:
+            checkpoint.maybe_save(search_queue.items(), graph_writer, nodes=counter)
+        if stop_reason(budget, counter):
+            break
+
+        window_size = window if window > 0 else len(search_queue)
+        # Each article's links are materialized once, since the first instance of a link is told apart by identity
+        frontier = [(article, article.outgoing_links) for article in search_queue.pop_many(window_size)
+                    if article.outgoing_link_ids is not None]
+
+        # The first link to an unclassified title is the one that gets read from the archive (and queued if needed)
+        unique_links = {}
+        for current_article, links in frontier:
+            for linked_article in links:
+                unique_links.setdefault(linked_article.article_title, linked_article)
+        stored_classifications = dict(zip(unique_links, cache.retrieve_many(list(unique_links.values()))))
+        first_links = {title: linked_article for title, linked_article in unique_links.items()
+                       if stored_classifications[title] is None}
+
+        logger.info(f'Expanding {len(frontier)} articles with {len(first_links)} unclassified outgoing links')
+        wikipedia_searcher.retrieve_articles(list(first_links.values()))
+        # Articles missing from the archive are never classified, so they come back as None (not an artist)
+        new_classifications = dict(zip(first_links, cache.retrieve_many(list(first_links.values()))))
+
+        for current_article, links in frontier:
+            logger.info(f'\tCurrent article: {current_article.article_title}\n'
+                        f'\tOutgoing links: {len(links)}')
+            count_expansion(len(links), counter, search_queue)
+            for linked_article in links:
+                title = linked_article.article_title
+                if stored_classifications[title] is not None:
+                    link_is_musical_artist = stored_classifications[title]
+                else:
+                    link_is_musical_artist = bool(new_classifications[title])
+
+                counter += link_article(current_article, linked_article, link_is_musical_artist,
+                                        node_is_new=first_links.get(title) is linked_article,
+                                        search_queue=search_queue, graph_writer=graph_writer, visited=visited)
+        frontier = []
+
+    if checkpoint is not None:
+        checkpoint.save(search_queue.items(), graph_writer, nodes=counter)
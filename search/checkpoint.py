@@ -0,0 +1,152 @@
+"""
+Checkpoints of a running breadth-first search, so that a crashed or interrupted search can pick up where it left off
+(`python -m search --resume`) instead of starting over.
+
+A checkpoint holds the articles left to expand (by title, page id, and depth; their links are read again on resume), the
+titles of every article ever queued, and the search's counters. Redis and Neo4J are not rolled back on resume, so
+they may hold work done after the last checkpoint. Re-adding nodes and edges is harmless, but an artist classified
+after the checkpoint would look already seen and never be expanded; repair_cache forgets those classifications so
+the search finds them again.
+"""
+from __future__ import annotations
+import json
+from os import PathLike, replace
+from pathlib import Path
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import CHECKPOINT_EVERY_SECONDS, SEARCH_CHECKPOINT_FILE, make_logger
+from data_stores.redis_.article_cache import ArticleCache
+from search.frontier import Frontier
+from wikipedia.models import WikipediaArticle
+from wikipedia.reader import WikipediaArchiveSearcher
+
+logger = make_logger(__name__)
+
+
+class SearchCheckpoint:
+    """
+    The periodically saved state of a search. The search adds the title of every article it queues to visited, and
+    hands its frontier to maybe_save at points where no article is half expanded. It also hands track the means to
+    read its state at any time, so that save_interrupted can save it when the search is interrupted.
+    """
+
+    class MissingCheckpointError(Exception):
+        """Custom exception for when there is no checkpoint to resume from."""
+        pass
+
+    def __init__(self, path: PathLike = SEARCH_CHECKPOINT_FILE, every: float = CHECKPOINT_EVERY_SECONDS):
+        """
+        :param path: the file checkpoints are written to and resumed from
+        :param every: the least number of seconds between checkpoints; 0 only saves at the start and end of the search
+        """
+        self.path = Path(path)
+        self.every = every
+        self.visited: Set[str] = set()
+        self.counters: Dict[str, int] = {}
+        self.frontier: List[Tuple[str, Optional[int], int]] = []
+        self._last_save = monotonic()
+        self._tracked_frontier: Optional[Callable[[], Iterable[Tuple[WikipediaArticle, int]]]] = None
+        self._tracked_counters: Optional[Callable[[], Dict[str, int]]] = None
+
+    def start(self, search_queue: Frontier, graph_writer) -> None:
+        """
+        Begin a new search from the given seeds, replacing any checkpoint of an earlier search.
+        :param search_queue: the frontier holding the seeds of the search
+        :param graph_writer: the search's graph writer
+        """
+        self.visited = {article.article_title for article, depth in search_queue.items()}
+        self.counters = {}
+        self.save(search_queue.items(), graph_writer, nodes=len(search_queue))
+
+    def maybe_save(self, frontier: Iterable[Tuple[WikipediaArticle, int]], graph_writer, **counters: int) -> None:
+        """
+        Save a checkpoint if the last one is at least `every` seconds old.
+        :param frontier: the articles left to expand and their depths, in the order they will be expanded
+        :param graph_writer: the search's graph writer, flushed first so the graph is at least as new as the checkpoint
+        :param counters: the search's counters, such as the number of nodes found
+        """
+        if self.every > 0 and monotonic() - self._last_save >= self.every:
+            self.save(frontier, graph_writer, **counters)
+
+    def save(self, frontier: Iterable[Tuple[WikipediaArticle, int]], graph_writer, **counters: int) -> None:
+        """
+        Save a checkpoint now. Takes the same arguments as maybe_save.
+        """
+        graph_writer.flush()
+        self.counters.update(counters)
+        self.frontier = [(article.article_title, article.page_id, depth) for article, depth in frontier
+                         if article.outgoing_link_ids is not None]
+        temporary_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump({"frontier": self.frontier, "visited": sorted(self.visited), "counters": self.counters},
+                      checkpoint_file)
+        replace(temporary_path, self.path)  # so that a crash while saving leaves the previous checkpoint intact
+        self._last_save = monotonic()
+        logger.info(f'Saved a checkpoint of {len(self.frontier)} frontier articles and {len(self.visited)} queued '
+                    f'titles to {self.path}')
+
+    def track(self, frontier: Callable[[], Iterable[Tuple[WikipediaArticle, int]]],
+              counters: Callable[[], Dict[str, int]]) -> None:
+        """
+        Follow a running search, for save_interrupted.
+        :param frontier: returns the articles left to expand and their depths as of the search's last consistent point:
+                         articles the search had started to expand come first, ahead of any articles they queued
+        :param counters: returns the search's counters
+        """
+        self._tracked_frontier = frontier
+        self._tracked_counters = counters
+
+    def save_interrupted(self, graph_writer) -> None:
+        """
+        Save a checkpoint of the tracked search after it was interrupted, such as by a KeyboardInterrupt. Does nothing
+        if no search was tracked.
+        :param graph_writer: the search's graph writer, flushed first
+        """
+        if self._tracked_frontier is not None:
+            self.save(self._tracked_frontier(), graph_writer, **self._tracked_counters())
+
+    def load(self) -> None:
+        """
+        Read the last saved checkpoint.
+        """
+        if not self.path.exists():
+            raise self.MissingCheckpointError(f'No search checkpoint at {self.path}')
+        with open(self.path, "r", encoding="utf-8") as checkpoint_file:
+            state = json.load(checkpoint_file)
+        self.frontier = [(title, page_id, depth) for title, page_id, depth in state["frontier"]]
+        self.visited = set(state["visited"])
+        self.counters = state["counters"]
+        self._last_save = monotonic()
+        logger.info(f'Loaded a checkpoint of {len(self.frontier)} frontier articles and {len(self.visited)} queued '
+                    f'titles from {self.path}')
+
+    def restore_frontier(self, wikipedia_searcher: WikipediaArchiveSearcher) -> List[Tuple[WikipediaArticle, int]]:
+        """
+        Read the links of every frontier article of the loaded checkpoint from the archive again.
+        :param wikipedia_searcher: the searcher used to read articles from the archive
+        :return: the articles to resume with and their depths, in order (see Frontier.extend)
+        """
+        pages = wikipedia_searcher.fetch_pages(title for title, page_id, depth in self.frontier)
+        search_queue = []
+        for title, page_id, depth in self.frontier:
+            article = WikipediaArticle(article_title=title, page_id=page_id)
+            page = pages.get(title)
+            if page is None:
+                logger.info(f'Frontier article {title} is no longer in the archive; skipping it')
+                continue
+            wikipedia_searcher.fill_article(article, page)
+            search_queue.append((article, depth))
+        return search_queue
+
+    def repair_cache(self, cache: ArticleCache) -> int:
+        """
+        Forget every artist classification made after the checkpoint, so those artists are found (and expanded)
+        again rather than taken as already seen.
+        :param cache: the cache of article classifications
+        :return: the number of classifications forgotten
+        """
+        unseen_artists = [title for title in cache.iter_artist_titles() if title not in self.visited]
+        cache.delete_many(unseen_artists)
+        logger.info(f'Forgot {len(unseen_artists)} artist classifications made after the checkpoint')
+        return len(unseen_artists)
@@ -0,0 +1,255 @@
+"""
+Asyncio breadth-first search: Redis and Neo4J round trips overlap with the decompression and parsing of the archive.
+
+Up to `concurrency` frontier articles are expanded ahead of the search at once. Expanding an article reads the
+classifications of its outgoing links with the asyncio Redis client, then looks up the unclassified ones in the index
+and decompresses and analyzes their streams in an executor: a single background thread going through the searcher's
+stream cache, or the ParallelExtractor's worker processes when the searcher has one. The expanded articles are then
+written one at a time, in the order they were popped, exactly as search_by_link would write them, while full batches
+of the graph are written to Neo4J in the background by an AsyncBulkGraphWriter.
+
+A link that was unclassified when its article was expanded may have been classified by an article written since; the
+writer keeps the classifications of the articles written while an expansion was in flight to tell, so the graph is
+the same as that of search_by_link.
+"""
+import asyncio
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from config import make_logger
+from data_stores.neo_4j.async_writer import AsyncBulkGraphWriter
+from data_stores.redis_.async_cache import AsyncArticleCache
+from instrumentation import metrics
+from search.bfs import GraphWriter, count_expansion, link_article, search_counter, stop_reason
+from search.frontier import Frontier, SearchBudget
+from wikipedia.models import ClassifiedPage, WikipediaArticle
+from wikipedia.reader import WikipediaArchiveSearcher
+
+logger = make_logger(__name__)
+
+DEFAULT_CONCURRENCY = 16
+
+
+class ExpandedArticle(NamedTuple):
+    """
+    An article's outgoing links, their classifications when it was expanded, and the pages of the unclassified ones.
+    """
+    links: List[WikipediaArticle]
+    stored_classifications: List[Optional[bool]]
+    pages: Dict[str, ClassifiedPage]
+
+
+class Expansion(NamedTuple):
+    """
+    An article being expanded, and the number of articles written when it started.
+    """
+    article: WikipediaArticle
+    written_before: int
+    task: "asyncio.Future[Optional[ExpandedArticle]]"
+
+
+class AsyncCrawler:
+    """
+    A breadth-first search keeping a bounded number of article expansions in flight on an asyncio event loop.
+    """
+
+    def __init__(self, wikipedia_searcher: WikipediaArchiveSearcher, cache: AsyncArticleCache,
+                 graph_writer: GraphWriter, concurrency: int = DEFAULT_CONCURRENCY,
+                 budget: Optional[SearchBudget] = None):
+        """
+        :param wikipedia_searcher: the searcher used to read articles from the archive (its extractor, if any, is used
+                                   for decompression and parsing)
+        :param cache: the cache of article classifications; closed when the crawl ends
+        :param graph_writer: the writer recording the graph. An AsyncBulkGraphWriter is drained and closed when the
+                             crawl ends; any other writer is left for the caller to close.
+        :param concurrency: the most articles expanded ahead of the one being written. A priority frontier is always
+                            expanded one article at a time, since its order depends on the links written so far.
+        :param budget: if given, the search stops between articles once it is exhausted
+        """
+        self.wikipedia_searcher = wikipedia_searcher
+        self.cache = cache
+        self.graph_writer = graph_writer
+        self.concurrency = concurrency
+        self.budget = budget
+        self.counter = 0
+        self.articles_written = 0
+        # The classifications made by each recently written article, for the expansions that were in flight meanwhile
+        self._recent_classifications: Deque[Tuple[int, Dict[str, bool]]] = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # The pages being analyzed for expansions in flight, until the first of them to be written is
+        self._pages_in_flight: Dict[str, "asyncio.Future[Optional[ClassifiedPage]]"] = {}
+        # The streams being analyzed, referenced here until they finish so that none is garbage collected mid-run
+        self._stream_tasks: Set[asyncio.Task] = set()
+
+    def run(self, search_queue: Frontier) -> None:
+        """
+        Search until the frontier or the budget is exhausted, on a new event loop.
+        :param search_queue: the frontier of articles left to expand, updated in place
+        """
+        asyncio.run(self.crawl(search_queue))
+
+    async def crawl(self, search_queue: Frontier) -> None:
+        """
+        The search itself, for callers already running an event loop.
+        """
+        self.counter = search_counter(search_queue, None)
+        if isinstance(self.graph_writer, AsyncBulkGraphWriter):
+            await self.graph_writer.start()
+        # A single thread keeps the searcher's stream cache to itself
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawler-extract")
+        expansions: Deque[Expansion] = deque()
+        try:
+            while True:
+                in_flight = 1 if search_queue.priority else self.concurrency
+                while search_queue and len(expansions) < in_flight:
+                    article = search_queue.pop()
+                    expansions.append(Expansion(article, self.articles_written,
+                                                asyncio.ensure_future(self._expand(article))))
+                if not expansions or stop_reason(self.budget, self.counter):
+                    break
+
+                article, written_before, task = expansions.popleft()
+                expanded = await task
+                if expanded is not None:
+                    await self._write(article, expanded, written_before, search_queue)
+                    self._forget_classifications(expansions[0].written_before if expansions
+                                                 else self.articles_written)
+        finally:
+            for expansion in expansions:
+                expansion.task.cancel()
+            for stream_task in self._stream_tasks:
+                stream_task.cancel()
+            await asyncio.gather(*self._stream_tasks, return_exceptions=True)
+            for page_in_flight in self._pages_in_flight.values():
+                # An error is raised through the first expansion awaiting it; the rest are dropped here, unlogged
+                if page_in_flight.done() and not page_in_flight.cancelled():
+                    page_in_flight.exception()
+                else:
+                    page_in_flight.cancel()
+            self._pages_in_flight.clear()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            await self.cache.aclose()
+            if isinstance(self.graph_writer, AsyncBulkGraphWriter):
+                await self.graph_writer.aclose()
+        logger.info(f'Search finished with {self.counter} nodes')
+
+    async def _expand(self, article: WikipediaArticle) -> Optional[ExpandedArticle]:
+        """
+        Read the classifications of an article's links and analyze the unclassified ones. Nothing is written here.
+        :return: the expanded article, or None for an article whose links were never read (see search_by_link)
+        """
+        links = article.outgoing_links
+        if links is None:
+            return None
+        stored_classifications = await self.cache.retrieve_many(links)
+        pages = await self._fetch_pages([linked_article.article_title for linked_article, stored_classification
+                                         in zip(links, stored_classifications) if stored_classification is None])
+        return ExpandedArticle(links, stored_classifications, pages)
+
+    async def _fetch_pages(self, titles: List[str]) -> Dict[str, ClassifiedPage]:
+        """
+        Analyze many articles, each of their streams in the executor, as WikipediaArchiveSearcher.fetch_pages does.
+        Articles already being analyzed for another expansion are waited for rather than analyzed again. The index
+        (or artist table) is read on the event loop, since its SQLite connection belongs to this thread.
+        """
+        if not titles or self.wikipedia_searcher.artist_table is not None:
+            return self.wikipedia_searcher.fetch_pages(titles) if titles else {}
+        loop = asyncio.get_running_loop()
+        locations = self.wikipedia_searcher.lookup_indices(title for title in titles
+                                                          if title not in self._pages_in_flight)
+        titles_by_stream = defaultdict(list)
+        for title, (start_index, page_id, end_index) in locations.items():
+            titles_by_stream[(start_index, end_index)].append(title)
+            self._pages_in_flight[title] = loop.create_future()
+        pages_in_flight = {title: self._pages_in_flight[title] for title in titles if title in self._pages_in_flight}
+
+        for start_index, end_index in sorted(titles_by_stream):
+            stream_task = asyncio.ensure_future(self._analyze_stream(start_index, end_index, [
+                (locations[title][1], pages_in_flight[title]) for title in titles_by_stream[(start_index, end_index)]]))
+            self._stream_tasks.add(stream_task)
+            stream_task.add_done_callback(self._stream_tasks.discard)
+        pages = {}
+        for title, page_in_flight in pages_in_flight.items():
+            page = await page_in_flight
+            if page is not None:
+                pages[title] = page
+        return pages
+
+    async def _analyze_stream(self, start_index: int, end_index: int,
+                              requests: List[Tuple[int, "asyncio.Future[Optional[ClassifiedPage]]"]]) -> None:
+        """
+        Analyze pages of one stream in the executor, resolving each page's future with it (or None if it is missing).
+        """
+        page_ids = [page_id for page_id, page_in_flight in requests]
+        extractor = self.wikipedia_searcher.extractor
+        try:
+            if extractor is None:
+                pages_by_id = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.wikipedia_searcher.analyze_stream, start_index, end_index, page_ids)
+            else:
+                started = perf_counter()
+                stream_pages = await asyncio.wrap_future(extractor.submit(start_index, end_index, page_ids))
+                metrics.record("parallel_extract", perf_counter() - started, items=len(stream_pages))
+                pages_by_id = {page.page_id: page for page in stream_pages}
+        except Exception as e:
+            for page_id, page_in_flight in requests:
+                if not page_in_flight.done():
+                    page_in_flight.set_exception(e)
+            return
+        for page_id, page_in_flight in requests:
+            if not page_in_flight.done():
+                page_in_flight.set_result(pages_by_id.get(page_id))
+
+    async def _write(self, current_article: WikipediaArticle, expanded: ExpandedArticle, written_before: int,
+                     search_queue: Frontier) -> None:
+        """
+        Apply an expanded article to the cache, the graph, and the frontier, as search_by_link would.
+        """
+        links = expanded.links
+        logger.info(f'\tCurrent article: {current_article.article_title}\n\tOutgoing links: {len(links)}')
+        count_expansion(len(links), self.counter, search_queue)
+
+        new_classifications = {}
+        classified_links = []
+        for linked_article, stored_classification in zip(links, expanded.stored_classifications):
+            if stored_classification is None:
+                self._pages_in_flight.pop(linked_article.article_title, None)
+                stored_classification = self._recent_classification(linked_article.article_title, written_before)
+            if stored_classification is not None:
+                link_is_musical_artist = stored_classification
+            else:
+                page = expanded.pages.get(linked_article.article_title)
+                link_is_musical_artist = False
+                if page is not None:
+                    self.wikipedia_searcher.fill_article(linked_article, page)
+                    link_is_musical_artist = page.is_musical_artist
+                    new_classifications[linked_article.article_title] = link_is_musical_artist
+                    classified_links.append((linked_article, link_is_musical_artist))
+
+            self.counter += link_article(current_article, linked_article, link_is_musical_artist,
+                                         node_is_new=stored_classification is None, search_queue=search_queue,
+                                         graph_writer=self.graph_writer)
+
+        await self.cache.store_many(classified_links)
+        self._recent_classifications.append((self.articles_written, new_classifications))
+        self.articles_written += 1
+        if isinstance(self.graph_writer, AsyncBulkGraphWriter):
+            await self.graph_writer.throttle()
+
+    def _recent_classification(self, title: str, written_before: int) -> Optional[bool]:
+        """
+        :return: the classification of a title by an article written after written_before articles, or None
+        """
+        for written, classifications in self._recent_classifications:
+            if written >= written_before and title in classifications:
+                return classifications[title]
+        return None
+
+    def _forget_classifications(self, written_before: int) -> None:
+        """
+        Drop the classifications written before the oldest expansion still in flight started; Redis has them all.
+        """
+        while self._recent_classifications and self._recent_classifications[0][0] < written_before:
+            self._recent_classifications.popleft()
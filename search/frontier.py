@@ -0,0 +1,144 @@
+"""
+The frontier of the breadth-first search (the articles found but not yet expanded) and the budgets that bound a run.
+
+By default the frontier is first in, first out, over a deque. In priority mode it expands the articles that the most
+expanded articles have linked to first, so a run cut short by a budget still holds the best connected part of the
+graph. Either way it keeps the depth of every queued article and refuses articles deeper than max_depth.
+"""
+from __future__ import annotations
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from time import monotonic
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from wikipedia.models import WikipediaArticle
+
+
+class Frontier:
+    """
+    A queue of articles to expand, with O(1) pushes and pops in FIFO mode and O(log n) ones in priority mode.
+    """
+
+    def __init__(self, max_depth: Optional[int] = None, priority: bool = False):
+        """
+        :param max_depth: the deepest level (seeds are level 0) whose articles are queued; None for no limit
+        :param priority: expand articles with the most in-links seen so far first, instead of in BFS order
+        """
+        self.max_depth = max_depth
+        self.priority = priority
+        self._depths: Dict[str, int] = {}
+        self._queue: Deque[WikipediaArticle] = deque()
+        # Priority mode: a lazy max-heap of (-in-links, order queued, title) over the queued titles. Entries go stale
+        # when a title gains in-links (a fresh entry is pushed) and are skipped when popped.
+        self._heap: List[Tuple[int, int, str]] = []
+        self._queued: Dict[str, WikipediaArticle] = {}
+        self._in_links: Dict[str, int] = {}
+        self._order = count()
+
+    def __len__(self):
+        return len(self._queued) if self.priority else len(self._queue)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def depth_of(self, article: WikipediaArticle) -> int:
+        """
+        :return: the level the article was first queued at (0 for articles never queued)
+        """
+        return self._depths.get(article.article_title, 0)
+
+    def push(self, article: WikipediaArticle, parent: Optional[WikipediaArticle] = None,
+             depth: Optional[int] = None) -> bool:
+        """
+        Queue an article, one level below its parent (or at the given depth).
+        :param article: the article to queue
+        :param parent: the article it was found from; None for seeds
+        :param depth: the level to queue it at, overriding parent
+        :return: whether the article was queued, rather than refused for being too deep (or, in priority mode, already
+                 queued)
+        """
+        if depth is None:
+            depth = 0 if parent is None else self.depth_of(parent) + 1
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        self._depths.setdefault(article.article_title, depth)
+        if not self.priority:
+            self._queue.append(article)
+            return True
+        if article.article_title in self._queued:
+            return False
+        self._queued[article.article_title] = article
+        heappush(self._heap, (-self._in_links.get(article.article_title, 0), next(self._order), article.article_title))
+        return True
+
+    def extend(self, articles: Iterable[Tuple[WikipediaArticle, int]]) -> None:
+        """
+        Queue many articles at known depths, such as the frontier of a checkpoint.
+        """
+        for article, depth in articles:
+            self.push(article, depth=depth)
+
+    def record_link(self, title: str) -> None:
+        """
+        Count an in-link to an article, raising its priority if it is queued. Does nothing in FIFO mode.
+        """
+        if not self.priority:
+            return
+        self._in_links[title] = self._in_links.get(title, 0) + 1
+        if title in self._queued:
+            heappush(self._heap, (-self._in_links[title], next(self._order), title))
+
+    def pop(self) -> WikipediaArticle:
+        """
+        :return: the next article to expand
+        """
+        if not self.priority:
+            return self._queue.popleft()
+        while True:
+            negative_in_links, order, title = heappop(self._heap)
+            if title in self._queued and -negative_in_links == self._in_links.get(title, 0):
+                return self._queued.pop(title)
+
+    def pop_many(self, limit: int) -> List[WikipediaArticle]:
+        """
+        :return: the next (up to) limit articles to expand, in order
+        """
+        return [self.pop() for _ in range(min(limit, len(self)))]
+
+    def items(self) -> Iterator[Tuple[WikipediaArticle, int]]:
+        """
+        :return: every queued article and its depth, in the order they would be expanded
+        """
+        if not self.priority:
+            articles = iter(self._queue)
+        else:
+            articles = (self._queued[title] for title in sorted(
+                self._queued, key=lambda queued_title: -self._in_links.get(queued_title, 0)))
+        return ((article, self.depth_of(article)) for article in articles)
+
+
+class SearchBudget:
+    """
+    Limits on how long a search may run, checked between articles (or windows of articles).
+    """
+
+    def __init__(self, max_nodes: Optional[int] = None, max_seconds: Optional[float] = None):
+        """
+        :param max_nodes: stop once the search has found this many nodes; None for no limit
+        :param max_seconds: stop once the search has run this long; None for no limit
+        """
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.started = monotonic()
+
+    def exhausted(self, nodes: int) -> Optional[str]:
+        """
+        :param nodes: the number of nodes the search has found
+        :return: why the search should stop, or None if it may go on
+        """
+        if self.max_nodes is not None and nodes >= self.max_nodes:
+            return f'reached the budget of {self.max_nodes} nodes'
+        if self.max_seconds is not None and monotonic() - self.started >= self.max_seconds:
+            return f'ran for the budget of {self.max_seconds:.0f} seconds'
+        return None
@@ -0,0 +1,211 @@
+"""
+Pipelined breadth-first search: articles are fetched and parsed concurrently while a single writer stage applies
+classifications and graph updates in a fixed order.
+
+The search runs level by level. Each level is cut into windows of frontier articles; the fetch stage looks up the
+unclassified outgoing links of a window and analyzes them (on the ParallelExtractor's worker processes when the
+searcher has one) while the writer is still applying earlier windows. Only the writer touches Redis writes and
+Neo4J, and it walks every window in queue order, so the resulting graph is the same as that of search_by_link.
+"""
+from queue import Queue
+from threading import Thread
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from config import make_logger
+from data_stores.redis_.article_cache import ArticleCache
+from instrumentation import metrics
+from search.bfs import GraphWriter, count_expansion, link_article, log_cache_stats, search_counter, stop_reason
+from search.checkpoint import SearchCheckpoint
+from search.frontier import Frontier, SearchBudget
+from wikipedia.models import ClassifiedPage, WikipediaArticle
+from wikipedia.reader import WikipediaArchiveSearcher
+
+logger = make_logger(__name__)
+
+FetchedWindow = Tuple[List[WikipediaArticle], Dict[str, ClassifiedPage]]
+
+DEFAULT_WINDOW = 1000
+
+
+class PipelinedSearch:
+    """
+    A breadth-first search split into a fetch/parse stage and a single-writer store stage connected by a bounded
+    queue.
+    """
+
+    def __init__(self, wikipedia_searcher: WikipediaArchiveSearcher, cache: ArticleCache, graph_writer: GraphWriter,
+                 window: int = DEFAULT_WINDOW, prefetch: int = 2, log_every: float = 30.0,
+                 checkpoint: Optional[SearchCheckpoint] = None, budget: Optional[SearchBudget] = None):
+        """
+        :param wikipedia_searcher: the searcher used to read articles from the archive
+        :param cache: the cache of article classifications
+        :param graph_writer: the writer recording the graph, used only by the writer stage
+        :param window: the number of frontier articles fetched together
+        :param prefetch: the number of fetched windows allowed to wait for the writer
+        :param log_every: seconds between reports of the stage queue depths
+        :param checkpoint: if given, the writer stage saves the search's state to it between windows
+        :param budget: if given, the search stops fetching windows once it is exhausted
+        """
+        self.wikipedia_searcher = wikipedia_searcher
+        self.cache = cache
+        self.graph_writer = graph_writer
+        self.window = window
+        self.log_every = log_every
+        self.checkpoint = checkpoint
+        self.budget = budget
+        self.visited = checkpoint.visited if checkpoint is not None else None
+
+        self.write_queue: "Queue[Optional[FetchedWindow]]" = Queue(maxsize=prefetch)
+        self.counter = 0
+        self.windows_left_to_fetch = 0
+        self.next_level = Frontier()
+        self.level_windows: List[List[WikipediaArticle]] = []
+        self.windows_written = 0
+        self.fetch_seconds = 0.0
+        self.write_seconds = 0.0
+        self._writer_error: Optional[BaseException] = None
+        self._stopping = False
+        self._last_log = monotonic()
+
+    def run(self, search_queue: Frontier) -> None:
+        """
+        Search until the frontier or the budget is exhausted.
+        :param search_queue: the frontier of articles left to expand, updated in place. Each level is taken from it
+                             whole, and the writer stage queues the next level on it.
+        """
+        self.counter = search_counter(search_queue, self.checkpoint)
+        self.next_level = search_queue
+        writer = Thread(target=self._write_windows, name="search-writer", daemon=True)
+        writer.start()
+        if self.checkpoint is not None:
+            # Read when the search is interrupted, once the writer has stopped between windows
+            self.checkpoint.track(self._unwritten_frontier, lambda: {"nodes": self.counter})
+
+        try:
+            level_number, stopped = 0, False
+            while search_queue and not stopped:
+                level = search_queue.pop_many(len(search_queue))
+                logger.info(f'Search has reached {self.counter} nodes; expanding level {level_number} '
+                            f'({len(level)} articles)...')
+                self.level_windows = [level[start:start + self.window]
+                                      for start in range(0, len(level), self.window)]
+                self.windows_written = 0
+                self.windows_left_to_fetch = len(self.level_windows)
+                for window in self.level_windows:
+                    if stop_reason(self.budget, self.counter):
+                        stopped = True
+                        break
+                    fetched_window = self._fetch_window(window)
+                    self.windows_left_to_fetch -= 1
+                    self.write_queue.put(fetched_window)
+                    self._raise_writer_error()
+                    self.log_queue_depths()
+                    metrics.report_if_due()
+                self.write_queue.join()
+                self._raise_writer_error()
+                level_number += 1
+        except KeyboardInterrupt:
+            # Let the writer finish the window it is applying and skip the rest, so the search stops between windows
+            logger.info(f'Search interrupted; waiting for the writer to finish its window...')
+            self._stopping = True
+            self.write_queue.put(None)
+            writer.join()
+            raise
+
+        self.write_queue.put(None)
+        writer.join()
+        if self.checkpoint is not None:
+            self.checkpoint.save(self._unwritten_frontier(), self.graph_writer, nodes=self.counter)
+        logger.info(f'Search finished with {self.counter} nodes '
+                    f'(fetch {self.fetch_seconds:.1f}s, write {self.write_seconds:.1f}s)')
+
+    def log_queue_depths(self, force: bool = False) -> None:
+        """
+        Report how much work is waiting at each stage, at most once every log_every seconds.
+        :param force: report regardless of when the last report was
+        """
+        if not force and monotonic() - self._last_log < self.log_every:
+            return
+        self._last_log = monotonic()
+        logger.info(f'Queue depths: fetch {self.windows_left_to_fetch} windows, '
+                    f'write {self.write_queue.qsize()} windows, next level {len(self.next_level)} articles; '
+                    f'{self.counter} nodes (fetch {self.fetch_seconds:.1f}s, write {self.write_seconds:.1f}s)')
+        log_cache_stats(self.wikipedia_searcher)
+
+    def _fetch_window(self, window: List[WikipediaArticle]) -> FetchedWindow:
+        """
+        Analyze every outgoing link of the window that is not classified yet. Nothing is written to any store here.
+        """
+        started = monotonic()
+        frontier = [article for article in window if article.outgoing_link_ids is not None]
+        unique_links = {}
+        for current_article in frontier:
+            for linked_article in current_article.outgoing_links:
+                unique_links.setdefault(linked_article.article_title, linked_article)
+        stored_classifications = self.cache.retrieve_many(list(unique_links.values()))
+        pages = self.wikipedia_searcher.fetch_pages(title for title, stored_classification
+                                                    in zip(unique_links, stored_classifications)
+                                                    if stored_classification is None)
+        seconds = monotonic() - started
+        self.fetch_seconds += seconds
+        metrics.record("fetch", seconds)
+        return frontier, pages
+
+    def _write_windows(self) -> None:
+        """
+        The writer stage: apply fetched windows in order until the end-of-search marker arrives.
+        """
+        while True:
+            fetched_window = self.write_queue.get()
+            try:
+                if fetched_window is None:
+                    return
+                if self._writer_error is None and not self._stopping:
+                    started = monotonic()
+                    self._write_window(*fetched_window)
+                    seconds = monotonic() - started
+                    self.write_seconds += seconds
+                    metrics.record("write", seconds)
+                    self.windows_written += 1
+                    if self.checkpoint is not None:
+                        self.checkpoint.maybe_save(self._unwritten_frontier(), self.graph_writer, nodes=self.counter)
+            except BaseException as e:
+                self._writer_error = e
+            finally:
+                self.write_queue.task_done()
+
+    def _write_window(self, frontier: List[WikipediaArticle], pages: Dict[str, ClassifiedPage]) -> None:
+        for current_article in frontier:
+            links = current_article.outgoing_links
+            logger.info(f'\tCurrent article: {current_article.article_title}\n\tOutgoing links: {len(links)}')
+            count_expansion(len(links), self.counter, self.next_level)
+            # Links are unique by title, so the article's classifications can be read and written in one batch each
+            new_classifications = []
+            for linked_article, stored_classification in zip(links, self.cache.retrieve_many(links)):
+                if stored_classification is not None:
+                    link_is_musical_artist = stored_classification
+                else:
+                    page = pages.get(linked_article.article_title)
+                    link_is_musical_artist = False
+                    if page is not None:
+                        self.wikipedia_searcher.fill_article(linked_article, page)
+                        link_is_musical_artist = page.is_musical_artist
+                        new_classifications.append((linked_article, link_is_musical_artist))
+
+                self.counter += link_article(current_article, linked_article, link_is_musical_artist,
+                                             node_is_new=stored_classification is None,
+                                             search_queue=self.next_level, graph_writer=self.graph_writer,
+                                             visited=self.visited)
+            self.cache.store_many(new_classifications)
+
+    def _unwritten_frontier(self) -> List[Tuple[WikipediaArticle, int]]:
+        """
+        The articles still to be expanded and their depths, in order, as seen by the writer stage between windows.
+        """
+        return [(article, self.next_level.depth_of(article)) for window in self.level_windows[self.windows_written:]
+                for article in window] + list(self.next_level.items())
+
+    def _raise_writer_error(self) -> None:
+        if self._writer_error is not None:
+            raise self._writer_error
@@ -0,0 +1,36 @@
+from pathlib import Path
+from typing import NamedTuple
+
+import pytest
+
+from benchmarks.fixture import Fixture, generate_fixture
+from benchmarks.stand_ins import memory_cache
+from data_stores.sqlite import build_archive_index
+from wikipedia.reader import WikipediaArchiveSearcher
+
+FIXTURE_PAGES = 400
+
+
+class IndexedFixture(NamedTuple):
+    """
+    A generated archive and the SQLite index built from it.
+    """
+    fixture: Fixture
+    sqlite_path: Path
+    rows: int
+
+    def searcher(self, **kwargs) -> WikipediaArchiveSearcher:
+        """
+        :param kwargs: passed on to WikipediaArchiveSearcher; the cache defaults to an in-memory one
+        :return: a new searcher over the archive
+        """
+        kwargs.setdefault("cache", memory_cache())
+        return WikipediaArchiveSearcher(self.fixture.archive, self.fixture.index, sqlite_path=self.sqlite_path,
+                                        **kwargs)
+
+
+@pytest.fixture
+def indexed_fixture(tmp_path) -> IndexedFixture:
+    fixture = generate_fixture(tmp_path, pages=FIXTURE_PAGES)
+    rows = build_archive_index(fixture.index, fixture.archive, tmp_path / "index.db")
+    return IndexedFixture(fixture, tmp_path / "index.db", rows)
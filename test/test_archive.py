@@ -0,0 +1,39 @@
+import bz2
+
+import pytest
+
+from wikipedia.archive import ArchiveMap, archive_map
+from wikipedia.parallel import extract_stream
+
+
+def test_views_and_close(indexed_fixture):
+    fixture = indexed_fixture.fixture
+    archive_bytes = fixture.archive.read_bytes()
+    with ArchiveMap(fixture.archive) as archive:
+        assert len(archive) == len(archive_bytes)
+        with archive.view(10, 20) as view:
+            assert view == archive_bytes[10:20]
+        view = archive.view(len(archive) - 5, -1)
+        assert view == archive_bytes[-5:]
+        with pytest.raises(BufferError):
+            archive.close()
+        view.release()
+    assert archive.closed
+
+
+def test_streams_of_the_mapped_archive(indexed_fixture):
+    fixture = indexed_fixture.fixture
+    with indexed_fixture.searcher(stream_cache_bytes=0) as searcher:
+        streams = list(searcher.iter_streams())
+        # Small chunks make streams end partway through a chunk
+        assert list(searcher.iter_streams(chunksize=4096)) == streams
+        for start_index, end_index, xml_block in streams:
+            assert searcher.extract_indexed_range(start_index, end_index) == xml_block
+        assert [start_index for start_index, end_index in searcher.stream_ranges()] == \
+            [start_index for start_index, end_index, xml_block in streams if "<page>" in xml_block]
+    assert searcher.archive.closed
+
+    start_index, end_index, xml_block = streams[1]
+    assert bz2.decompress(fixture.archive.read_bytes()[start_index:end_index]).decode() == xml_block
+    assert {page.page_id for page in extract_stream(fixture.archive, start_index, end_index)}
+    assert archive_map(fixture.archive) is archive_map(fixture.archive)
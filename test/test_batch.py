@@ -0,0 +1,77 @@
+import io
+import json
+
+from wikipedia.batch import ArticleFileWriter, JsonLinesWriter, article_file_name, extract_batch, read_titles
+from wikipedia.parallel import ParallelExtractor
+from wikipedia.title_index import RedirectTable, build_redirect_table
+
+
+def test_read_titles():
+    assert read_titles(io.StringIO("Alpha\n\n  Beta \nAlpha\n")) == ["Alpha", "Beta"]
+
+
+def test_extract_batch(indexed_fixture, tmp_path):
+    fixture = indexed_fixture.fixture
+    titles = fixture.titles[::-7] + ["Missing article"]
+
+    with indexed_fixture.searcher(stream_cache_bytes=0) as searcher:
+        with JsonLinesWriter(tmp_path / "articles.jsonl") as writer:
+            assert extract_batch(searcher, titles, writer) == ["Missing article"]
+        with ParallelExtractor(fixture.archive, workers=2) as extractor, \
+                ArticleFileWriter(tmp_path / "articles") as writer:
+            assert extract_batch(searcher, titles, writer, extractor=extractor, with_xml=True) == ["Missing article"]
+
+    with open(tmp_path / "articles.jsonl") as articles_file:
+        records = [json.loads(line) for line in articles_file]
+    assert sorted(record["title"] for record in records) == sorted(titles[:-1])
+    # Written in stream order, not in the order the titles were given
+    assert [record["page_id"] for record in records] == sorted(record["page_id"] for record in records)
+    assert any(record["is_musical_artist"] and record["links"] and record["infobox"] for record in records)
+
+    for record in records:
+        with open(tmp_path / "articles" / article_file_name(record["title"])) as article_file:
+            article = json.load(article_file)
+        assert f'<id>{record["page_id"]}</id>' in article.pop("xml")
+        assert article == record
+
+
+def test_titles_written_as_in_links(indexed_fixture, tmp_path):
+    fixture = indexed_fixture.fixture
+    article_title = fixture.titles[0]
+    loose_title = (article_title[0].lower() + article_title[1:]).replace(" ", "_")
+    redirect_title = fixture.redirect_titles[0]
+    titles = [loose_title, article_title, redirect_title, "Category:Things"]
+
+    with indexed_fixture.searcher() as searcher:
+        build_redirect_table(searcher, tmp_path / "redirects")
+        searcher.redirects = RedirectTable(tmp_path / "redirects")
+        with JsonLinesWriter(tmp_path / "articles.jsonl") as writer:
+            assert extract_batch(searcher, titles, writer) == ["Category:Things"]
+        with ArticleFileWriter(tmp_path / "articles") as writer:
+            assert extract_batch(searcher, titles, writer) == ["Category:Things"]
+
+    with open(tmp_path / "articles.jsonl") as articles_file:
+        records = {record["title"]: record for record in map(json.loads, articles_file)}
+    # Each title the same article was requested by has a file of its own
+    assert sorted(path.name for path in (tmp_path / "articles").iterdir()) == \
+        sorted(article_file_name(title) for title in records)
+    for title, record in records.items():
+        with open(tmp_path / "articles" / article_file_name(title)) as article_file:
+            assert json.load(article_file) == record
+    assert records.keys() == {loose_title, article_title, redirect_title}
+    assert records[loose_title]["article_title"] == records[article_title]["article_title"] == article_title
+    assert records[redirect_title]["article_title"] == searcher.redirects.resolve(redirect_title) != redirect_title
+
+
+def test_article_file_name():
+    assert article_file_name("AC/DC") == "AC%2FDC.json"
+    assert article_file_name("Sigur Rós") == "Sigur R%C3%B3s.json"
+    long_names = {article_file_name("é" * 200), article_file_name("é" * 201), article_file_name("aé" * 200)}
+    assert len(long_names) == 3
+    assert all(len(name) <= 255 and "%" not in name[-24:] for name in long_names)
+
+
+def test_batch_never_makes_a_classification_cache(indexed_fixture, tmp_path):
+    with indexed_fixture.searcher(cache=None) as searcher, JsonLinesWriter(tmp_path / "articles.jsonl") as writer:
+        extract_batch(searcher, indexed_fixture.fixture.titles[:10], writer)
+        assert searcher._cache is None
@@ -0,0 +1,42 @@
+import pytest
+
+from search.checkpoint import SearchCheckpoint
+from search.frontier import Frontier
+from wikipedia.models import WikipediaArticle
+
+
+class RecordingWriter:
+    flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+
+def expanded_article(title, page_id):
+    article = WikipediaArticle(article_title=title, page_id=page_id)
+    article.set_outgoing_link_titles(["Somewhere"])
+    return article
+
+
+def test_checkpoint_round_trip(tmp_path):
+    writer = RecordingWriter()
+    checkpoint = SearchCheckpoint(tmp_path / "checkpoint.json", every=0)
+    seeds = Frontier()
+    seeds.push(expanded_article("Artist 0", 10))
+    checkpoint.start(seeds, writer)
+    checkpoint.visited.add("Artist 3")
+    checkpoint.maybe_save([], writer, nodes=5)  # every=0 only saves explicitly
+    checkpoint.save([(expanded_article("Artist 3", 13), 1), (WikipediaArticle(article_title="Already expanded"), 1)],
+                    writer, nodes=2)
+    assert writer.flushes == 2
+
+    resumed = SearchCheckpoint(tmp_path / "checkpoint.json")
+    resumed.load()
+    assert resumed.frontier == [("Artist 3", 13, 1)]
+    assert resumed.visited == {"Artist 0", "Artist 3"}
+    assert resumed.counters == {"nodes": 2}
+
+
+def test_missing_checkpoint(tmp_path):
+    with pytest.raises(SearchCheckpoint.MissingCheckpointError):
+        SearchCheckpoint(tmp_path / "checkpoint.json").load()
@@ -0,0 +1,204 @@
+import csv
+import json
+
+import numpy
+import pytest
+
+from benchmarks.stand_ins import AsyncMemoryGraphWriter, MemoryGraphWriter, async_memory_cache, memory_cache
+from data_stores.neo_4j.offline_export import EDGES_HEADER, NODES_HEADER, OfflineGraphExporter
+from search.bfs import search_by_link, search_by_stream
+from search.crawler import AsyncCrawler
+from search.checkpoint import SearchCheckpoint
+from search.frontier import Frontier, SearchBudget
+from search.pipeline import PipelinedSearch
+from wikipedia.models import WikipediaArticle
+
+
+def search_fixture(indexed_fixture, search, graph_writer=None):
+    cache = memory_cache()
+    searcher = indexed_fixture.searcher(cache=cache)
+    search_queue = Frontier()
+    for title in indexed_fixture.fixture.artist_titles[:2]:
+        seed = WikipediaArticle(article_title=title)
+        searcher.retrieve_article_xml(seed)
+        search_queue.push(seed)
+    graph_writer = graph_writer if graph_writer is not None else MemoryGraphWriter()
+    search(searcher, cache, search_queue, graph_writer)
+    graph_writer.close()
+    searcher.close()
+    return graph_writer
+
+
+def seed_search(indexed_fixture, searcher, graph_writer):
+    # As search/__main__.py does, unlike search_fixture
+    search_queue = Frontier()
+    for title in indexed_fixture.fixture.artist_titles[:2]:
+        seed = WikipediaArticle(article_title=title)
+        searcher.retrieve_article_xml(seed)
+        graph_writer.add_node(seed)
+        search_queue.push(seed)
+    return search_queue
+
+
+def seeded_search_by_link(indexed_fixture):
+    cache, graph_writer = memory_cache(), MemoryGraphWriter()
+    with indexed_fixture.searcher(cache=cache) as searcher:
+        search_by_link(searcher, cache, seed_search(indexed_fixture, searcher, graph_writer), graph_writer)
+    graph_writer.close()
+    return graph_writer
+
+
+def resume(checkpoint_path, searcher, cache):
+    checkpoint = SearchCheckpoint(checkpoint_path, every=0)
+    checkpoint.load()
+    checkpoint.repair_cache(cache)
+    search_queue = Frontier()
+    search_queue.extend(checkpoint.restore_frontier(searcher))
+    return checkpoint, search_queue
+
+
+class InterruptingGraphWriter(MemoryGraphWriter):
+    """
+    Raises a KeyboardInterrupt partway through the search, as Ctrl-C would.
+    """
+
+    def __init__(self, interrupt_after_edges: int):
+        super().__init__()
+        self.interrupt_after_edges = interrupt_after_edges
+
+    def add_edge(self, source_article, dest_article):
+        super().add_edge(source_article, dest_article)
+        if self.interrupt_after_edges is not None:
+            self.interrupt_after_edges -= 1
+            if self.interrupt_after_edges == 0:
+                self.interrupt_after_edges = None
+                raise KeyboardInterrupt
+
+
+def test_search_of_generated_archive(indexed_fixture):
+    assert indexed_fixture.rows == len(indexed_fixture.fixture.titles)
+
+    by_link = search_fixture(indexed_fixture, search_by_link)
+    by_stream = search_fixture(indexed_fixture, search_by_stream)
+    assert by_link.edges and by_link.edges == by_stream.edges
+    assert {node["article_title"] for node in by_link.nodes.values()} <= set(indexed_fixture.fixture.artist_titles)
+
+
+def test_async_crawl_matches_search_by_link(indexed_fixture):
+    def crawl(searcher, cache, search_queue, graph_writer):
+        AsyncCrawler(searcher, async_memory_cache(cache), graph_writer, concurrency=8).run(search_queue)
+
+    # A batch size of 10 keeps several background writes in flight (and drops edges from the seeds, which are never
+    # added as nodes here, the same way for both writers)
+    by_link = search_fixture(indexed_fixture, search_by_link, graph_writer=MemoryGraphWriter(batch_size=10))
+    crawled = search_fixture(indexed_fixture, crawl, graph_writer=AsyncMemoryGraphWriter(batch_size=10))
+    assert crawled.edges and crawled.edges == by_link.edges
+    assert crawled.nodes.keys() == by_link.nodes.keys()
+
+
+def test_pipelined_search_matches_search_by_link(indexed_fixture):
+    def pipelined(searcher, cache, search_queue, graph_writer):
+        # Small windows keep several windows of each level in flight
+        PipelinedSearch(searcher, cache, graph_writer, window=3).run(search_queue)
+
+    by_link = search_fixture(indexed_fixture, search_by_link)
+    by_pipeline = search_fixture(indexed_fixture, pipelined)
+    assert by_pipeline.edges and by_pipeline.edges == by_link.edges
+    assert by_pipeline.nodes == by_link.nodes
+
+
+def test_pipelined_search_resumes_from_its_checkpoint(indexed_fixture, tmp_path):
+    by_link = seeded_search_by_link(indexed_fixture)
+
+    cache, graph_writer = memory_cache(), MemoryGraphWriter()
+    checkpoint = SearchCheckpoint(tmp_path / "checkpoint.json", every=0)
+    with indexed_fixture.searcher(cache=cache) as searcher:
+        search_queue = seed_search(indexed_fixture, searcher, graph_writer)
+        checkpoint.start(search_queue, graph_writer)
+        stopped = PipelinedSearch(searcher, cache, graph_writer, window=3, checkpoint=checkpoint,
+                                  budget=SearchBudget(max_nodes=len(by_link.nodes) // 3))
+        stopped.run(search_queue)
+
+        # The search stops before fetching a window, so the writer has left that window and the rest of its level
+        level = [article for window in stopped.level_windows for article in window]
+        unwritten = level[stopped.windows_written * stopped.window:]
+        next_level = [article for article, depth in search_queue.items()]
+        assert unwritten and len(stopped.graph_writer.nodes) < len(by_link.nodes)
+        frontier = stopped._unwritten_frontier()
+        assert [article for article, depth in frontier] == unwritten + next_level
+        level_depth = search_queue.depth_of(unwritten[0])
+        assert [depth for article, depth in frontier] == \
+            [level_depth] * len(unwritten) + [level_depth + 1] * len(next_level)
+
+        resumed, search_queue = resume(tmp_path / "checkpoint.json", searcher, cache)
+        assert [title for title, page_id, depth in resumed.frontier] == \
+            [article.article_title for article, depth in frontier if article.outgoing_link_ids is not None]
+        PipelinedSearch(searcher, cache, graph_writer, window=3, checkpoint=resumed).run(search_queue)
+    graph_writer.close()
+    assert graph_writer.edges == by_link.edges
+    assert graph_writer.nodes.keys() == by_link.nodes.keys()
+
+
+@pytest.mark.parametrize("schedule", ["link", "stream", "pipeline"])
+def test_search_resumes_after_an_interrupt(indexed_fixture, tmp_path, schedule):
+    def search(searcher, cache, search_queue, graph_writer, checkpoint):
+        if schedule == "pipeline":
+            PipelinedSearch(searcher, cache, graph_writer, window=3, checkpoint=checkpoint).run(search_queue)
+        elif schedule == "stream":
+            search_by_stream(searcher, cache, search_queue, graph_writer, window=3, checkpoint=checkpoint)
+        else:
+            search_by_link(searcher, cache, search_queue, graph_writer, checkpoint=checkpoint)
+
+    by_link = seeded_search_by_link(indexed_fixture)
+    cache, graph_writer = memory_cache(), InterruptingGraphWriter(interrupt_after_edges=len(by_link.edges) // 3)
+    checkpoint = SearchCheckpoint(tmp_path / "checkpoint.json", every=0)
+    with indexed_fixture.searcher(cache=cache) as searcher:
+        search_queue = seed_search(indexed_fixture, searcher, graph_writer)
+        checkpoint.start(search_queue, graph_writer)
+        with pytest.raises(KeyboardInterrupt):
+            search(searcher, cache, search_queue, graph_writer, checkpoint)
+        # As the interrupt handler of search/__main__.py does
+        checkpoint.save_interrupted(graph_writer)
+        assert len(graph_writer.edges) < len(by_link.edges)
+
+        resumed, search_queue = resume(tmp_path / "checkpoint.json", searcher, cache)
+        # Saved where the search was interrupted, not where it started
+        assert resumed.frontier and len(resumed.visited) > 2 and resumed.counters["nodes"] > 2
+        search(searcher, cache, search_queue, graph_writer, resumed)
+    graph_writer.close()
+    assert graph_writer.edges == by_link.edges
+    assert graph_writer.nodes.keys() == by_link.nodes.keys()
+
+
+def test_offline_export_matches_search_by_link(indexed_fixture, tmp_path):
+    by_link = search_fixture(indexed_fixture, search_by_link)
+    search_fixture(indexed_fixture, search_by_link, graph_writer=OfflineGraphExporter(tmp_path))
+
+    with open(tmp_path / "nodes.csv", newline="", encoding="utf-8") as nodes_file:
+        node_rows = list(csv.reader(nodes_file))
+    with open(tmp_path / "edges.csv", newline="", encoding="utf-8") as edges_file:
+        edge_rows = list(csv.reader(edges_file))
+    assert node_rows[0] == NODES_HEADER and edge_rows[0] == EDGES_HEADER
+    assert {article_id: {"article_id": article_id, "article_title": title, "properties": properties}
+            for article_id, title, properties, page_id, label in node_rows[1:]} == by_link.nodes
+    edges = [(source_id, dest_id) for source_id, dest_id, edge_type in edge_rows[1:]]
+    assert len(edges) == len(set(edges)) and set(edges) == by_link.edges
+
+    # The CSR file holds the edges between nodes whose page ids are known
+    page_ids = {article_id: int(page_id) for article_id, title, properties, page_id, label in node_rows[1:]}
+    with numpy.load(tmp_path / "graph_csr.npz") as csr:
+        assert list(csr["page_ids"]) == sorted(page_id for page_id in page_ids.values() if page_id >= 0)
+        csr_edges = {(int(csr["page_ids"][i]), int(dest_page_id)) for i in range(len(csr["page_ids"]))
+                     for dest_page_id in csr["page_ids"][csr["indices"][csr["indptr"][i]:csr["indptr"][i + 1]]]}
+    known_edges = {(page_ids[source_id], page_ids[dest_id]) for source_id, dest_id in edges}
+    assert csr_edges and csr_edges == {edge for edge in known_edges if min(edge) >= 0}
+
+
+def test_memory_cache():
+    cache = memory_cache(tiered=True, expected_titles=100)
+    artist, other = WikipediaArticle(article_title="Artist"), WikipediaArticle(article_title="Other")
+    cache.store_many([(artist, True), (other, False)])
+    assert cache.retrieve_many([artist, other, WikipediaArticle(article_title="Unseen")]) == [True, False, None]
+    assert list(cache.iter_artist_titles()) == ["Artist"]
+    cache.delete_many(["Artist"])
+    assert cache.retrieve_classification(artist) is None
@@ -0,0 +1,35 @@
+from search.frontier import Frontier, SearchBudget
+from wikipedia.models import WikipediaArticle
+
+
+def articles(*titles):
+    return [WikipediaArticle(article_title=title) for title in titles]
+
+
+def test_fifo_frontier_tracks_depth():
+    frontier = Frontier(max_depth=1)
+    seed, child, grandchild = articles("Seed", "Child", "Grandchild")
+    assert frontier.push(seed)
+    assert frontier.push(child, parent=seed)
+    assert not frontier.push(grandchild, parent=child)  # deeper than max_depth
+    assert [(article.article_title, depth) for article, depth in frontier.items()] == [("Seed", 0), ("Child", 1)]
+    assert [article.article_title for article in frontier.pop_many(5)] == ["Seed", "Child"]
+    assert not frontier
+
+
+def test_priority_frontier_expands_most_linked_first():
+    frontier = Frontier(priority=True)
+    frontier.extend((article, 1) for article in articles("A", "B", "C"))
+    assert not frontier.push(WikipediaArticle(article_title="B"))  # already queued
+    for title in ["C", "B", "C"]:
+        frontier.record_link(title)
+    assert [article.article_title for article, depth in frontier.items()] == ["C", "B", "A"]
+    assert [frontier.pop().article_title for _ in range(3)] == ["C", "B", "A"]
+    assert len(frontier) == 0
+
+
+def test_search_budget():
+    assert SearchBudget().exhausted(10 ** 9) is None
+    assert SearchBudget(max_nodes=10).exhausted(9) is None
+    assert "10 nodes" in SearchBudget(max_nodes=10).exhausted(10)
+    assert SearchBudget(max_seconds=0).exhausted(0) is not None
@@ -0,0 +1,39 @@
+from wikipedia.infobox import infobox_parameters, infobox_source, template_spans
+from wikipedia.models import WikipediaArticle
+
+PAGE = "".join([
+    "{{Short description|Band}}<!-- {{ -->\n",
+    "{{Infobox musical artist\n| name = A\n| birth_date = {{birth date and age|1970|1|2}}\n",
+    "| label = [[X Records]], [[Y]]\n| years_active = 1990–2000\n}}\n",
+    "A band.<ref>{{cite web|url=http://example.com/?a=b|title=Infobox}}</ref> [[Link]]\n",
+    "{{Navbox|list={{Infobox person|occupation=Singer}}}} }}",
+])
+
+
+def test_template_spans_are_outermost():
+    text = "a {{b|{{c}}}} <nowiki>{{</nowiki> {{d}} }}"
+    assert [text[start:end] for start, end in template_spans(text)] == ["{{b|{{c}}}}", "{{d}}"]
+
+
+def test_infobox_source_keeps_only_infobox_templates():
+    source = infobox_source(PAGE)
+    assert source.startswith("{{Infobox musical artist") and source.endswith("{{Infobox person|occupation=Singer}}}}")
+    assert "Short description" not in source and "[[Link]]" not in source
+    assert infobox_source("No templates about an Infobox") == ""
+
+
+def test_same_parameters_as_whole_page():
+    assert infobox_parameters(infobox_source(PAGE)) == infobox_parameters(PAGE) == {
+        "birth_date": "1970/1/2", "label": "X Records, Y", "years_active": "1990-2000", "occupation": "Singer"}
+    # Braces inside tags whose contents are not parsed do not close the infobox
+    for tag in ["math", "pre", "syntaxhighlight lang=\"text\"", "nowiki"]:
+        text = f'{{{{Infobox musical artist\n| genre = <{tag}>}}}}</{tag.split()[0]}> Rock\n| label = [[L]]\n}}}}'
+        assert infobox_parameters(infobox_source(text)) == infobox_parameters(text)
+        assert infobox_parameters(text)["label"] == "L"
+
+
+def test_deferred_infobox_parsed_on_access():
+    article = WikipediaArticle(article_title="A")
+    article.infobox_source = infobox_source(PAGE)
+    assert article.infobox["occupation"] == "Singer"
+    assert article.infobox_source is None
@@ -0,0 +1,43 @@
+import json
+
+from instrumentation import Metrics
+
+
+def test_stages_counters_and_rates(tmp_path):
+    metrics = Metrics(tmp_path / "stats.json", every=0)
+    with metrics.time("parse"):
+        pass
+    metrics.record("decompress", 0.5, items=1000)
+    metrics.record("decompress", 0.5, items=3000)
+    metrics.count("articles_expanded")
+    metrics.count("links_seen", 40)
+    metrics.gauge("nodes", 7)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["parse"]["calls"] == 1
+    assert snapshot["stages"]["decompress"] == {"calls": 2, "seconds": 1.0, "items": 4000, "items_per_second": 4000.0,
+                                                "share_of_run": snapshot["stages"]["decompress"]["share_of_run"]}
+    assert snapshot["counters"] == {"articles_expanded": 1, "links_seen": 40}
+    assert snapshot["gauges"] == {"nodes": 7}
+    assert snapshot["rates"]["links_per_second"] > snapshot["rates"]["articles_per_second"] > 0
+    assert "decompress" in metrics.summary()
+
+    metrics.report_if_due()  # every=0 never reports on its own
+    assert not (tmp_path / "stats.json").exists()
+    metrics.reset()
+    assert metrics.snapshot()["stages"] == {}
+
+
+def test_report_writes_json_and_prometheus(tmp_path):
+    for name in ["stats.json", "stats.prom"]:
+        metrics = Metrics(tmp_path / name)
+        metrics.record("redis_read", 0.25, items=10)
+        metrics.count("edges_found", 3)
+        metrics.report()
+        text = (tmp_path / name).read_text()
+        if name.endswith(".json"):
+            assert json.loads(text)["stages"]["redis_read"]["items"] == 10
+        else:
+            assert 'wikipedia_search_stage_seconds_total{stage="redis_read"} 0.25' in text
+            assert "wikipedia_search_edges_found_total 3" in text
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["stats.json", "stats.prom"]
@@ -0,0 +1,22 @@
+from wikipedia.models import TitleInterner, WikipediaArticle
+
+
+def test_title_interner_assigns_dense_ids_once():
+    interner = TitleInterner()
+    ids = interner.intern_all(["A", "B", "A"])
+    assert list(ids) == [0, 1, 0]
+    assert interner.title(1) == "B" and len(interner) == 2
+
+
+def test_article_url_derived_from_title():
+    assert WikipediaArticle(article_title="Guns N' Roses").article_url == "https://en.wikipedia.org/wiki/Guns_N'_Roses"
+    assert WikipediaArticle(article_title="A", article_url="url 1").article_url == "url 1"
+
+
+def test_outgoing_links_round_trip_through_ids():
+    article = WikipediaArticle(article_title="Source")
+    assert article.outgoing_links is None and article.link_count() == 0
+    article.set_outgoing_link_titles(["Second", "First"])
+    assert [link.article_title for link in article.outgoing_links] == ["Second", "First"]
+    assert article.link_count() == 2
+    assert not hasattr(article, "__dict__")
@@ -0,0 +1,33 @@
+from wikipedia.pages import find_page, iter_pages, page_redirect, page_title
+
+BLOCK = "".join([
+    "  <page>\n    <title>First</title>\n    <id>1</id>\n    <revision>\n      <id>2</id>\n",
+    "      <text>one</text>\n    </revision>\n  </page>\n",
+    "  <page>\n    <title>Second</title>\n    <id>2</id>\n    <revision>\n      <id>30</id>\n",
+    "      <text>two</text>\n    </revision>\n  </page>\n",
+])
+
+
+def test_find_page_skips_revision_ids():
+    page = find_page(BLOCK, 2)
+    assert page.startswith("<page>") and page.endswith("</page>")
+    assert "<title>Second</title>" in page and "First" not in page
+
+
+def test_find_page_missing():
+    assert find_page(BLOCK, 30) is None
+    assert find_page(BLOCK, 3) is None
+
+
+def test_iter_pages():
+    assert [page_id for page_id, _ in iter_pages(BLOCK)] == [1, 2]
+
+
+def test_page_title_is_unescaped():
+    assert page_title("<page><title>Guns N&apos; Roses &amp; Co</title><id>1</id></page>") == "Guns N' Roses & Co"
+
+
+def test_page_redirect():
+    redirect = "<page><title>Beatles</title><id>3</id><redirect title=\"The Beatles &amp; Co\" /></page>"
+    assert page_redirect(redirect) == "The Beatles & Co"
+    assert page_redirect(BLOCK) is None
@@ -0,0 +1,17 @@
+from io import StringIO
+
+import pytest
+
+from data_stores.sqlite import iter_index_rows
+
+INDEX = "70:10:Artist 0\n70:11:Category:Jazz: a history\n2238:12:Artist 2\n"
+
+
+def test_iter_index_rows_ends_streams():
+    assert list(iter_index_rows(StringIO(INDEX), archive_size=4100)) == [
+        (70, 10, "Artist 0", 2238), (70, 11, "Category:Jazz: a history", 2238), (2238, 12, "Artist 2", 4100)]
+
+
+def test_iter_index_rows_rejects_unsorted_index():
+    with pytest.raises(ValueError):
+        list(iter_index_rows(StringIO("2238:12:Artist 2\n70:10:Artist 0\n"), archive_size=4100))
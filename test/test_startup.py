@@ -0,0 +1,18 @@
+import pytest
+
+import config
+from benchmarks.startup import import_cost
+
+
+def test_startup_modules_stay_light():
+    for module in ["config", "wikipedia.parallel"]:
+        cost = import_cost(module, repeat=1)
+        assert cost.heavy_dependencies == [] and cost.settings_read == []
+
+
+def test_connection_settings_load_on_first_access():
+    assert config.REDIS_CONNECTION_PARAMETERS is config.REDIS_CONNECTION_PARAMETERS
+    assert {"host", "port"} <= config.REDIS_CONNECTION_PARAMETERS.keys()
+    with pytest.raises(AttributeError):
+        config.NO_SUCH_SETTING
+
@@ -0,0 +1,26 @@
+from wikipedia.stream_cache import DecompressedStreamCache
+
+
+def test_hits_and_misses():
+    cache = DecompressedStreamCache(max_bytes=100)
+    assert cache.get(0) is None
+    cache.put(0, "<page/>", size=7)
+    assert cache.get(0) == "<page/>"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = DecompressedStreamCache(max_bytes=10)
+    cache.put(0, "a", size=4)
+    cache.put(10, "b", size=4)
+    cache.get(0)  # 10 is now the least recently used stream
+    cache.put(20, "c", size=4)
+    assert 10 not in cache and 0 in cache and 20 in cache
+    assert cache.evictions == 1
+    assert cache.current_bytes == 8
+
+
+def test_oversized_streams_and_disabled_cache():
+    cache = DecompressedStreamCache(max_bytes=0)
+    cache.put(0, "a", size=1)
+    assert len(cache) == 0 and cache.get(0) is None
@@ -0,0 +1,52 @@
+from benchmarks.stand_ins import memory_cache
+from data_stores.redis_.tiered_cache import BloomFilter
+from wikipedia.models import WikipediaArticle
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    titles = [f"Artist {i}" for i in range(1000)]
+    for title in titles:
+        bloom.add(title)
+    assert all(title in bloom for title in titles)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"Artist {i}")
+    false_positives = sum(f"Unseen {i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_tiers():
+    cache = memory_cache(tiered=True, expected_titles=100, max_local_entries=2)
+    artists = [WikipediaArticle(article_title=f"Artist {i}") for i in range(3)]
+    cache.store_many((artist, True) for artist in artists)
+    # The oldest classification is evicted from the local map, but is still in Redis
+    assert list(cache._local) == ["Artist 1", "Artist 2"]
+    unseen = WikipediaArticle(article_title="Unseen")
+    assert cache.retrieve_many([unseen, artists[1], artists[0]]) == [None, True, True]
+    assert cache.stats() == {"bloom_negatives": 1, "local_hits": 1, "redis_hits": 1, "redis_misses": 0,
+                             "local_entries": 2}
+    # The title fetched from Redis is now the most recently used, and Artist 2 the least
+    assert list(cache._local) == ["Artist 1", "Artist 0"]
+    assert cache.retrieve_classification(artists[0]) is True
+    assert cache.stats()["local_hits"] == 2
+
+
+def test_redis_fall_through():
+    cache = memory_cache(tiered=True, expected_titles=100)
+    cache._conn.set("Warmed", 1)
+    cache._conn.set("Deleted", 0)
+    cache.warm()
+    cache._conn.delete("Deleted")
+    seen_titles_bits = bytes(cache.seen_titles._bits)
+    assert cache.retrieve_many([WikipediaArticle(article_title="Warmed"),
+                                WikipediaArticle(article_title="Deleted")]) == [True, None]
+    assert cache.stats() == {"bloom_negatives": 0, "local_hits": 0, "redis_hits": 1, "redis_misses": 1,
+                             "local_entries": 1}
+    # Titles found in Redis were already in the Bloom filter, and are only added to the local map
+    assert bytes(cache.seen_titles._bits) == seen_titles_bits
+    assert dict(cache._local) == {"Warmed": True}
+
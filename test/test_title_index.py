@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from wikipedia.title_index import RedirectTable, TitleIndex, build_redirect_table, build_title_index
+
+ROWS = [(70, 10, "Artist 0", 2238), (70, 11, "Artist 1", 2238), (2238, 12, "Not An Artist", 4100),
+        (2238, 13, "Artist 0", 4100)]
+
+
+@pytest.fixture
+def title_index(tmp_path):
+    conn = sqlite3.connect(tmp_path / "index.db")
+    conn.execute("CREATE TABLE articles (first_byte, page_id, title, last_byte)")
+    conn.executemany("INSERT INTO articles VALUES (?, ?, ?, ?)", ROWS)
+    conn.commit()
+    conn.close()
+    assert build_title_index(tmp_path / "index.db", tmp_path / "title_index") == 3
+    return TitleIndex(tmp_path / "title_index")
+
+
+def test_lookup_keeps_first_row(title_index):
+    assert title_index.lookup("Artist 0") == (70, 10, 2238)
+    assert title_index.lookup("Not An Artist") == (2238, 12, 4100)
+    assert title_index.lookup("Missing") is None
+
+
+def test_lookup_many(title_index):
+    assert title_index.lookup_many(["Missing", "Artist 1", "Artist 1"]) == {"Artist 1": (70, 11, 2238)}
+    assert title_index.lookup_many([]) == {}
+
+
+def test_stream_ranges(title_index):
+    assert title_index.stream_ranges() == [(70, 2238), (2238, 4100)]
+
+
+def test_missing_index(tmp_path):
+    with pytest.raises(TitleIndex.MissingIndexError):
+        TitleIndex(tmp_path)
+
+
+class StubSearcher:
+    multistream_path = "stub.xml.bz2"
+
+    def iter_streams(self):
+        pages = [("Beatles", "The Beatles"), ("Fab Four", "Beatles"), ("Help", "Help!#Album")]
+        yield 0, 100, "".join(f'<page><title>{title}</title><id>{i}</id><redirect title="{target}" /></page>'
+                              for i, (title, target) in enumerate(pages))
+        yield 100, 200, "<page><title>The Beatles</title><id>9</id><revision><id>10</id></revision></page>"
+
+    def lookup_indices(self, titles):
+        return {title: (100, 9, 200) for title in titles if title == "The Beatles"}
+
+
+def test_redirect_table_follows_chains(tmp_path):
+    assert build_redirect_table(StubSearcher(), tmp_path) == 3
+    redirects = RedirectTable(tmp_path)
+    assert redirects.target("Fab Four") == ("The Beatles", 9)
+    assert redirects.target("Help") == ("Help!", -1)
+    assert redirects.target("The Beatles") is None
+    assert redirects.resolve_many(["Beatles", "Yoko Ono"]) == ["The Beatles", "Yoko Ono"]
@@ -0,0 +1,30 @@
+from wikipedia.analysis import scan_wikitext
+from wikipedia.titles import canonical_title, link_titles
+
+
+def test_canonical_title_normalizes_articles():
+    assert canonical_title("rock_music") == "Rock music"
+    assert canonical_title("  The  Beatles#Early years") == "The Beatles"
+    assert canonical_title(":Guns N' Roses") == "Guns N' Roses"
+    assert canonical_title("Simon & Garfunkel") == "Simon & Garfunkel"
+    assert canonical_title("Star Wars: Episode IV") == "Star Wars: Episode IV"
+    assert canonical_title("Q: Are We Not Men? A: We Are Devo!") == "Q: Are We Not Men? A: We Are Devo!"
+
+
+def test_canonical_title_drops_non_articles():
+    for link_target in ["File:a.jpg", "Image:a.jpg", "category:Stuff", ":Category:Stuff", "Template:Infobox",
+                        "wikt:yeet", "Wiktionary:yeet", "fr:Daft Punk", "zh-yue:Beyond", "q:Someone", "#History",
+                        "/Subpage", "Bad {{title}}", ""]:
+        assert canonical_title(link_target) is None, link_target
+
+
+def test_link_titles_finds_nested_links_once():
+    wikitext = ("[[File:Band.jpg|thumb|The band with [[rock_music|rock]] fans, see [[The Beatles#Early years]]]] "
+                "[[Rock music]] [[AC/DC]] [[Category:Bands]] [[[Bracketed]]] [[Not a [title]]] [[Sub|{{label}}]]")
+    assert link_titles(wikitext) == ["Rock music", "The Beatles", "AC/DC", "Bracketed", "Sub"]
+
+
+def test_scan_wikitext_only_reads_links_of_artists():
+    assert scan_wikitext("[[Link]] ==Discography==") == (True, ["Link"])
+    assert scan_wikitext("[[Template:Infobox musical artist]]") == (True, [])
+    assert scan_wikitext("[[Link]] ==History==") == (False, [])
@@ -0,0 +1,71 @@
+"""
+A read-only memory map of Wikipedia's multi-stream bzip2 file.
+
+The archive is mapped once and its compressed streams are handed to the decompressor as memoryview slices of the
+mapping, so reading a stream costs neither a system call nor a copy. The mapping is backed by the page cache, so every
+process that maps the archive (the searcher and each of the ParallelExtractor's workers) shares the same physical
+pages of it.
+"""
+import mmap
+from os import PathLike
+from typing import Dict
+
+
+class ArchiveMap:
+    """
+    The whole archive, memory-mapped for the lifetime of the object.
+    """
+
+    def __init__(self, multistream_path: PathLike):
+        """
+        :param multistream_path: path to the multi-stream bzip2 archive
+        """
+        self.multistream_path = multistream_path
+        with open(multistream_path, "rb") as wiki_file:
+            # The mapping stays valid once the file is closed
+            self._map = mmap.mmap(wiki_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._map.closed
+
+    def view(self, start_index: int, end_index: int) -> memoryview:
+        """
+        :param start_index: Starting point of the compressed bytes of interest.
+        :param end_index: Stopping point of the compressed bytes of interest; negative for the end of the file.
+        :return: a zero-copy view of the bytes between those points. Release it (or use it in a with block) before
+                 the archive is closed.
+        """
+        return memoryview(self._map)[start_index:end_index if end_index >= 0 else len(self._map)]
+
+    def close(self) -> None:
+        """
+        Unmap the archive. Raises BufferError while any view of it is still held.
+        """
+        if not self._map.closed:
+            self._map.close()
+
+
+# The archives mapped by this process, for the worker processes of ParallelExtractor (see archive_map)
+_process_archives: Dict[str, ArchiveMap] = {}
+
+
+def archive_map(multistream_path: PathLike) -> ArchiveMap:
+    """
+    :param multistream_path: path to the multi-stream bzip2 archive
+    :return: this process's mapping of the archive, made on first use and kept for the life of the process
+    """
+    key = str(multistream_path)
+    archive = _process_archives.get(key)
+    if archive is None or archive.closed:
+        archive = _process_archives[key] = ArchiveMap(multistream_path)
+    return archive
@@ -0,0 +1,201 @@
+"""
+Batch extraction of many articles from the archive, for analysis outside of the search.
+
+Titles may be written the way links write them ("rock music", "The_Beatles"): each is turned into the form the index
+uses, and resolved through the searcher's redirect table if it has one. The titles are then looked up in the index all
+at once and grouped by the stream that holds them. The streams are then read in offset order, so each stream is
+decompressed once however many of the titles it holds; with a ParallelExtractor, its workers decompress and parse them.
+Each article is written as a JSON record as soon as its stream is done. A record has the article's title, page id,
+classification, outgoing links (kept for artists only, as in the search), and infobox, and optionally its XML; its
+title is the one it was requested by. Titles missing from the archive are collected and returned at the end.
+"""
+import json
+from collections import defaultdict
+from hashlib import blake2b
+from os import PathLike, makedirs
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from config import LOG_UPDATE_BATCH_EVERY, make_logger
+from wikipedia.models import ClassifiedPage
+from wikipedia.pages import find_page
+from wikipedia.parallel import ParallelExtractor, StreamRange
+from wikipedia.reader import WikipediaArchiveSearcher, classify_page
+from wikipedia.titles import canonical_title
+
+logger = make_logger(__name__)
+
+# The longest file name most file systems allow, in bytes
+MAX_FILE_NAME_BYTES = 255
+
+
+class JsonLinesWriter:
+    """
+    Writes each article's record as a line of a single JSON Lines file.
+    """
+
+    def __init__(self, path: PathLike):
+        """
+        :param path: the file to write, replaced if it exists
+        """
+        self.path = Path(path)
+        makedirs(self.path.parent, exist_ok=True)
+        self._file = open(self.path, "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ArticleFileWriter:
+    """
+    Writes each article's record to a JSON file of its own, named by the title it was requested by, so that an article
+    requested by several titles is written to a file for each of them.
+    """
+
+    def __init__(self, directory: PathLike):
+        """
+        :param directory: the directory to write to, created if needed
+        """
+        self.directory = Path(directory)
+        makedirs(self.directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with open(self.directory / article_file_name(record["title"]), "w") as article_file:
+            json.dump(record, article_file, ensure_ascii=False)
+
+    def close(self) -> None:
+        pass
+
+
+def article_file_name(title: str) -> str:
+    """
+    :param title: the title an article was requested by
+    :return: the name of the article's file written by ArticleFileWriter: the title with the characters that are not
+             safe in a file name percent-encoded, shortened and suffixed with a hash of the title if it is too long
+    """
+    file_name = quote(title, safe=" ,'()!&+-") + ".json"
+    if len(file_name) > MAX_FILE_NAME_BYTES:
+        title_hash = blake2b(title.encode(), digest_size=8).hexdigest()
+        prefix = file_name[:MAX_FILE_NAME_BYTES - len(title_hash) - len("-.json")]
+        # Drop an escape cut in two
+        escape_start = prefix.rfind("%", len(prefix) - 2)
+        file_name = f'{prefix if escape_start == -1 else prefix[:escape_start]}-{title_hash}.json'
+    return file_name
+
+
+def read_titles(lines: Iterable[str]) -> List[str]:
+    """
+    :param lines: lines of text holding one title each, such as an open titles file or stdin
+    :return: the titles, stripped of surrounding whitespace, in order and without blanks or duplicates
+    """
+    return list(dict.fromkeys(title for title in (line.strip() for line in lines) if title))
+
+
+def article_record(title: str, page: ClassifiedPage, page_xml: Optional[str] = None) -> Dict[str, Any]:
+    """
+    :param title: the title the article was requested by
+    :param page: the analyzed page of the article
+    :param page_xml: the XML of the page, to include in the record
+    :return: the record of the article written by extract_batch
+    """
+    record = {"title": title, "article_title": page.title, "page_id": page.page_id,
+              "is_musical_artist": page.is_musical_artist, "links": page.link_titles, "infobox": page.infobox}
+    if page_xml is not None:
+        record["xml"] = page_xml
+    return record
+
+
+def extract_batch(searcher: WikipediaArchiveSearcher, titles: List[str], writer, extractor: ParallelExtractor = None,
+                  with_xml: bool = False) -> List[str]:
+    """
+    Extracts many articles, visiting the archive in offset order and writing each article as its stream is done.
+    :param searcher: the searcher whose index locates the articles
+    :param titles: the titles of the articles to extract, as written by users or in links
+    :param writer: a JsonLinesWriter or ArticleFileWriter that each article's record is written to; an article
+                   requested by several titles is written once for each of them
+    :param extractor: if given, the streams are decompressed and parsed by its worker processes
+    :param with_xml: include the XML of each page in its record
+    :return: the titles that are not in the archive, in the order they were given
+    """
+    titles = list(dict.fromkeys(titles))
+    index_titles = resolve_titles(searcher, titles)
+    locations = searcher.lookup_indices(title for title in index_titles.values() if title is not None)
+    requests: Dict[StreamRange, List[int]] = defaultdict(list)
+    titles_by_page_id: Dict[int, List[str]] = defaultdict(list)
+    for title in titles:
+        location = locations.get(index_titles[title])
+        if location is not None:
+            start_index, page_id, end_index = location
+            if page_id not in titles_by_page_id:
+                requests[(start_index, end_index)].append(page_id)
+            titles_by_page_id[page_id].append(title)
+    for page_ids in requests.values():
+        # Pages appear in a stream in the order of their ids, and so does the output
+        page_ids.sort()
+    requested_count = sum(len(page_titles) for page_titles in titles_by_page_id.values())
+    logger.info(f'Extracting {len(locations)} articles from {len(requests)} streams '
+                f'({len(titles) - requested_count} titles not in the index)')
+
+    found = set()
+    for stream_count, (stream, pages) in enumerate(_iter_stream_pages(searcher, requests, extractor, with_xml),
+                                                   start=1):
+        previous_count = len(found)
+        for page, page_xml in pages:
+            for title in titles_by_page_id[page.page_id]:
+                writer.write(article_record(title, page, page_xml))
+                found.add(title)
+        if len(found) // LOG_UPDATE_BATCH_EVERY != previous_count // LOG_UPDATE_BATCH_EVERY:
+            logger.info(f'Wrote {len(found)} of {requested_count} articles ({stream_count} of {len(requests)} '
+                        f'streams)...')
+
+    not_found = [title for title in titles if title not in found]
+    logger.info(f'Wrote {len(found)} articles; {len(not_found)} titles were not found')
+    return not_found
+
+
+def resolve_titles(searcher: WikipediaArchiveSearcher, titles: List[str]) -> Dict[str, Optional[str]]:
+    """
+    :param searcher: the searcher whose redirect table, if any, the titles are resolved through
+    :param titles: titles as written by users or in links
+    :return: a mapping from each title to the title of the article in the index it stands for, or None for a title
+             outside the article namespace
+    """
+    canonical_titles = {title: canonical_title(title) for title in titles}
+    if searcher.redirects is not None:
+        valid_titles = [title for title in titles if canonical_titles[title] is not None]
+        canonical_titles.update(zip(valid_titles, searcher.redirects.resolve_many([canonical_titles[title]
+                                                                                   for title in valid_titles])))
+    return canonical_titles
+
+
+def _iter_stream_pages(searcher: WikipediaArchiveSearcher, requests: Dict[StreamRange, List[int]],
+                       extractor: ParallelExtractor = None,
+                       with_xml: bool = False) -> Iterator[Tuple[StreamRange, List[Tuple[ClassifiedPage, str]]]]:
+    if extractor is not None:
+        for stream, pages in extractor.extract_pages(requests, with_xml=with_xml):
+            yield stream, pages if with_xml else [(page, None) for page in pages]
+        return
+    for start_index, end_index in sorted(requests):
+        xml_block = searcher.extract_indexed_range(start_index, end_index)
+        pages = []
+        for page_id in requests[(start_index, end_index)]:
+            page_xml = find_page(xml_block, page_id)
+            if page_xml is not None:
+                pages.append((classify_page(page_xml, page_id), page_xml if with_xml else None))
+        yield (start_index, end_index), pages
@@ -0,0 +1,146 @@
+"""
+Extraction of an article's infobox without parsing the rest of its wikitext.
+
+Running mwparserfromhell over a whole artist page spends most of its time on references and citation templates that
+are thrown away. infobox_source instead finds the outermost {{templates}} that mention an infobox with a scan for
+matching braces, and only those are parsed. Every template mwparserfromhell would have found with "Infobox" in it lies
+inside one of them, so the parameters come out the same as from a parse of the whole page.
+
+The source can also be kept as is and parsed later (see WikipediaArticle.infobox), so that a search only parses the
+infoboxes of the nodes it actually writes.
+"""
+import re
+from typing import Dict, List, Tuple
+
+INFOBOX_MARKER = "Infobox"
+TRACKED_PARAMS = ["birth_name", "birth_date", "birth_place", "alias", "occupation", "years_active", "net_worth",
+                  "website", "origin", "background", "genre", "label", "instrument", "organization"]
+# Braces inside comments, <nowiki>, and the tags whose contents mwparserfromhell leaves unparsed are text to it, so
+# they are matched (and skipped) first
+BRACE_TOKENS = re.compile(r"<!--.*?-->|<nowiki>.*?</nowiki>"
+                          r"|<(math|pre|syntaxhighlight|source|score|chem|ce|timeline|hiero|gallery)\b[^>]*>.*?</\1>"
+                          r"|\{\{|\}\}", re.DOTALL | re.IGNORECASE)
+
+
+def template_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    :param text: the wikitext of a page
+    :return: the start and end of every outermost {{template}} in the text, in order. Unmatched braces are left out.
+    """
+    opened, spans = [], []
+    for token in BRACE_TOKENS.finditer(text):
+        if token.group() == "{{":
+            opened.append(token.start())
+        elif token.group() == "}}" and opened:
+            spans.append((opened.pop(), token.end()))
+    # Matched braces nest, so a span starting inside the last outermost span also ends inside it
+    outermost = []
+    for start, end in sorted(spans):
+        if not outermost or start >= outermost[-1][1]:
+            outermost.append((start, end))
+    return outermost
+
+
+def infobox_source(text: str) -> str:
+    """
+    :param text: the wikitext of a page
+    :return: the outermost templates of the page that contain an infobox, one per line; empty if there are none
+    """
+    return "\n".join(text[start:end] for start, end in template_spans(text) if INFOBOX_MARKER in text[start:end])
+
+
+def infobox_parameters(source: str, tracked_params: List[str] = TRACKED_PARAMS) -> Dict[str, str]:
+    """
+    Parses the tracked parameters out of the infobox templates of a page.
+    :param source: the page's wikitext, or just the templates returned by infobox_source
+    :param tracked_params: the parameters to keep; a parameter is kept if one of these is part of its name
+    :return: the processed value of each tracked parameter found (see process_parameter)
+    """
+    if INFOBOX_MARKER not in source:
+        return {}
+    import mwparserfromhell  # only once a page has an infobox to parse, since it is slow to import
+    templates = [template for template in mwparserfromhell.parse(source).filter_templates()
+                 if INFOBOX_MARKER in template]
+    all_params = []
+    for template in templates:
+        all_params += template.params
+    all_params = [param for param in all_params
+                  if ("=" in param
+                      and param[0] != "="
+                      and param[-1:] != 0)]
+    parameters_dict = {}
+    for seen_param in all_params:
+        equals_index = seen_param.index("=")
+        key = seen_param[0:equals_index]
+        value = seen_param[equals_index + 1:len(seen_param)]
+        for tracked_param in tracked_params:
+            if tracked_param in key:
+                process_parameter(tracked_param, value, parameters_dict)
+    return parameters_dict
+
+
+def process_parameter(key: str, value: str, parameters_dict: dict):
+    """Process the value based on what the key is, and update parameters_dict
+
+    :param key: the type of information contained in value, and the key for parameters_dict
+    :param value: the information stored in the parameter
+    :param parameters_dict: a store of the information related in a wiki page's parameters
+    """
+    value = value.strip()
+
+    if key == "birth_date":
+        value = value.split("}}<ref")[0] if "ref" in value else value[2:len(value) - 2]
+        date = [section for section in value.split("|")
+                if section.isdigit()]
+        if len(date) == 3:
+            parameters_dict[key] = "/".join([date[0], date[1], date[2]])
+    elif key == "net_worth":
+        value = value.split("<ref")[0]
+        value = " ".join(value.split("&nbsp;"))
+    elif key == "website":
+        #get rid of {{URL| and }}
+        value = value[6:len(value) - 2]
+    elif key == "years_active":
+        value = "-".join(value.split("\u2013"))
+    elif key in ["birth_place", "origin"]:
+        new_values = []
+        value = value.split("<ref")[0]
+        values = [val.strip() for val in value.split(",")]
+        for entry in values:
+            val = entry.strip()
+            vals = val.split("|")
+            vals = [(val[2:] if "[[" in val else val)
+                    for val in vals]
+            vals = [(val[:len(val) - 2] if "]]" in val else val)
+                    for val in vals]
+            new_values.append(", ".join(vals))
+        value = ", ".join(list(set(new_values)))
+    elif key == "background":
+        value = " ".join(value.split("<!")[0].strip().split("_"))
+
+    elif "flatlist" in value or "plainlist" in value or "hlist" in value:
+        values = value.split("\n") if "\n" in value else value.split(",")
+        values = values[1:len(values)-1]
+        values = [val[1:len(val)] for val in values]
+        values = [val.strip() for val in values]
+        new_values = []
+        for val in values:
+            if "[[" in val and "|" in val:
+                new_values.append(val.split("|")[0][2:])
+            elif "[[" in val:
+                new_values.append(val[2:len(val)-2])
+            else:
+                new_values.append(val)
+        value = ", ".join(new_values)
+
+    elif "[[" in value:
+        values = value.split(", ")
+        values = [val.split("|")[0] for val in values]
+        values = [(val[2:] if "[[" in val else val)
+                  for val in values]
+        values = [(val[:len(val) - 2] if "]]" in val else val)
+                  for val in values]
+        value = ", ".join(values)
+
+    if key != "birth_date":
+        parameters_dict[key] = value
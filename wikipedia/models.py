@@ -5,21 +5,134 @@ For more information visit https://en.wikipedia.org/wiki/Wikipedia:About
 """
 from __future__ import annotations
 
-from typing import List
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from wikipedia.infobox import infobox_parameters
+
+WIKIPEDIA_URL_PREFIX = "https://en.wikipedia.org/wiki"
+
+
+def article_url_for(title: str) -> str:
+    """
+    :param title: the title of an article
+    :return: the URL of the article on English Wikipedia
+    """
+    return "/".join([WIKIPEDIA_URL_PREFIX, "_".join(title.split(" "))])
+
+
+class TitleInterner:
+    """
+    Maps every distinct article title to a small integer id, so that each title is held in memory once no matter how
+    many articles link to it. Ids are dense and never reused.
+    """
+    __slots__ = ("_ids", "_titles")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._titles: List[str] = []
+
+    def intern(self, title: str) -> int:
+        """
+        :param title: the title to intern
+        :return: the id of the title, assigned on first sight
+        """
+        title_id = self._ids.get(title)
+        if title_id is None:
+            title_id = self._ids[title] = len(self._titles)
+            self._titles.append(title)
+        return title_id
+
+    def intern_all(self, titles: Iterable[str]) -> array:
+        """
+        :param titles: the titles to intern
+        :return: the ids of the titles, in order, as a compact integer array
+        """
+        return array('i', map(self.intern, titles))
+
+    def title(self, title_id: int) -> str:
+        """
+        :param title_id: an id returned by intern
+        :return: the title it stands for
+        """
+        return self._titles[title_id]
+
+    def __len__(self):
+        return len(self._titles)
+
+
+# Shared by every article in the process; worker processes only ever hand back titles, never ids
+title_interner = TitleInterner()
 
 
 class WikipediaArticle:
     """
     Represents an article page on Wikipedia. See https://mwparserfromhell.readthedocs.io/en/latest/
+
+    Millions of these sit in the search queue at once, so they are kept small: outgoing links are stored as an array
+    of interned title ids and only turned into WikipediaArticle objects when asked for, and the URL is derived from
+    the title when a store needs it rather than kept on every instance.
     """
+    __slots__ = ("article_title", "_article_url", "index_key", "outgoing_link_ids", "_infobox", "infobox_source",
+                 "page_id")
 
-    def __init__(self, article_title=None, article_url=None, index_key=None, outgoing_links=None):
+    def __init__(self, article_title=None, article_url=None, index_key=None, outgoing_links=None, page_id=None):
         self.article_title = article_title
-        self.article_url = article_url
+        self._article_url = article_url
         self.index_key = index_key
+        self.outgoing_link_ids: Optional[array] = None
         self.outgoing_links = outgoing_links
-        self.infobox = None
+        self._infobox = None
+        self.infobox_source: Optional[str] = None
+        self.page_id = page_id
+
+    @property
+    def article_url(self) -> Optional[str]:
+        if self._article_url is None and self.article_title is not None:
+            return article_url_for(self.article_title)
+        return self._article_url
+
+    @article_url.setter
+    def article_url(self, article_url: Optional[str]) -> None:
+        self._article_url = article_url
+
+    @property
+    def infobox(self) -> Optional[Dict[str, str]]:
+        """
+        When the infobox was deferred, only its source is kept, and it is parsed here on first access: that is, when
+        the article's node is written.
+        """
+        if self._infobox is None and self.infobox_source is not None:
+            self._infobox = infobox_parameters(self.infobox_source)
+            self.infobox_source = None
+        return self._infobox
 
+    @infobox.setter
+    def infobox(self, infobox: Optional[Dict[str, str]]) -> None:
+        self._infobox = infobox
+
+    @property
+    def outgoing_links(self) -> Optional[List[WikipediaArticle]]:
+        """
+        A new list of new articles on every access, so callers that compare links by identity should read it once.
+        """
+        if self.outgoing_link_ids is None:
+            return None
+        return [WikipediaArticle(article_title=title_interner.title(title_id)) for title_id in self.outgoing_link_ids]
+
+    @outgoing_links.setter
+    def outgoing_links(self, outgoing_links: Optional[Iterable[WikipediaArticle]]) -> None:
+        self.outgoing_link_ids = None if outgoing_links is None else \
+            title_interner.intern_all(article.article_title for article in outgoing_links)
+
+    def set_outgoing_link_titles(self, titles: Iterable[str]) -> None:
+        """
+        :param titles: the titles this article links to, without duplicates
+        """
+        self.outgoing_link_ids = title_interner.intern_all(titles)
+
+    def link_count(self) -> int:
+        return len(self.outgoing_link_ids) if self.outgoing_link_ids is not None else 0
 
     def __str__(self):
         return "".join(["title: ", self.article_title, ", ",
@@ -29,3 +142,15 @@ class WikipediaArticle:
         return self.outgoing_links
 
 
+class ClassifiedPage(NamedTuple):
+    """
+    The compact result of analyzing a single page of the archive: everything the search needs to know about it.
+    Non-artist pages carry no links and an empty infobox. When the infobox was deferred it is None, and
+    infobox_source holds the templates to parse it from (see wikipedia.infobox).
+    """
+    page_id: int
+    title: str
+    is_musical_artist: bool
+    link_titles: List[str]
+    infobox: Optional[Dict[str, str]]
+    infobox_source: Optional[str] = None
@@ -0,0 +1,92 @@
+"""
+Fast page-boundary scanning of decompressed blocks of Wikipedia's multi-stream XML.
+
+A decompressed stream holds ~100 <page> nodes. Plain string searches are enough to cut a single page out of a block
+before handing it to the (much slower) MWParser, since the wikitext inside <text> is XML-escaped and can never
+contain a literal tag.
+"""
+from html import unescape
+from typing import Iterator, Optional, Tuple
+
+PAGE_START_TAG = "<page>"
+PAGE_END_TAG = "</page>"
+ID_START_TAG = "<id>"
+ID_END_TAG = "</id>"
+TITLE_START_TAG = "<title>"
+TITLE_END_TAG = "</title>"
+REDIRECT_START_TAG = '<redirect title="'
+
+
+def find_page(xml_block: str, page_id: int) -> Optional[str]:
+    """
+    Cut the <page> node with the given id out of a block of XML.
+
+    Revisions and contributors carry <id> tags of their own, so a match only counts when it is the first <id> after
+    the enclosing <page> tag.
+
+    :param xml_block: the decompressed text of a multistream block
+    :param page_id: the id of the page that is desired
+    :return: the XML of the matching <page> node, or None if the block does not contain it
+    """
+    needle = "".join([ID_START_TAG, str(page_id), ID_END_TAG])
+    position = xml_block.find(needle)
+    while position != -1:
+        page_start = xml_block.rfind(PAGE_START_TAG, 0, position)
+        if page_start != -1 and xml_block.find(ID_START_TAG, page_start, position) == -1:
+            page_end = xml_block.find(PAGE_END_TAG, position)
+            if page_end == -1:
+                return None
+            return xml_block[page_start:page_end + len(PAGE_END_TAG)]
+        position = xml_block.find(needle, position + len(needle))
+    return None
+
+
+def iter_pages(xml_block: str) -> Iterator[Tuple[int, str]]:
+    """
+    Walk every complete <page> node in a block of XML.
+
+    :param xml_block: the decompressed text of a multistream block
+    :return: an iterator of (page id, page XML) pairs in the order the pages appear
+    """
+    page_start = xml_block.find(PAGE_START_TAG)
+    while page_start != -1:
+        page_end = xml_block.find(PAGE_END_TAG, page_start)
+        if page_end == -1:
+            return
+        page_end += len(PAGE_END_TAG)
+        id_start = xml_block.find(ID_START_TAG, page_start, page_end)
+        id_end = xml_block.find(ID_END_TAG, id_start, page_end)
+        if id_start != -1 and id_end != -1:
+            yield int(xml_block[id_start + len(ID_START_TAG):id_end]), xml_block[page_start:page_end]
+        page_start = xml_block.find(PAGE_START_TAG, page_end)
+
+
+def page_title(page_xml: str) -> Optional[str]:
+    """
+    Read the title of a single <page> node.
+
+    :param page_xml: the XML of one page, as returned by find_page or iter_pages
+    :return: the unescaped title of the page, or None if it has no <title> tag
+    """
+    title_start = page_xml.find(TITLE_START_TAG)
+    title_end = page_xml.find(TITLE_END_TAG, title_start)
+    if title_start == -1 or title_end == -1:
+        return None
+    return unescape(page_xml[title_start + len(TITLE_START_TAG):title_end])
+
+
+def page_redirect(page_xml: str) -> Optional[str]:
+    """
+    Read the target of a redirect page.
+
+    :param page_xml: the XML of one page, as returned by find_page or iter_pages
+    :return: the unescaped title the page redirects to, or None if it is not a redirect
+    """
+    redirect_start = page_xml.find(REDIRECT_START_TAG)
+    if redirect_start == -1:
+        return None
+    redirect_start += len(REDIRECT_START_TAG)
+    redirect_end = page_xml.find('"', redirect_start)
+    if redirect_end == -1:
+        return None
+    return unescape(page_xml[redirect_start:redirect_end])
@@ -0,0 +1,130 @@
+"""
+Multi-core decompression and parsing of Wikipedia's multi-stream bzip2 file.
+
+Streams are handed to a pool of worker processes by their byte range in the archive. Each worker reads, decompresses,
+and analyzes its stream on its own core and sends back only the compact ClassifiedPage results. Every worker maps the
+archive once, when it starts, and reads streams out of the mapping; the mappings of all workers share the page cache.
+"""
+import bz2
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from os import PathLike
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from config import EXTRACTION_WORKERS
+from wikipedia.archive import archive_map
+from wikipedia.models import ClassifiedPage
+from wikipedia.pages import find_page, iter_pages
+from wikipedia.reader import classify_page
+
+StreamRange = Tuple[int, int]
+PageWithXml = Tuple[ClassifiedPage, str]
+
+
+def stream_pages(multistream_path: PathLike, start_index: int, end_index: int,
+                 page_ids: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Read and decompress a single stream of the archive and cut pages out of it.
+    :param multistream_path: path to the multi-stream bzip2 archive
+    :param start_index: Starting point for reading compressed bytes of interest.
+    :param end_index: Stopping point for reading compressed bytes of interest; negative to read to the end of the file.
+    :param page_ids: the ids of the pages wanted, or None for every page in the stream
+    :return: an iterator of the id and XML of each page; requested ids that are not in the stream are left out
+    """
+    with archive_map(multistream_path).view(start_index, end_index) as bytes_of_interest:
+        xml_block = bz2.BZ2Decompressor().decompress(bytes_of_interest).decode()
+
+    if page_ids is None:
+        yield from iter_pages(xml_block)
+        return
+    for page_id in page_ids:
+        page_xml = find_page(xml_block, page_id)
+        if page_xml is not None:
+            yield page_id, page_xml
+
+
+def extract_stream(multistream_path: PathLike, start_index: int, end_index: int,
+                   page_ids: Optional[Sequence[int]] = None) -> List[ClassifiedPage]:
+    """
+    Read, decompress, and analyze a single stream of the archive (see stream_pages). Runs inside a worker process.
+    :return: the analyzed pages; requested ids that are not in the stream are left out
+    """
+    return [classify_page(page_xml, page_id)
+            for page_id, page_xml in stream_pages(multistream_path, start_index, end_index, page_ids)]
+
+
+def extract_stream_with_xml(multistream_path: PathLike, start_index: int, end_index: int,
+                            page_ids: Optional[Sequence[int]] = None) -> List[PageWithXml]:
+    """
+    Like extract_stream, but sends each page's XML back along with its analysis.
+    :return: pairs of an analyzed page and its XML; requested ids that are not in the stream are left out
+    """
+    return [(classify_page(page_xml, page_id), page_xml)
+            for page_id, page_xml in stream_pages(multistream_path, start_index, end_index, page_ids)]
+
+
+class ParallelExtractor:
+    """
+    A pool of worker processes extracting streams of the archive, usable both for batches of frontier articles and
+    for passes over the whole archive. Results always come back in the order the streams were requested.
+    """
+
+    def __init__(self, multistream_path: PathLike, workers: int = EXTRACTION_WORKERS, max_pending: int = None):
+        """
+        :param multistream_path: path to the multi-stream bzip2 archive
+        :param workers: the number of worker processes
+        :param max_pending: the most streams submitted to the pool at any one time (defaults to 4 per worker), which
+                            bounds the memory held by results waiting to be consumed
+        """
+        self.multistream_path = multistream_path
+        self.workers = workers
+        self.max_pending = max_pending if max_pending is not None else 4 * workers
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=archive_map, initargs=(multistream_path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+
+    def extract_pages(self, requests: Dict[StreamRange, Sequence[int]], with_xml: bool = False) \
+            -> Iterator[Tuple[StreamRange, Union[List[ClassifiedPage], List[PageWithXml]]]]:
+        """
+        Analyze specific pages of many streams, such as the outgoing links of a window of frontier articles.
+        :param requests: a mapping from the byte range of each stream to the ids of the pages wanted from it
+        :param with_xml: send back each page's XML along with its analysis (see extract_stream_with_xml)
+        :return: an iterator of (stream range, analyzed pages) pairs, in offset order
+        """
+        ranges = sorted(requests)
+        return zip(ranges, self._map_in_order(((start_index, end_index, list(requests[(start_index, end_index)]))
+                                               for start_index, end_index in ranges),
+                                              extract_stream_with_xml if with_xml else extract_stream))
+
+    def iter_archive(self, stream_ranges: Iterable[StreamRange]) -> Iterator[List[ClassifiedPage]]:
+        """
+        Analyze every page of every given stream, such as for a pass over the whole archive.
+        :param stream_ranges: the byte ranges of the streams to analyze
+        :return: an iterator of the analyzed pages of each stream, in the order the ranges were given
+        """
+        return self._map_in_order((start_index, end_index, None) for start_index, end_index in stream_ranges)
+
+    def submit(self, start_index: int, end_index: int, page_ids: Optional[Sequence[int]] = None) -> Future:
+        """
+        Hand a single stream to the pool, for callers that schedule streams themselves (such as the asyncio crawler).
+        :return: a future of the stream's analyzed pages, as returned by extract_stream
+        """
+        return self._pool.submit(extract_stream, self.multistream_path, start_index, end_index,
+                                 None if page_ids is None else list(page_ids))
+
+    def _map_in_order(self, tasks: Iterable[Tuple[int, int, Optional[List[int]]]],
+                      extract: Callable[..., List] = extract_stream) -> Iterator[List]:
+        pending: Deque[Future] = deque()
+        for start_index, end_index, page_ids in tasks:
+            pending.append(self._pool.submit(extract, self.multistream_path, start_index, end_index, page_ids))
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
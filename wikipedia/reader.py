@@ -5,17 +5,28 @@ Written by Michael Wheeler and Jay Sherman.
 """
 import bz2
 import sqlite3
+import sys
 from argparse import ArgumentParser
+from collections import defaultdict
 from html.parser import HTMLParser
 from os import PathLike
 from os.path import exists
-
-import mwparserfromhell
-
-from config import OUTPUT_DATA_DIR, WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE, SQLITE_ARCHIVE_INDEX_FILE, make_logger
-from data_stores.redis_.article_cache import ArticleCache
-from wikipedia.analysis import classify_article_as_artist
-from wikipedia.models import WikipediaArticle
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Set, Tuple
+
+from config import BATCH_NOT_FOUND_FILE, BATCH_OUTPUT_DIR, BATCH_OUTPUT_FILE, OUTPUT_DATA_DIR, \
+    WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE, SQLITE_ARCHIVE_INDEX_FILE, STREAM_CACHE_MAX_BYTES, make_logger
+from instrumentation import metrics
+from wikipedia.analysis import scan_wikitext
+from wikipedia.archive import ArchiveMap
+from wikipedia.infobox import TRACKED_PARAMS, infobox_parameters, infobox_source, process_parameter
+from wikipedia.models import ClassifiedPage, WikipediaArticle
+from wikipedia.pages import find_page, page_title
+from wikipedia.stream_cache import DecompressedStreamCache
+
+if TYPE_CHECKING:
+    from data_stores.redis_.article_cache import ArticleCache
 
 logger = make_logger(__name__)
 
@@ -24,84 +35,368 @@ class WikipediaArchiveSearcher:
     """
     A utility for extracting and parsing articles from the multi-stream bzip2 archive of Wikipedia.
     For more information on how the file formats work see https://en.wikipedia.org/wiki/Wikipedia:Database_download
+
+    The archive stays memory-mapped and the index open until close is called, or the `with` block the searcher was
+    opened in ends.
     """
 
     class ArticleNotFoundError(Exception):
         """Custom exception for when some article isn't found in the archive."""
         pass
 
-    def __init__(self, multistream_path: PathLike, index_path: PathLike):
+    def __init__(self, multistream_path: PathLike, index_path: PathLike,
+                 stream_cache_bytes: int = STREAM_CACHE_MAX_BYTES, artist_table=None, extractor=None,
+                 cache: "ArticleCache" = None, title_index=None, redirects=None, defer_infobox: bool = False,
+                 sqlite_path: PathLike = SQLITE_ARCHIVE_INDEX_FILE):
+        """
+        :param multistream_path: path to the multi-stream bzip2 archive
+        :param index_path: path to the archive's index file
+        :param stream_cache_bytes: the budget of the cache of decompressed streams, in decompressed bytes
+        :param artist_table: an optional, fully built data_stores.sqlite.artist_table.ArtistTable. When given,
+                             articles are classified from it without touching the archive at all.
+        :param extractor: an optional wikipedia.parallel.ParallelExtractor. When given, retrieve_articles spreads
+                          the decompression and parsing of its streams across the extractor's worker processes.
+        :param cache: the cache that classifications are stored in (by default, an ArticleCache made when first used,
+                      so that a searcher that never classifies an article never connects to Redis)
+        :param title_index: an optional wikipedia.title_index.TitleIndex. When given, article locations are looked
+                            up in it instead of the SQLite index, which is then never opened.
+        :param redirects: an optional wikipedia.title_index.RedirectTable. When given, outgoing links to redirect
+                          pages are replaced by links to their targets before anything is fetched.
+        :param defer_infobox: keep only the source of each infobox, to be parsed when the article's node is written.
+                              Pages analyzed by the extractor's workers are parsed there as usual.
+        :param sqlite_path: the SQLite index of the archive, built by `python -m data_stores.sqlite`
+        """
         assert exists(multistream_path), f'Multistream path does not exist on the file system: {multistream_path}'
         assert exists(index_path), f'Index path does not exist on the file system: {index_path}'
 
         self.multistream_path = multistream_path
+        self.archive = ArchiveMap(multistream_path)
         self.index_path = index_path
-        self.indices = self.retrieve_indices()
-        self.retrieved_pages = {}
+        self.sqlite_path = sqlite_path
+        self.title_index = title_index
+        self.redirects = redirects
+        self.defer_infobox = defer_infobox
+        # Titles confirmed to be missing from the archive, so that no lookup for them is ever repeated
+        self.missing_titles: Set[str] = set()
+        self.indices = self.retrieve_indices() if title_index is None else None
+        self.stream_cache = DecompressedStreamCache(max_bytes=stream_cache_bytes)
+        self.artist_table = artist_table
+        self.extractor = extractor
+        self._cache = cache
+
+    @property
+    def cache(self) -> "ArticleCache":
+        if self._cache is None:
+            # Imported here so that importing this module (as the extractor's workers do) never imports the Redis client
+            from data_stores.redis_.article_cache import ArticleCache
+            self._cache = ArticleCache()
+        return self._cache
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmap the archive, close the SQLite index, and drop the cached streams. The extractor, title index, redirect
+        table, and artist table belong to the caller and are left open.
+        """
+        self.archive.close()
+        if self.indices is not None:
+            self.indices.close()
+        self.stream_cache.clear()
 
     def retrieve_indices(self):
         """
         Maps each known article title to its start index, end index, title, and unique ID for fast searching later.
         :return: connection to xml_indices database, which has tablWritten by Anirudh Kamath.e named articles that holds above info
         """
-        conn = sqlite3.connect(SQLITE_ARCHIVE_INDEX_FILE)
+        conn = sqlite3.connect(self.sqlite_path)
         return conn
 
     def retrieve_article_xml(self, article: WikipediaArticle) -> str:
         """
         Pulls the XML content of a specific Wikipedia article from the archive.
         :param title: The title of the article in question.
-        :return: The decompressed text of the <page> node matching the given title.
+        :return: The decompressed text of the <page> node matching the given title, or an empty string if the
+                 article was classified from the artist table without decompressing anything.
         """
-        cursor = self.indices.cursor()
+        if article.article_title in self.missing_titles:
+            raise self.ArticleNotFoundError(article.article_title)
 
-        cursor.execute('SELECT * FROM articles WHERE title == ?', (article.article_title,))
-        results = cursor.fetchall()
+        if self.artist_table is not None:
+            with metrics.time("artist_table"):
+                page = self.artist_table.retrieve_pages([article.article_title]).get(article.article_title)
+            if page is None:
+                self.missing_titles.add(article.article_title)
+                raise self.ArticleNotFoundError(article.article_title)
+            self.apply_page(article, page)
+            return ""
+
+        with metrics.time("index_lookup"):
+            if self.title_index is not None:
+                location = self.title_index.lookup(article.article_title)
+                results = [] if location is None else [(location[0], location[1], article.article_title,
+                                                         location[2])]
+            else:
+                cursor = self.indices.cursor()
+                cursor.execute('SELECT first_byte, page_id, title, last_byte FROM articles WHERE title == ?',
+                               (article.article_title,))
+                results = cursor.fetchall()
         # print(f'\nGot index information: {results}')
 
         if len(results) == 0:
+            self.missing_titles.add(article.article_title)
             raise self.ArticleNotFoundError(article.article_title)
-        sqlite_table_index, start_index, page_id, title, end_index = results[0]
+        start_index, page_id, title, end_index = results[0]
         logger.info(f'{title}: {start_index} -> {end_index}')
         start_index = int(start_index)
         end_index = int(end_index)
         page_id = int(page_id)
-        title = "".join(title.split("'"))
 
         xml_block = self.extract_indexed_range(start_index, end_index)
-        parser = MWParser(id=page_id, )
-        parser.feed(xml_block)
+        return self.parse_article(article, xml_block, start_index, end_index, page_id)
+
+    def lookup_indices(self, titles: Iterable[str], batch_size: int = 900) -> Dict[str, Tuple[int, int, int]]:
+        """
+        Looks up the archive location of many article titles with as few queries as possible.
+        :param titles: the titles of the articles in question
+        :param batch_size: the number of titles bound into each query (SQLite caps the number of parameters)
+        :return: a mapping from each title found in the index to its start index, page id, and end index
+        """
+        titles = [title for title in dict.fromkeys(titles) if title not in self.missing_titles]
+        with metrics.time("index_lookup", items=len(titles)):
+            if self.title_index is not None:
+                locations = self.title_index.lookup_many(titles)
+            else:
+                cursor = self.indices.cursor()
+                locations = {}
+                for batch_start in range(0, len(titles), batch_size):
+                    batch = titles[batch_start:batch_start + batch_size]
+                    placeholders = ", ".join("?" * len(batch))
+                    cursor.execute(f'SELECT first_byte, page_id, title, last_byte FROM articles '
+                                   f'WHERE title IN ({placeholders})', batch)
+                    for start_index, page_id, title, end_index in cursor.fetchall():
+                        if title not in locations:
+                            locations[title] = (int(start_index), int(page_id), int(end_index))
+        self.missing_titles.update(title for title in titles if title not in locations)
+        return locations
+
+    def retrieve_articles(self, articles: List[WikipediaArticle]) -> List[WikipediaArticle]:
+        """
+        Pulls and parses many articles at once, visiting the archive in offset order and decompressing each stream
+        only once no matter how many of the requested articles it holds.
+        :param articles: the articles to retrieve; each is updated in place as by retrieve_article_xml
+        :return: the articles whose titles could not be found in the archive
+        """
+        pages = self.fetch_pages(article.article_title for article in articles)
+        not_found = []
+        classifications = []
+        for article in articles:
+            page = pages.get(article.article_title)
+            if page is None:
+                not_found.append(article)
+            else:
+                self.fill_article(article, page)
+                classifications.append((article, page.is_musical_artist))
+
+        # Update the cache of classifications in as few round trips as possible
+        self.cache.store_many(classifications)
+        return not_found
+
+    def fetch_pages(self, titles: Iterable[str]) -> Dict[str, ClassifiedPage]:
+        """
+        Analyzes many articles at once without updating any article or cache, visiting the archive in offset order
+        and decompressing each stream only once no matter how many of the requested articles it holds.
+        :param titles: the titles of the articles in question
+        :return: a mapping from each title found in the archive to its analyzed page
+        """
+        titles = list(dict.fromkeys(titles))
+        if self.artist_table is not None:
+            titles = [title for title in titles if title not in self.missing_titles]
+            with metrics.time("artist_table", items=len(titles)):
+                pages = self.artist_table.retrieve_pages(titles)
+            self.missing_titles.update(title for title in titles if title not in pages)
+            return pages
+
+        locations = self.lookup_indices(titles)
+        titles_by_stream = defaultdict(list)
+        for title, (start_index, page_id, end_index) in locations.items():
+            titles_by_stream[(start_index, end_index)].append(title)
+
+        logger.info(f'Retrieving {len(locations)} articles from {len(titles_by_stream)} streams '
+                    f'({len(titles) - len(locations)} not in the index)')
+        pages = {}
+        if self.extractor is not None:
+            requests = {stream: [locations[title][1] for title in stream_titles]
+                        for stream, stream_titles in titles_by_stream.items()}
+            started = perf_counter()
+            for stream, stream_pages in self.extractor.extract_pages(requests):
+                metrics.record("parallel_extract", perf_counter() - started, items=len(stream_pages))
+                started = perf_counter()
+                pages_by_id = {page.page_id: page for page in stream_pages}
+                for title in titles_by_stream[stream]:
+                    if locations[title][1] in pages_by_id:
+                        pages[title] = pages_by_id[locations[title][1]]
+            return pages
+
+        for start_index, end_index in sorted(titles_by_stream):
+            stream_titles = titles_by_stream[(start_index, end_index)]
+            pages_by_id = self.analyze_stream(start_index, end_index, [locations[title][1] for title in stream_titles])
+            pages.update((title, pages_by_id[locations[title][1]]) for title in stream_titles
+                         if locations[title][1] in pages_by_id)
+        return pages
+
+    def analyze_stream(self, start_index: int, end_index: int, page_ids: Iterable[int]) -> Dict[int, ClassifiedPage]:
+        """
+        Analyzes some of the pages of one stream, decompressing it through the stream cache.
+        :param start_index: the start index of the stream in the archive
+        :param end_index: the end index of the stream in the archive
+        :param page_ids: the ids of the pages to analyze
+        :return: a mapping from the id of each page found in the stream to its analyzed page
+        """
+        xml_block = self.extract_indexed_range(start_index, end_index)
+        pages = {}
+        for page_id in page_ids:
+            page_xml = find_page(xml_block, page_id)
+            if page_xml is not None:
+                with metrics.time("parse"):
+                    pages[page_id] = classify_page(page_xml, page_id, defer_infobox=self.defer_infobox)
+        return pages
+
+    def parse_article(self, article: WikipediaArticle, xml_block: str, start_index: int, end_index: int,
+                      page_id: int) -> str:
+        """
+        Finds an article's page in a decompressed stream, fills in its links and infobox, and caches its
+        classification.
+        :param article: the article to update in place
+        :param xml_block: the decompressed text of the stream holding the article
+        :param start_index: the start index of the stream in the archive
+        :param end_index: the end index of the stream in the archive
+        :param page_id: the id of the article's page
+        :return: The decompressed text of the <page> node matching the given article.
+        """
+        with metrics.time("parse"):
+            page_xml = find_page(xml_block, page_id)
+            if page_xml is None:
+                raise self.ArticleNotFoundError(article.article_title)
+            parser = MWParser(id=page_id, defer_infobox=self.defer_infobox)
+            parser.feed(page_xml)
 
         article.index_key = (start_index, end_index)
-        article.outgoing_links = [WikipediaArticle(article_title= title,
-                                                   article_url= "/".join(["https://en.wikipedia.org/wiki",
-                                                                          "_".join(title.split(" "))]))
-                                  for title in set(parser.link_titles)]
-        article.infobox = parser.parameters
+        self.apply_page(article, ClassifiedPage(page_id=page_id, title=article.article_title,
+                                                is_musical_artist=parser.classification,
+                                                link_titles=parser.link_titles, infobox=parser.parameters,
+                                                infobox_source=parser.infobox_source))
+        full_xml = "".join(parser.final_lines)
+        return full_xml
+
+    def apply_page(self, article: WikipediaArticle, page: ClassifiedPage) -> None:
+        """
+        Fills in an article's links and infobox from its analyzed page, and caches its classification.
+        :param article: the article to update in place
+        :param page: the analyzed page of the article
+        """
+        self.fill_article(article, page)
         
         # Update the cache of classifications
-        cache = ArticleCache()
-        cache.store_classification(article, parser.classification)
+        self.cache.store_classification(article, page.is_musical_artist)
 
-        self.retrieved_pages[title] = article
-        full_xml = "".join(parser.final_lines)
-        return full_xml
+    def fill_article(self, article: WikipediaArticle, page: ClassifiedPage) -> None:
+        """
+        Fills in an article's links and infobox from its analyzed page, leaving the cache of classifications alone.
+        :param article: the article to update in place
+        :param page: the analyzed page of the article
+        """
+        # Duplicate links are dropped in the order they first appear, so the graph is the same from run to run
+        link_titles = page.link_titles
+        if self.redirects is not None:
+            # A redirect back to the article itself (say, from a former name) is not a link to another article
+            link_titles = [resolved_title for title, resolved_title
+                           in zip(link_titles, self.redirects.resolve_many(link_titles))
+                           if resolved_title == title or resolved_title != article.article_title]
+        article.set_outgoing_link_titles(dict.fromkeys(link_titles))
+        article.infobox = page.infobox
+        article.infobox_source = page.infobox_source
+        article.page_id = page.page_id
+
+    def stream_ranges(self) -> List[Tuple[int, int]]:
+        """
+        Lists the byte range of every stream in the archive that holds pages, according to the index.
+        :return: the start and end index of each stream, in offset order
+        """
+        if self.title_index is not None:
+            return self.title_index.stream_ranges()
+        cursor = self.indices.cursor()
+        cursor.execute('SELECT DISTINCT first_byte, last_byte FROM articles')
+        return sorted((int(start_index), int(end_index)) for start_index, end_index in cursor.fetchall())
+
+    def iter_streams(self, chunksize: int = 1 << 20) -> Iterator[Tuple[int, int, str]]:
+        """
+        Decompresses the whole archive in a single sequential pass, one stream at a time.
+        :param chunksize: number of compressed bytes to hand to the decompressor at a time
+        :return: an iterator of the start index, end index, and decompressed text of every stream in the archive
+        """
+        archive_size = len(self.archive)
+        bz2_decom = bz2.BZ2Decompressor()
+        decompressed_pieces = []
+        stream_start = position = 0
+        while position < archive_size:
+            with self.archive.view(position, position + chunksize) as compressed_bytes:
+                decompressed_pieces.append(bz2_decom.decompress(compressed_bytes))
+                chunk_length = len(compressed_bytes)
+            if bz2_decom.eof:
+                # The next stream starts right after this one, within the chunk just read
+                stream_end = position + chunk_length - len(bz2_decom.unused_data)
+                yield stream_start, stream_end, b"".join(decompressed_pieces).decode()
+
+                bz2_decom = bz2.BZ2Decompressor()
+                decompressed_pieces = []
+                stream_start = position = stream_end
+            else:
+                position += chunk_length
 
     def extract_indexed_range(self, start_index: int, end_index: int, chunksize: int = 10000000) -> str:
         """
-        Decompress a small chunk of the Wikipedia multi-stream XML bz2 file.
+        Decompress a small chunk of the Wikipedia multi-stream XML bz2 file, straight out of the memory-mapped archive.
+        Recently decompressed streams are served from the stream cache, keyed by start_index.
         :param start_index: Starting point for reading compressed bytes of interest.
         :param end_index: Stopping point for reading compressed bytes of interest.
-        :param chunksize: number of bytes to read at a time until reaching start_index
+        :param chunksize: unused, kept for callers of the file-reading version
         :return: The decompressed text of the (partial) XML located between those bytes in the archive.
         """
-        bz2_decom = bz2.BZ2Decompressor()
-        with open(self.multistream_path, "rb") as wiki_file:
-            wiki_file.seek(start_index)
-            logger.info(f'Reading from {start_index} to {end_index}...')
-            bytes_of_interest = wiki_file.read(end_index - start_index)
+        cached_block = self.stream_cache.get(start_index)
+        if cached_block is not None:
+            return cached_block
 
-        return bz2_decom.decompress(bytes_of_interest).decode()
+        bz2_decom = bz2.BZ2Decompressor()
+        logger.info(f'Reading from {start_index} to {end_index}...')
+        started = perf_counter()
+        # Pages of the archive are read from disk as the decompressor touches them
+        with self.archive.view(start_index, end_index) as bytes_of_interest:
+            decompressed_bytes = bz2_decom.decompress(bytes_of_interest)
+        xml_block = decompressed_bytes.decode()
+        metrics.record("decompress", perf_counter() - started, items=len(decompressed_bytes))
+        self.stream_cache.put(start_index, xml_block, size=len(decompressed_bytes))
+        return xml_block
+
+
+def classify_page(page_xml: str, page_id: int, defer_infobox: bool = False) -> ClassifiedPage:
+    """
+    Runs the full analysis of a single page cut out of the archive.
+    :param page_xml: the XML of the page, as returned by wikipedia.pages.find_page or iter_pages
+    :param page_id: the id of the page
+    :param defer_infobox: keep only the source of an artist's infobox, leaving the infobox itself None
+    :return: the page's classification, outgoing links, and infobox
+    """
+    parser = MWParser(id=page_id, defer_infobox=defer_infobox)
+    parser.feed(page_xml)
+    deferred = parser.infobox_source is not None
+    return ClassifiedPage(page_id=page_id, title=page_title(page_xml), is_musical_artist=bool(parser.classification),
+                          link_titles=list(dict.fromkeys(parser.link_titles or [])),
+                          infobox=None if deferred else parser.parameters or {}, infobox_source=parser.infobox_source)
 
 
 class MWParser(HTMLParser):
@@ -109,17 +404,17 @@ class MWParser(HTMLParser):
     """A class for parsing the mediawiki XML.
 
     Designed to find and reconstruct the XML for a specific page out of a block of XML referring
-    to many pages.
+    to many pages. The wikitext analysis in process_text only runs once the desired page has been
+    found, so it is cheapest to feed the parser a single page cut out with wikipedia.pages.find_page.
     """
 
-    def __init__(self, id: str,
-                 tracked_params: list = ["birth_name", "birth_date", "birth_place", "alias", "occupation",
-                                         "years_active", "net_worth", "website", "origin", "background", "genre",
-                                         "label", "instrument", "organization"]):
+    def __init__(self, id: str, tracked_params: list = TRACKED_PARAMS, defer_infobox: bool = False):
         """Build a MWParser.
 
         :param id: the id of the page that is desired
         :param tracked_params: the parameters in the wikipedia article to track
+        :param defer_infobox: for an artist, keep only the source of its infobox (infobox_source) and leave
+                              parameters None
 
         The other fields are:
 
@@ -140,7 +435,9 @@ class MWParser(HTMLParser):
         self.link_titles = None
         self.classification = None
         self.tracked_params = tracked_params
+        self.defer_infobox = defer_infobox
         self.parameters = None
+        self.infobox_source = None
 
 
     def handle_starttag(self, tag: str, attrs: list):
@@ -189,7 +486,6 @@ class MWParser(HTMLParser):
                 self.observed_id = data
             if self.text is None or len(self.text) < len(data):
                 self.text = data
-                self.process_text()
 
     def process_text(self):
         """Performs all necessary options on the text of the page
@@ -197,43 +493,22 @@ class MWParser(HTMLParser):
         Gets the titles of the outgoing links, retrieves the infobox,
         classifies the article, and updates the cache of classifications
         """
-        # Get classification
-        is_musical_artist = classify_article_as_artist(self.text)
-        self.classification = is_musical_artist
+        # Get classification, and the titles of the outgoing links (outside the article namespace dropped, the rest
+        # in the form the index uses)
+        scan = scan_wikitext(self.text)
+        self.classification = scan.is_musical_artist
 
-        if not is_musical_artist:
+        if not scan.is_musical_artist:
             self.link_titles = []
             self.parameters = {}
             return 0 #exit without populating other data
+        self.link_titles = scan.link_titles
 
-        #Get link titles
-        #getting all content between double braces
-        titles = self.text.split("[[")
-        titles = [title.split("]]")[0] for title in titles]
-        #if there is a "|" delimiter, name of title is the before the "|"
-        titles = [title.split("|")[0] for title in titles if not "Category" in title and not "&" in title]
-        titles = titles[1:]
-        self.link_titles = ["".join(t.split("'")) for t in titles]
-
-        #Get infobox
-        templates = mwparserfromhell.parse(self.text).filter_templates()
-        templates = [t for t in templates if "Infobox" in t]
-        all_params = []
-        for template in templates:
-            all_params += template.params
-        all_params = [param for param in all_params
-                      if ("=" in param
-                          and param[0] != "="
-                          and param[-1:] != 0)]
-        parameters_dict = {}
-        for seen_param in all_params:
-            equals_index = seen_param.index("=")
-            key = seen_param[0:equals_index]
-            value = seen_param[equals_index + 1:len(seen_param)]
-            for tracked_param in self.tracked_params:
-                if tracked_param in key:
-                    self.process_parameter(tracked_param, value, parameters_dict)
-        self.parameters = parameters_dict
+        #Get infobox, parsing only the templates that hold it (or leaving that until the node is written)
+        if self.defer_infobox:
+            self.infobox_source = infobox_source(self.text)
+        else:
+            self.parameters = infobox_parameters(infobox_source(self.text), self.tracked_params)
     
     def process_parameter(self, key: str, value: str, parameters_dict: dict):
         """Process the value based on what the key is, and update parameters_dict
@@ -242,64 +517,7 @@ class MWParser(HTMLParser):
         :param value: the information stored in the parameter
         :param parameters_dict: a store of the information related in a wiki page's parameters
         """
-        value = value.strip()
-
-        if key == "birth_date":
-            value = value.split("}}<ref")[0] if "ref" in value else value[2:len(value) - 2]
-            date = [section for section in value.split("|")
-                     if section.isdigit()]
-            if len(date) == 3:
-                parameters_dict[key] = "/".join([date[0], date[1], date[2]])
-        elif key == "net_worth":
-            value = value.split("<ref")[0]
-            value = " ".join(value.split("&nbsp;"))
-        elif key == "website":
-            #get rid of {{URL| and }}
-            value = value[6:len(value) - 2]
-        elif key == "years_active":
-            value = "-".join(value.split("\u2013"))
-        elif key in ["birth_place", "origin"]:
-            new_values = []
-            value = value.split("<ref")[0]
-            values = [val.strip() for val in value.split(",")]
-            for entry in values:
-                val = entry.strip()
-                vals = val.split("|")
-                vals = [(val[2:] if "[[" in val else val)
-                        for val in vals]
-                vals = [(val[:len(val) - 2] if "]]" in val else val)
-                        for val in vals]
-                new_values.append(", ".join(vals))
-            value = ", ".join(list(set(new_values)))
-        elif key == "background":
-            value = " ".join(value.split("<!")[0].strip().split("_"))
-
-        elif "flatlist" in value or "plainlist" in value or  "hlist" in value:
-            values = value.split("\n") if "\n" in value else value.split(",")
-            values = values[1:len(values)-1]
-            values = [val[1:len(val)] for val in values]
-            values = [val.strip() for val in values]
-            new_values = []
-            for val in values:
-                if "[[" in val and "|" in val:
-                    new_values.append(val.split("|")[0][2:])
-                elif "[[" in val:
-                    new_values.append(val[2:len(val)-2])
-                else:
-                    new_values.append(val)
-            value = ", ".join(new_values)
-
-        elif "[[" in value:
-            values = value.split(", ")
-            values = [val.split("|")[0] for val in values]
-            values =  [(val[2:] if "[[" in val else val)
-                       for val in values]
-            values = [(val[:len(val) - 2] if "]]" in val else val)
-                       for val in values]
-            value = ", ".join(values)
-
-        if key != "birth_date":
-            parameters_dict[key] = value
+        process_parameter(key, value, parameters_dict)
 
     def handle_endtag(self, tag: str):
         """
@@ -308,9 +526,9 @@ class MWParser(HTMLParser):
         Does nothing if the desired page has already been found. Otherwise, builds
         the XML endtag and adds it to the list of lines of the XML being parsed.
         If the tag being parsed is a page tag and the page currently being parsed
-        has the correct id, sets self.final_lines to be the lines collected. If
-        the tag being parsed is an id tag, updates self.curr_tag_id to relate
-        that we are no longer observing id data
+        has the correct id, sets self.final_lines to be the lines collected and
+        processes the page's text. If the tag being parsed is an id tag, updates
+        self.curr_tag_id to relate that we are no longer observing id data
 
         :param tag: a String representing the name of the tag
         """
@@ -321,6 +539,7 @@ class MWParser(HTMLParser):
             self.curr_tag_text = False
             if tag == "page" and str(self.observed_id) == str(self.true_id):
                 self.final_lines = self.lines.copy()
+                self.process_text()
 
     def feed(self, data):
         """Feeds the XML data into the MWParser.
@@ -339,19 +558,63 @@ class MWParser(HTMLParser):
 
 
 if __name__ == "__main__":
-    print("Wikipedia archive search demo...")
     parser = ArgumentParser()
-    parser.add_argument("--title", type=str, nargs=1)
+    parser.add_argument("--title", type=str, nargs=1,
+                        help="the title of one article, whose XML is written to data/output/one_article.xml")
+    parser.add_argument("--titles", type=str, default=None,
+                        help="a file of titles, one per line, to extract in a batch ('-' reads them from stdin)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help=f"where a batch writes its articles: a JSON Lines file ({BATCH_OUTPUT_FILE} by default), "
+                             f"or a directory for --format files ({BATCH_OUTPUT_DIR} by default)")
+    parser.add_argument("--format", choices=["jsonl", "files"], default="jsonl",
+                        help="write a batch to a single JSON Lines file, or to one JSON file per requested title")
+    parser.add_argument("--xml", action="store_true", help="include the XML of each page in a batch's records")
+    parser.add_argument("--not-found", type=Path, default=BATCH_NOT_FOUND_FILE,
+                        help="where a batch lists the titles that are not in the archive, one per line")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes to spread a batch's decompression and parsing across")
+    parser.add_argument("--redirects", action="store_true",
+                        help="extract the targets of a batch's redirect titles, using the redirect table built by "
+                             "`python -m wikipedia.title_index --redirects`")
     args = parser.parse_args()
-    title = args.title[0]
-
-    searcher = WikipediaArchiveSearcher(multistream_path=WIKIPEDIA_ARCHIVE_FILE, index_path=WIKIPEDIA_INDEX_FILE)
-
-    article = WikipediaArticle(article_title= title,
-                               article_url= "/".join(["https://en.wikipedia.org/wiki",
-                                                      "_".join(title.split(" "))]))
-    one_article = searcher.retrieve_article_xml(article)
-
-    with open(OUTPUT_DATA_DIR / "one_article.xml", "w", errors="ignore") as out_file:
-        out_file.write(one_article)
-    searcher.indices.close()
+    if (args.title is None) == (args.titles is None):
+        parser.error("give exactly one of --title and --titles")
+
+    if args.titles is not None:
+        from wikipedia.batch import ArticleFileWriter, JsonLinesWriter, extract_batch, read_titles
+        from wikipedia.parallel import ParallelExtractor
+        from wikipedia.title_index import RedirectTable
+
+        if args.titles == "-":
+            titles = read_titles(sys.stdin)
+        else:
+            with open(args.titles) as titles_file:
+                titles = read_titles(titles_file)
+        redirects = RedirectTable() if args.redirects else None
+        # Every stream is read once, in offset order, so there is nothing for the stream cache to hit
+        with WikipediaArchiveSearcher(multistream_path=WIKIPEDIA_ARCHIVE_FILE, index_path=WIKIPEDIA_INDEX_FILE,
+                                      stream_cache_bytes=0, redirects=redirects) as searcher, \
+                (ArticleFileWriter(args.output or BATCH_OUTPUT_DIR) if args.format == "files"
+                 else JsonLinesWriter(args.output or BATCH_OUTPUT_FILE)) as writer:
+            if args.workers > 1:
+                with ParallelExtractor(WIKIPEDIA_ARCHIVE_FILE, workers=args.workers) as extractor:
+                    not_found = extract_batch(searcher, titles, writer, extractor=extractor, with_xml=args.xml)
+            else:
+                not_found = extract_batch(searcher, titles, writer, with_xml=args.xml)
+        with open(args.not_found, "w") as not_found_file:
+            not_found_file.writelines(f'{title}\n' for title in not_found)
+        logger.info(f'Wrote the {len(not_found)} titles not found to {args.not_found}')
+    else:
+        print("Wikipedia archive search demo...")
+        title = args.title[0]
+
+        searcher = WikipediaArchiveSearcher(multistream_path=WIKIPEDIA_ARCHIVE_FILE, index_path=WIKIPEDIA_INDEX_FILE)
+
+        article = WikipediaArticle(article_title= title,
+                                   article_url= "/".join(["https://en.wikipedia.org/wiki",
+                                                          "_".join(title.split(" "))]))
+        one_article = searcher.retrieve_article_xml(article)
+
+        with open(OUTPUT_DATA_DIR / "one_article.xml", "w", errors="ignore") as out_file:
+            out_file.write(one_article)
+        searcher.close()
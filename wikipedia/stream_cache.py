@@ -0,0 +1,96 @@
+"""
+In-process cache of decompressed streams from Wikipedia's multi-stream bzip2 file.
+
+Each stream in the archive holds ~100 pages, and articles that link to each other are frequently stored in the same
+stream, so keeping recently decompressed streams around saves a great deal of repeated bz2 work during a crawl.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class DecompressedStreamCache:
+    """
+    A least-recently-used cache of decompressed XML blocks, keyed by the byte offset at which each compressed stream
+    starts in the archive and bounded by the total number of decompressed bytes it holds.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Build an empty cache.
+
+        :param max_bytes: the maximum number of decompressed bytes to hold; 0 disables caching entirely
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._streams: "OrderedDict[int, str]" = OrderedDict()
+        self._sizes: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def __contains__(self, start_index: int) -> bool:
+        return start_index in self._streams
+
+    def get(self, start_index: int) -> Optional[str]:
+        """
+        Look up a decompressed stream, marking it as the most recently used on a hit.
+
+        :param start_index: the byte offset of the start of the compressed stream in the archive
+        :return: the decompressed text of the stream, or None if it is not cached
+        """
+        xml_block = self._streams.get(start_index)
+        if xml_block is None:
+            self.misses += 1
+            return None
+        self._streams.move_to_end(start_index)
+        self.hits += 1
+        return xml_block
+
+    def put(self, start_index: int, xml_block: str, size: int) -> None:
+        """
+        Store a decompressed stream, evicting the least recently used streams until the cache is back under budget.
+        Streams larger than the whole budget are never stored.
+
+        :param start_index: the byte offset of the start of the compressed stream in the archive
+        :param xml_block: the decompressed text of the stream
+        :param size: the number of decompressed bytes the stream accounts for
+        """
+        if size > self.max_bytes:
+            return
+        if start_index in self._streams:
+            self.current_bytes -= self._sizes[start_index]
+        self._streams[start_index] = xml_block
+        self._streams.move_to_end(start_index)
+        self._sizes[start_index] = size
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            evicted_index, _ = self._streams.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(evicted_index)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drop every cached stream. The hit/miss/eviction counters are left untouched.
+        """
+        self._streams.clear()
+        self._sizes.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: the cache's counters and current occupancy
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "streams": len(self._streams), "bytes": self.current_bytes, "max_bytes": self.max_bytes}
+
+    def __str__(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return "".join(["streams: ", str(len(self._streams)), ", ",
+                        "bytes: ", str(self.current_bytes), "/", str(self.max_bytes), ", ",
+                        "hits: ", str(self.hits), ", misses: ", str(self.misses), ", ",
+                        "evictions: ", str(self.evictions), ", hit rate: ", f'{hit_rate:.2%}'])
@@ -0,0 +1,292 @@
+"""
+A memory-mapped index from article titles to their location in the multistream archive, as a faster alternative to
+the SQLite articles table.
+
+The index is a directory of four NumPy arrays of equal length, sorted by a 64-bit hash of the title: the hashes
+themselves, and the first byte, page id, and last byte of each title's stream. The arrays are memory-mapped rather
+than read, so opening the index costs next to nothing and the operating system pages in only the parts lookups touch.
+Looking up a title is a binary search over the hashes; looking up many is a single vectorized search.
+
+Titles are not stored. A title missing from the archive is reported as present only if its hash equals that of a
+title in the archive, which for the ~20M titles of English Wikipedia happens about once in a trillion lookups. Two
+archive titles sharing a hash are caught when the index is built.
+
+The same directory can hold a redirect table: the hashes of redirect titles, sorted, next to the title and page id of
+the article each one finally leads to. Resolving links through it before anything is fetched saves decompressing a
+stream just to find a redirect page, which would then be classified as not an artist.
+
+Build both from the SQLite index (and one pass over the archive, for the redirects) with
+`python -m wikipedia.title_index --redirects`.
+"""
+from __future__ import annotations
+import sqlite3
+from argparse import ArgumentParser
+from array import array
+from hashlib import blake2b
+from os import PathLike, makedirs
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy
+
+from config import SQLITE_ARCHIVE_INDEX_FILE, TITLE_INDEX_DIR, WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE, \
+    make_logger
+from wikipedia.pages import iter_pages, page_redirect, page_title
+
+logger = make_logger(__name__)
+
+ARRAY_NAMES = ["hashes", "first_bytes", "page_ids", "last_bytes"]
+REDIRECT_ARRAY_NAMES = ["redirect_hashes", "redirect_page_ids", "redirect_offsets", "redirect_targets"]
+MAX_REDIRECT_HOPS = 5  # MediaWiki itself does not follow double redirects; this covers the ones awaiting cleanup
+
+
+def title_hash(title: str) -> int:
+    """
+    :param title: an article title
+    :return: the 64-bit key the title is sorted and searched by
+    """
+    return int.from_bytes(blake2b(title.encode(), digest_size=8).digest(), "little")
+
+
+def _title_check(title: str) -> int:
+    # An independent hash, used only while building to tell a hash collision from a repeated title
+    return int.from_bytes(blake2b(title.encode(), digest_size=8, person=b"check").digest(), "little")
+
+
+class TitleIndex:
+    """
+    Read-only lookups of article locations from an index directory written by build_title_index.
+    """
+
+    class MissingIndexError(Exception):
+        """Custom exception for when the index directory has not been built."""
+        pass
+
+    def __init__(self, directory: PathLike = TITLE_INDEX_DIR):
+        """
+        :param directory: the directory holding the index arrays
+        """
+        self.directory = Path(directory)
+        if not all((self.directory / f'{name}.npy').exists() for name in ARRAY_NAMES):
+            raise self.MissingIndexError(f'No title index in {self.directory}; run `python -m wikipedia.title_index`')
+        self.hashes, self.first_bytes, self.page_ids, self.last_bytes = \
+            (numpy.load(self.directory / f'{name}.npy', mmap_mode="r") for name in ARRAY_NAMES)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def lookup(self, title: str) -> Optional[Tuple[int, int, int]]:
+        """
+        :param title: the title of an article
+        :return: the start index, page id, and end index of the article, or None if it is not in the archive
+        """
+        key = title_hash(title)
+        position = int(numpy.searchsorted(self.hashes, numpy.uint64(key)))
+        if position == len(self.hashes) or int(self.hashes[position]) != key:
+            return None
+        return int(self.first_bytes[position]), int(self.page_ids[position]), int(self.last_bytes[position])
+
+    def lookup_many(self, titles: Iterable[str]) -> Dict[str, Tuple[int, int, int]]:
+        """
+        :param titles: the titles of many articles
+        :return: a mapping from each title found in the index to its start index, page id, and end index
+        """
+        titles = list(dict.fromkeys(titles))
+        if not titles or not len(self.hashes):
+            return {}
+        keys = numpy.fromiter((title_hash(title) for title in titles), dtype=numpy.uint64, count=len(titles))
+        positions = numpy.minimum(numpy.searchsorted(self.hashes, keys), len(self.hashes) - 1)
+        found = numpy.flatnonzero(self.hashes[positions] == keys)
+        found_positions = positions[found]
+        return {titles[i]: (start_index, page_id, end_index) for i, start_index, page_id, end_index
+                in zip(found.tolist(), self.first_bytes[found_positions].tolist(),
+                       self.page_ids[found_positions].tolist(), self.last_bytes[found_positions].tolist())}
+
+    def stream_ranges(self) -> List[Tuple[int, int]]:
+        """
+        :return: the start and end index of every stream holding indexed pages, in offset order
+        """
+        first_bytes, positions = numpy.unique(self.first_bytes, return_index=True)
+        return list(zip(first_bytes.tolist(), self.last_bytes[positions].tolist()))
+
+
+def _first_of_each_key(hashes: array, checks: array, source: PathLike) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Sort title hashes, keeping only the first of any repeated title.
+    :return: the sorted distinct hashes, and the position in the input of each one
+    """
+    keys = numpy.frombuffer(hashes, dtype=numpy.uint64)
+    order = numpy.argsort(keys, kind="stable")
+    keys, check_values = keys[order], numpy.frombuffer(checks, dtype=numpy.uint64)[order]
+    repeated = numpy.flatnonzero(keys[1:] == keys[:-1]) + 1
+    if numpy.any(check_values[repeated] != check_values[repeated - 1]):
+        raise ValueError(f'Two different titles in {source} share a title hash')
+    first_rows = numpy.ones(len(keys), dtype=bool)
+    first_rows[repeated] = False
+    return keys[first_rows], order[first_rows]
+
+
+def build_title_index(sqlite_path: PathLike = SQLITE_ARCHIVE_INDEX_FILE, directory: PathLike = TITLE_INDEX_DIR,
+                      batch_size: int = 100000) -> int:
+    """
+    Write a title index holding every row of the SQLite articles table. Where a title appears more than once, the
+    first row wins, as it does for the searcher's SQL lookups.
+    :param sqlite_path: the SQLite index built by data_stores.sqlite
+    :param directory: the directory to write the index arrays to
+    :param batch_size: the number of rows read from SQLite at a time
+    :return: the number of titles indexed
+    """
+    columns = {name: array('q') for name in ARRAY_NAMES[1:]}
+    hashes, checks = array('Q'), array('Q')
+    conn = sqlite3.connect(sqlite_path)
+    cursor = conn.execute('SELECT title, first_byte, page_id, last_byte FROM articles ORDER BY rowid')
+    rows = cursor.fetchmany(batch_size)
+    while rows:
+        for title, first_byte, page_id, last_byte in rows:
+            hashes.append(title_hash(title))
+            checks.append(_title_check(title))
+            columns["first_bytes"].append(int(first_byte))
+            columns["page_ids"].append(int(page_id))
+            columns["last_bytes"].append(int(last_byte))
+        logger.info(f'Read {len(hashes)} titles from {sqlite_path}')
+        rows = cursor.fetchmany(batch_size)
+    conn.close()
+
+    keys, order = _first_of_each_key(hashes, checks, sqlite_path)
+
+    makedirs(directory, exist_ok=True)
+    numpy.save(Path(directory) / "hashes.npy", keys)
+    for name in ARRAY_NAMES[1:]:
+        numpy.save(Path(directory) / f'{name}.npy', numpy.frombuffer(columns[name], dtype=numpy.int64)[order])
+    logger.info(f'Wrote a title index of {len(order)} titles to {directory}')
+    return len(order)
+
+
+class RedirectTable:
+    """
+    Read-only resolution of redirect titles from the redirect arrays written next to a title index by
+    build_redirect_table.
+    """
+
+    def __init__(self, directory: PathLike = TITLE_INDEX_DIR):
+        """
+        :param directory: the directory holding the redirect arrays
+        """
+        self.directory = Path(directory)
+        if not all((self.directory / f'{name}.npy').exists() for name in REDIRECT_ARRAY_NAMES):
+            raise TitleIndex.MissingIndexError(f'No redirect table in {self.directory}; '
+                                               f'run `python -m wikipedia.title_index --redirects`')
+        self.hashes, self.page_ids, self.offsets, self.targets = \
+            (numpy.load(self.directory / f'{name}.npy', mmap_mode="r") for name in REDIRECT_ARRAY_NAMES)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def target(self, title: str) -> Optional[Tuple[str, int]]:
+        """
+        :param title: the title of an article
+        :return: the title and page id (-1 if it is not in the archive) of the article it redirects to, or None if it
+                 is not a redirect
+        """
+        key = title_hash(title)
+        position = int(numpy.searchsorted(self.hashes, numpy.uint64(key)))
+        if position == len(self.hashes) or int(self.hashes[position]) != key:
+            return None
+        return self._target_title(position), int(self.page_ids[position])
+
+    def resolve(self, title: str) -> str:
+        """
+        :param title: the title of an article
+        :return: the title of the article it redirects to, or the title itself if it is not a redirect
+        """
+        target = self.target(title)
+        return title if target is None else target[0]
+
+    def resolve_many(self, titles: List[str]) -> List[str]:
+        """
+        :param titles: the titles of many articles
+        :return: the resolution of each title, in order
+        """
+        if not titles or not len(self.hashes):
+            return list(titles)
+        keys = numpy.fromiter((title_hash(title) for title in titles), dtype=numpy.uint64, count=len(titles))
+        positions = numpy.minimum(numpy.searchsorted(self.hashes, keys), len(self.hashes) - 1)
+        is_redirect = (self.hashes[positions] == keys).tolist()
+        return [self._target_title(position) if redirected else title
+                for title, position, redirected in zip(titles, positions.tolist(), is_redirect)]
+
+    def _target_title(self, position: int) -> str:
+        return bytes(self.targets[self.offsets[position]:self.offsets[position + 1]]).decode()
+
+
+def build_redirect_table(searcher, directory: PathLike = TITLE_INDEX_DIR, log_every: int = 10000) -> int:
+    """
+    Find every redirect page in one sequential pass over the archive and write the redirect arrays. Redirects to
+    other redirects are followed (up to MAX_REDIRECT_HOPS), so each entry leads straight to an article.
+    :param searcher: a wikipedia.reader.WikipediaArchiveSearcher over the archive, used to decompress it and to look
+                     up the page ids of redirect targets
+    :param directory: the directory to write the redirect arrays to
+    :param log_every: the number of streams between progress reports
+    :return: the number of redirects written
+    """
+    hashes, checks, target_offsets, targets = array('Q'), array('Q'), array('q', [0]), bytearray()
+    for stream_number, (start_index, end_index, xml_block) in enumerate(searcher.iter_streams(), start=1):
+        for page_id, page_xml in iter_pages(xml_block):
+            target = page_redirect(page_xml)
+            target = target.split("#", 1)[0] if target is not None else ""
+            if target:
+                title = page_title(page_xml)
+                hashes.append(title_hash(title))
+                checks.append(_title_check(title))
+                targets += target.encode()
+                target_offsets.append(len(targets))
+        if stream_number % log_every == 0:
+            logger.info(f'Scanned {stream_number} streams, found {len(hashes)} redirects')
+
+    def target_title(row: int) -> str:
+        return targets[target_offsets[row]:target_offsets[row + 1]].decode()
+
+    keys, rows = _first_of_each_key(hashes, checks, searcher.multistream_path)
+    current = numpy.arange(len(keys))
+    if len(keys):
+        target_keys = numpy.fromiter((title_hash(target_title(row)) for row in rows.tolist()), dtype=numpy.uint64,
+                                     count=len(keys))
+        positions = numpy.minimum(numpy.searchsorted(keys, target_keys), len(keys) - 1)
+        next_redirect = numpy.where(keys[positions] == target_keys, positions, -1)
+        for hop in range(MAX_REDIRECT_HOPS):
+            following = next_redirect[current]
+            current = numpy.where(following >= 0, following, current)
+    final_titles = [target_title(row) for row in rows[current].tolist()]
+
+    locations = searcher.lookup_indices(final_titles)
+    page_ids = numpy.fromiter((locations.get(title, (0, -1, 0))[1] for title in final_titles), dtype=numpy.int64,
+                              count=len(final_titles))
+    encoded_titles = [title.encode() for title in final_titles]
+    offsets = numpy.zeros(len(encoded_titles) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(title) for title in encoded_titles], out=offsets[1:])
+
+    makedirs(directory, exist_ok=True)
+    numpy.save(Path(directory) / "redirect_hashes.npy", keys)
+    numpy.save(Path(directory) / "redirect_page_ids.npy", page_ids)
+    numpy.save(Path(directory) / "redirect_offsets.npy", offsets)
+    numpy.save(Path(directory) / "redirect_targets.npy", numpy.frombuffer(b"".join(encoded_titles), dtype=numpy.uint8))
+    logger.info(f'Wrote a redirect table of {len(keys)} redirects ({int((page_ids < 0).sum())} to missing articles) '
+                f'to {directory}')
+    return len(keys)
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument("--sqlite", type=Path, default=SQLITE_ARCHIVE_INDEX_FILE,
+                            help="the SQLite index to convert")
+    arg_parser.add_argument("--output", type=Path, default=TITLE_INDEX_DIR,
+                            help="the directory to write the title index to")
+    arg_parser.add_argument("--redirects", action="store_true",
+                            help="also scan the archive for redirect pages and write the redirect table")
+    args = arg_parser.parse_args()
+    build_title_index(args.sqlite, args.output)
+    if args.redirects:
+        from wikipedia.reader import WikipediaArchiveSearcher
+        with WikipediaArchiveSearcher(WIKIPEDIA_ARCHIVE_FILE, WIKIPEDIA_INDEX_FILE,
+                                      title_index=TitleIndex(args.output)) as searcher:
+            build_redirect_table(searcher, args.output)
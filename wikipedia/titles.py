@@ -0,0 +1,82 @@
+"""
+Canonicalization of the targets of wikitext [[links]] into article titles, following MediaWiki's title rules.
+
+Links are written loosely: with underscores for spaces, a lowercase first letter, a #section anchor, or a leading
+colon. Many of them point outside the article namespace altogether (files, categories, templates, other wikis). Each
+of those would otherwise be looked up in the index and fail, so canonical_title drops them up front and turns the rest
+into the exact form the archive's index uses.
+
+See https://www.mediawiki.org/wiki/Manual:Page_title
+"""
+import re
+from typing import List, Optional
+
+# Lowercased, with spaces: the namespaces of English Wikipedia and their aliases
+NON_ARTICLE_NAMESPACES = frozenset([
+    "media", "special", "talk", "user", "user talk", "wikipedia", "wikipedia talk", "wp", "wt", "project",
+    "project talk", "file", "file talk", "image", "image talk", "mediawiki", "mediawiki talk", "template",
+    "template talk", "help", "help talk", "category", "category talk", "portal", "portal talk", "draft", "draft talk",
+    "timedtext", "timedtext talk", "module", "module talk", "book", "book talk", "education program", "gadget",
+    "gadget definition", "topic",
+])
+# Prefixes of links to sister projects. The one and two letter ones clash with real titles ("Q: Are We Not Men?"), so
+# those only count when written in lowercase.
+INTERWIKI_PREFIXES = frozenset([
+    "wikt", "wiktionary", "wikisource", "s", "wikiquote", "q", "wikinews", "n", "wikibooks", "b", "wikiversity", "v",
+    "wikivoyage", "voy", "wikispecies", "species", "wikidata", "d", "commons", "c", "meta", "m", "metawikimedia", "mw",
+    "mediawikiwiki", "foundation", "wmf", "phabricator", "phab", "outreach", "incubator", "w", "wikimedia",
+])
+# Links to other language editions, like [[fr:Daft Punk]] or [[zh-yue:...]]. Article titles that start the same way
+# ("Oz: The Great and Powerful") are capitalized, so only lowercase prefixes are treated as languages.
+INTERLANGUAGE_PREFIX = re.compile(r"[a-z]{2,3}(-[a-z]+)*")
+INVALID_TITLE_CHARACTERS = re.compile(r"[<>\[\]{}|\n]")
+WHITESPACE = re.compile(r"[\s_]+")
+MAX_TITLE_BYTES = 255
+# A link's target runs to its |label or ]], and one holding a bracket, brace, or angle bracket is never a title, so it
+# is not matched at all. Only the target is consumed, so links nested in an image caption are still found. Most targets
+# are plain words and single spaces with no colon or anchor; the first group takes those, which canonical_title would
+# only capitalize, and the second takes everything else.
+LINK_TARGET = re.compile(r"\[\[(?:([^\W_][^\s_#:\[\]{}|<>]*(?: [^\s_#:\[\]{}|<>]+)*)|([^\[\]{}|<>]*))(?=\||\]\])")
+
+
+def canonical_title(link_target: str) -> Optional[str]:
+    """
+    :param link_target: the target of a [[link]], without its |label
+    :return: the title of the article the link points at, or None if it does not point at an article
+    """
+    title = WHITESPACE.sub(" ", link_target.split("#", 1)[0]).strip()
+    if title.startswith(":"):
+        title = title[1:].lstrip()
+    if not title or title.startswith("/") or INVALID_TITLE_CHARACTERS.search(title):
+        return None
+
+    colon = title.find(":")
+    if colon > 0:
+        prefix = title[:colon].rstrip()
+        if prefix.lower() in NON_ARTICLE_NAMESPACES or INTERLANGUAGE_PREFIX.fullmatch(prefix) \
+                or (prefix.lower() in INTERWIKI_PREFIXES and (len(prefix) > 2 or prefix.islower())):
+            return None
+
+    title = title[0].upper() + title[1:]
+    if len(title.encode()) > MAX_TITLE_BYTES:
+        return None
+    return title
+
+
+def link_titles(wikitext: str) -> List[str]:
+    """
+    :param wikitext: the text of an article
+    :return: the canonical titles of the articles it links to, without duplicates, in the order they first appear
+    """
+    titles = {}
+    for plain_target, target in dict.fromkeys(LINK_TARGET.findall(wikitext)):
+        if plain_target:
+            title = plain_target if plain_target[0].isupper() else plain_target[0].upper() + plain_target[1:]
+            if len(title) * 4 > MAX_TITLE_BYTES and len(title.encode()) > MAX_TITLE_BYTES:
+                continue
+        else:
+            title = canonical_title(target)
+            if title is None:
+                continue
+        titles[title] = None
+    return list(titles)